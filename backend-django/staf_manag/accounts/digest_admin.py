@@ -0,0 +1,147 @@
+"""
+Notification de l'admin (EMAIL_HOST_USER) à chaque nouvelle demande, immédiate ou en résumé périodique.
+
+- le mode vient de UserPreferences.notifications_admin du compte lié à EMAIL_HOST_USER
+  ("immediat" par défaut, ou sans compte lié)
+- en mode "digest", les vues ne mettent rien en file : toutes les ADMIN_DIGEST_INTERVALLE_MINUTES,
+  un seul email résume les DemandeConge / Demande soumises depuis le précédent résumé
+  (une requête UNION sur les deux tables, template rendu une fois)
+- le résumé part après une soumission si l'intervalle est écoulé (thread de la file d'emails),
+  ou par `python manage.py envoyer_digest_admin` (cron / --boucle) pour les périodes calmes
+- l'état (DigestAdmin, une ligne) est verrouillé pendant le calcul : deux exécutions simultanées
+  ne produisent pas deux résumés ; l'email est mis en file dans la même transaction
+"""
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import CharField, F, Value
+from django.utils import timezone
+
+from accounts.models import CustomUser, DigestAdmin
+from accounts.email_jobs import get_executor
+from conges.models import DemandeConge
+from personnel.models import Demande
+from staf_manag.utils.email_utils import mettre_en_file
+
+logger = logging.getLogger(__name__)
+
+DIGEST_FIELDS = ["id", "type_demande", "date_soumission"]
+
+def admin_notifications():
+    """(email de l'admin, compte lié ou None, mode "immediat" | "digest") en une requête."""
+    admin_email = str(settings.EMAIL_HOST_USER or "").strip()
+    admin_user = None
+    if admin_email:
+        admin_user = (
+            CustomUser.objects.select_related("preferences")
+            .filter(personnel__email__iexact=admin_email)
+            .first()
+        )
+    preferences = getattr(admin_user, "preferences", None)
+    return admin_email, admin_user, getattr(preferences, "notifications_admin", "immediat")
+
+def nouvelles_demandes(debut, fin) -> list:
+    """Demandes de congé et autres demandes soumises dans ]debut, fin], en une requête."""
+    personnel = dict(
+        matricule=F("personnel__matricule"),
+        nom=F("personnel__nom"),
+        prenoms=F("personnel__prenoms"),
+    )
+    conges = (
+        DemandeConge.objects.filter(date_soumission__gt=debut, date_soumission__lte=fin)
+        .order_by()
+        .values(
+            *DIGEST_FIELDS,
+            categorie=Value("conge", output_field=CharField()),
+            detail=F("periode"),
+            **personnel,
+        )
+    )
+    autres = (
+        Demande.objects.filter(date_soumission__gt=debut, date_soumission__lte=fin)
+        .order_by()
+        .values(
+            *DIGEST_FIELDS,
+            categorie=Value("demande", output_field=CharField()),
+            detail=Value("", output_field=CharField()),
+            **personnel,
+        )
+    )
+    return list(conges.union(autres, all=True).order_by("date_soumission"))
+
+def resumer(lignes: list) -> dict:
+    """Nombre de demandes par catégorie et par type, pour l'en-tête du résumé."""
+    par_type = {}
+    for ligne in lignes:
+        cle = (ligne["categorie"], ligne["type_demande"])
+        par_type[cle] = par_type.get(cle, 0) + 1
+    return {
+        "total": len(lignes),
+        "conges": sum(n for (categorie, _), n in par_type.items() if categorie == "conge"),
+        "autres": sum(n for (categorie, _), n in par_type.items() if categorie == "demande"),
+        "par_type": [
+            {"categorie": categorie, "type_demande": type_demande, "nombre": n}
+            for (categorie, type_demande), n in sorted(par_type.items())
+        ],
+    }
+
+def envoyer_digest(now=None, force: bool = False):
+    """
+    Met en file le résumé si l'intervalle est écoulé (ou force=True).
+    Retourne le nombre de demandes résumées, ou None si le résumé n'est pas encore dû.
+    En mode "immediat", la période est seulement marquée couverte (pas de rattrapage au changement de mode).
+    """
+    now = now or timezone.now()
+    # marge : les transactions encore en cours peuvent porter une date_soumission antérieure
+    fin = now - timedelta(seconds=getattr(settings, "ADMIN_DIGEST_MARGE_SECONDES", 5))
+    intervalle = timedelta(minutes=getattr(settings, "ADMIN_DIGEST_INTERVALLE_MINUTES", 60))
+
+    with transaction.atomic():
+        # premier passage : couvre le dernier intervalle
+        etat, _ = DigestAdmin.objects.select_for_update().get_or_create(pk=1, defaults={"derniere_fin": fin - intervalle})
+        if fin <= etat.derniere_fin or (not force and fin - etat.derniere_fin < intervalle):
+            return None
+
+        admin_email, admin_user, mode = admin_notifications()
+        lignes = []
+        if mode == "digest" and admin_email:
+            lignes = nouvelles_demandes(etat.derniere_fin, fin)
+        if lignes:
+            mettre_en_file(
+                subject=f"Nouvelles demandes : {len(lignes)} depuis le {timezone.localtime(etat.derniere_fin):%d/%m/%Y %H:%M}",
+                template="digest_demandes.html",
+                context={
+                    "demandes": lignes,
+                    "resume": resumer(lignes),
+                    "debut": etat.derniere_fin,
+                    "fin": fin,
+                    "user": admin_user,
+                    "year": now.year,
+                    "lien_espace": settings.DJANGO_API_URL + "dashboard/admin",
+                },
+                recipient_list=admin_email,
+            )
+            etat.dernier_envoi = now
+
+        etat.derniere_fin = fin
+        etat.nb_demandes = len(lignes)
+        etat.save(update_fields=["derniere_fin", "dernier_envoi", "nb_demandes"])
+    return len(lignes)
+
+def planifier_digest():
+    """Après une soumission en mode digest : envoie le résumé après commit s'il est dû."""
+    if not getattr(settings, "EMAIL_OUTBOX_INLINE_WORKER", True):
+        # résumé envoyé par `manage.py envoyer_digest_admin`
+        return
+    transaction.on_commit(lambda: get_executor().submit(_envoyer_digest_sans_echec))
+
+def _envoyer_digest_sans_echec():
+    close_old_connections()
+    try:
+        envoyer_digest()
+    except Exception:
+        logger.exception("Echec du résumé des nouvelles demandes")
+    finally:
+        close_old_connections()
@@ -0,0 +1,142 @@
+"""
+Envoi des emails de la file (EmailSortant), hors de la requête HTTP.
+
+- les messages sont enregistrés par staf_manag.utils.email_utils.mettre_en_file, dans la transaction
+  de l'opération métier ; après commit, un thread dédié vide la file (EMAIL_OUTBOX_INLINE_WORKER = True)
+  ou `python manage.py envoyer_emails --boucle` s'en charge (worker séparé, reprend aussi les nouveaux essais)
+- un lot = une connexion SMTP ouverte une fois, un send_messages par message (erreur isolée par message)
+- le lot est réservé dans une transaction courte (FOR UPDATE SKIP LOCKED puis statut "en_cours" avec un bail
+  dans prochain_essai) : thread et commande peuvent tourner ensemble sans double envoi, et aucune transaction
+  ni verrou n'est tenu pendant les échanges SMTP
+- le résultat est enregistré message par message : si le worker s'arrête en plein lot, seuls les messages
+  non enregistrés sont repris, à l'expiration du bail
+- échec : nouvel essai après EMAIL_OUTBOX_DELAI_BASE * 2^(tentatives - 1) secondes (plafonné),
+  puis statut "echec" (lettre morte) après EMAIL_OUTBOX_TENTATIVES_MAX tentatives
+- tests / développement : EMAIL_BACKEND locmem, ou EMAIL_HOST / EMAIL_PORT / EMAIL_USE_TLS
+  pointés sur un serveur SMTP local (ex. `python -m aiosmtpd -n -l localhost:1025`)
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EmailSortant
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="email-outbox")
+    return _executor
+
+def reveiller_worker():
+    """Vide la file une fois la transaction courante validée."""
+    if not getattr(settings, "EMAIL_OUTBOX_INLINE_WORKER", True):
+        # les messages seront envoyés par `manage.py envoyer_emails`
+        return
+    transaction.on_commit(lambda: get_executor().submit(vider_file))
+
+def construire_message(email: EmailSortant, connection=None) -> EmailMultiAlternatives:
+    msg = EmailMultiAlternatives(
+        email.sujet, email.corps_texte,
+        from_email=settings.EMAIL_HOST_USER, to=[email.destinataire], connection=connection,
+    )
+    if email.corps_html:
+        msg.attach_alternative(email.corps_html, "text/html")
+    return msg
+
+def delai_nouvel_essai(tentatives: int) -> timedelta:
+    base = getattr(settings, "EMAIL_OUTBOX_DELAI_BASE", 60)
+    plafond = getattr(settings, "EMAIL_OUTBOX_DELAI_MAX", 3600)
+    return timedelta(seconds=min(base * 2 ** max(tentatives - 1, 0), plafond))
+
+def _enregistrer(email: EmailSortant, **champs):
+    # seulement si le message est toujours réservé (un bail expiré a pu être repris ailleurs)
+    EmailSortant.objects.filter(pk=email.pk, statut="en_cours").update(**champs)
+
+def _noter_echec(email: EmailSortant, erreur: Exception):
+    erreur_txt = f"{type(erreur).__name__}: {erreur}"[:2000]
+    if email.tentatives >= getattr(settings, "EMAIL_OUTBOX_TENTATIVES_MAX", 5):
+        logger.error("Email #%s abandonné après %s tentative(s) : %s", email.pk, email.tentatives, erreur_txt)
+        _enregistrer(email, statut="echec", derniere_erreur=erreur_txt)
+    else:
+        _enregistrer(
+            email, statut="en_attente", derniere_erreur=erreur_txt,
+            prochain_essai=timezone.now() + delai_nouvel_essai(email.tentatives),
+        )
+
+def reserver_lot(limite: int, now) -> list:
+    """
+    Réserve les messages dus (en attente, ou en cours dont le bail a expiré) : statut "en_cours",
+    tentative comptée, prochain_essai = fin du bail. Transaction courte, sans E/S SMTP.
+    """
+    bail = timedelta(seconds=limite * (getattr(settings, "EMAIL_TIMEOUT", None) or 20) + 60)
+    with transaction.atomic():
+        lot = list(
+            EmailSortant.objects.select_for_update(skip_locked=True)
+            .filter(statut__in=("en_attente", "en_cours"), prochain_essai__lte=now)
+            .order_by("prochain_essai", "id")[:limite]
+        )
+        if lot:
+            EmailSortant.objects.filter(pk__in=[email.pk for email in lot]).update(
+                statut="en_cours", prochain_essai=now + bail, tentatives=F("tentatives") + 1,
+            )
+    for email in lot:
+        email.tentatives += 1
+    return lot
+
+def envoyer_lot(limite: int = None, connection=None) -> int:
+    """
+    Envoie un lot de messages dus sur une seule connexion SMTP. Retourne le nombre de messages traités
+    (envoyés ou replanifiés) ; 0 quand la file est vide.
+    """
+    limite = limite or getattr(settings, "EMAIL_OUTBOX_LOT", 50)
+    lot = reserver_lot(limite, timezone.now())
+    if not lot:
+        return 0
+
+    connexion = connection or get_connection()
+    try:
+        connexion.open()
+    except Exception as e:
+        # relais injoignable : tout le lot est replanifié
+        for email in lot:
+            _noter_echec(email, e)
+        return len(lot)
+
+    try:
+        for email in lot:
+            try:
+                connexion.send_messages([construire_message(email, connexion)])
+            except Exception as e:
+                _noter_echec(email, e)
+            else:
+                _enregistrer(email, statut="envoye", date_envoi=timezone.now(), derniere_erreur="")
+    finally:
+        if connection is None:
+            connexion.close()
+    return len(lot)
+
+def vider_file() -> int:
+    """Envoie les lots jusqu'à ce qu'il ne reste plus de message dû. Retourne le nombre traité."""
+    close_old_connections()
+    total = 0
+    try:
+        while True:
+            traites = envoyer_lot()
+            if not traites:
+                return total
+            total += traites
+    except Exception:
+        logger.exception("Echec du vidage de la file d'emails")
+        return total
+    finally:
+        close_old_connections()
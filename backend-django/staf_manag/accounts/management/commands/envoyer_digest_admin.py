@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+import time
+from accounts.digest_admin import envoyer_digest
+
+class Command(BaseCommand):
+    help = "Envoie le résumé des nouvelles demandes à l'admin quand l'intervalle ADMIN_DIGEST_INTERVALLE_MINUTES est écoulé"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boucle', action='store_true', help="Tourne en continu et vérifie toutes les --intervalle secondes")
+        parser.add_argument('--intervalle', type=float, default=60.0)
+        parser.add_argument('--force', action='store_true', help="Envoie le résumé sans attendre la fin de l'intervalle")
+
+    def handle(self, *args, **options):
+        force = options['force']
+        while True:
+            nombre = envoyer_digest(force=force)
+            force = False
+            if nombre is not None:
+                self.stdout.write(f"Résumé : {nombre} demande(s)")
+
+            if not options['boucle']:
+                break
+            time.sleep(options['intervalle'])
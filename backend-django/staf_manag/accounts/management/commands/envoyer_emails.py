@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+import time
+from accounts.models import EmailSortant
+from accounts.email_jobs import vider_file
+
+class Command(BaseCommand):
+    help = "Envoie les emails en attente dans la file (worker hors process web, reprise des nouveaux essais)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boucle', action='store_true', help="Tourne en continu et interroge la file toutes les --intervalle secondes")
+        parser.add_argument('--intervalle', type=float, default=5.0)
+        parser.add_argument('--rejouer-echecs', action='store_true', help="Remet en file les messages en échec définitif avant l'envoi")
+
+    def handle(self, *args, **options):
+        if options['rejouer_echecs']:
+            remis = EmailSortant.objects.filter(statut='echec').update(statut='en_attente', tentatives=0)
+            self.stdout.write(f"{remis} message(s) en échec remis en file")
+
+        while True:
+            envoyes = vider_file()
+            if envoyes:
+                self.stdout.write(f"{envoyes} message(s) traité(s)")
+
+            if not options['boucle']:
+                break
+            time.sleep(options['intervalle'])
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0010_remove_trusteddevice_name_passwordresetcode_is_used_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="version_donnees",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
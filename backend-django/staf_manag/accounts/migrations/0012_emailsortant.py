@@ -0,0 +1,61 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0011_customuser_version_donnees"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmailSortant",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("destinataire", models.EmailField(max_length=254)),
+                ("sujet", models.CharField(max_length=255)),
+                ("template", models.CharField(blank=True, max_length=100)),
+                ("corps_texte", models.TextField()),
+                ("corps_html", models.TextField(blank=True)),
+                (
+                    "statut",
+                    models.CharField(
+                        choices=[
+                            ("en_attente", "En attente"),
+                            ("envoye", "Envoyé"),
+                            ("echec", "Échec définitif"),
+                        ],
+                        default="en_attente",
+                        max_length=20,
+                    ),
+                ),
+                ("tentatives", models.PositiveSmallIntegerField(default=0)),
+                (
+                    "prochain_essai",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("derniere_erreur", models.TextField(blank=True)),
+                ("date_creation", models.DateTimeField(auto_now_add=True)),
+                ("date_envoi", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["statut", "prochain_essai"],
+                        name="email_sortant_file_idx",
+                    )
+                ],
+            },
+        ),
+    ]
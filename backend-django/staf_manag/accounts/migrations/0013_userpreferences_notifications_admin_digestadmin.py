@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0012_emailsortant"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userpreferences",
+            name="notifications_admin",
+            field=models.CharField(
+                choices=[("immediat", "Immédiat"), ("digest", "Résumé périodique")],
+                default="immediat",
+                max_length=10,
+            ),
+        ),
+        migrations.CreateModel(
+            name="DigestAdmin",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("derniere_fin", models.DateTimeField()),
+                ("dernier_envoi", models.DateTimeField(blank=True, null=True)),
+                ("nb_demandes", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Rattrapage d'une dérive antérieure : valeurs par défaut du modèle, sans changement de schéma."""
+
+    dependencies = [
+        ("accounts", "0013_userpreferences_notifications_admin_digestadmin"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="customuser",
+            name="nationalite",
+            field=models.CharField(blank=True, default="Tunisienne", max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name="customuser",
+            name="ville",
+            field=models.CharField(blank=True, default="Gabès", max_length=255, null=True),
+        ),
+    ]
@@ -57,6 +57,8 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
     personnel = models.OneToOneField(Personnel, on_delete=models.SET_NULL, null=True, blank=True, related_name='user')
+    # incrémenté à chaque modification du compte, du personnel lié ou des préférences (ETag des endpoints "me")
+    version_donnees = models.PositiveIntegerField(default=0, editable=False)
 
     objects = CustomUserManager()
     
@@ -71,7 +73,17 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
             self.role = 'admin'
         if self.is_superuser:
             self.is_staff = True
+
+        # version incrémentée en SQL (jamais réécrite avec une valeur lue plus tôt), sauf mise à jour de last_login seule
+        update_fields = kwargs.get('update_fields')
+        incrementer = not self._state.adding and not (update_fields is not None and set(update_fields) <= {'last_login'})
+        if incrementer:
+            self.version_donnees = models.F('version_donnees') + 1
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version_donnees'}
         super().save(*args, **kwargs)
+        if incrementer:
+            self.refresh_from_db(fields=['version_donnees'])
 class PasswordResetCode(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     code = models.CharField(max_length=6)
@@ -92,6 +104,12 @@ class UserPreferences(models.Model):
     email_notifications = models.BooleanField(default=True)
     sms_notifications = models.BooleanField(default=False)
     push_notifications = models.BooleanField(default=False)
+    # admin destinataire des nouvelles demandes (EMAIL_HOST_USER) : un email par demande ou un résumé périodique
+    notifications_admin = models.CharField(
+        max_length=10,
+        choices=[('immediat', 'Immédiat'), ('digest', 'Résumé périodique')],
+        default='immediat',
+    )
 
     def __str__(self):
         return f"Préférences de {self.user.matricule}"
@@ -111,4 +129,48 @@ class TrustedDevice(models.Model):
     def is_valid(self) -> bool:
         if self.expires_at:
             return timezone.now() < self.expires_at
-        return True
\ No newline at end of file
+        return True
+class EmailSortant(models.Model):
+    """
+    File d'envoi des emails (outbox) : le message est rendu et enregistré dans la transaction
+    de l'opération qui le déclenche, puis envoyé par accounts/email_jobs.py.
+    """
+    STATUTS = [
+        ('en_attente', 'En attente'),
+        ('en_cours', "En cours d'envoi"),
+        ('envoye', 'Envoyé'),
+        ('echec', 'Échec définitif'),
+    ]
+
+    destinataire = models.EmailField()
+    sujet = models.CharField(max_length=255)
+    template = models.CharField(max_length=100, blank=True)
+    corps_texte = models.TextField()
+    corps_html = models.TextField(blank=True)
+    statut = models.CharField(max_length=20, choices=STATUTS, default='en_attente')
+    tentatives = models.PositiveSmallIntegerField(default=0)
+    prochain_essai = models.DateTimeField(default=timezone.now)
+    derniere_erreur = models.TextField(blank=True)
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_envoi = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # file du worker : statut = 'en_attente' AND prochain_essai <= now() ORDER BY prochain_essai
+            models.Index(fields=['statut', 'prochain_essai'], name='email_sortant_file_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sujet} -> {self.destinataire} ({self.statut})"
+
+class DigestAdmin(models.Model):
+    """
+    Etat du résumé périodique des nouvelles demandes (une seule ligne, voir accounts/digest_admin.py) :
+    les demandes soumises jusqu'à `derniere_fin` ont déjà été couvertes.
+    """
+    derniere_fin = models.DateTimeField()
+    dernier_envoi = models.DateTimeField(null=True, blank=True)
+    nb_demandes = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Résumé admin jusqu'au {self.derniere_fin:%d/%m/%Y %H:%M}"
@@ -1,3 +1,197 @@
-from django.test import TestCase
+from datetime import date, timedelta
+import socket
+
+from aiosmtpd.controller import Controller
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import EmailSortant, UserPreferences
+from accounts.email_jobs import envoyer_lot
+from accounts.digest_admin import envoyer_digest
+from conges.models import DemandeConge
+from personnel.models import Personnel, Demande
+from staf_manag.utils.email_utils import mettre_en_file
 
 # Create your tests here.
+
+class RelaisEnPanne(BaseEmailBackend):
+    """Relais SMTP qui refuse tous les messages."""
+
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError("relais indisponible")
+
+class ArretDuWorker(BaseException):
+    pass
+
+class RelaisPuisArret(BaseEmailBackend):
+    """Envoie le premier message puis simule l'arrêt brutal du worker (hors Exception, non intercepté)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.envoyes = []
+
+    def send_messages(self, email_messages):
+        if self.envoyes:
+            raise ArretDuWorker()
+        self.envoyes.extend(email_messages)
+        return len(email_messages)
+
+class ServeurSMTPLocal:
+    """Handler aiosmtpd : garde les messages reçus et compte les sessions (EHLO)."""
+
+    def __init__(self):
+        self.messages = []
+        self.sessions = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+def port_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@override_settings(
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    EMAIL_OUTBOX_INLINE_WORKER=False,
+    EMAIL_OUTBOX_TENTATIVES_MAX=2,
+)
+class FileEmailsTests(TestCase):
+
+    def setUp(self):
+        # le signal post_save crée le compte et ses préférences
+        self.personnel = Personnel.objects.create(
+            nom="Nom", prenoms="Prenom", grade="Technicien", specialite="Info",
+            ecole_origine="ENIT", cin="C00001", matricule="M00001", telephone="0",
+            email="p1@exemple.tn", date_affectation=date(2020, 1, 1), date_passage_grade=date(2020, 1, 1),
+        )
+
+    def mettre_code_en_file(self, critique=False):
+        return mettre_en_file(
+            "Code de connexion", "reset_password_code.html",
+            {"user": self.personnel.user, "code": "123456", "year": 2026}, self.personnel.email,
+            critique=critique,
+        )
+
+    def test_envoi_sur_une_connexion(self):
+        self.mettre_code_en_file()
+        self.mettre_code_en_file()
+
+        self.assertEqual(envoyer_lot(), 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].to, ["p1@exemple.tn"])
+        self.assertEqual(EmailSortant.objects.filter(statut="envoye").count(), 2)
+        self.assertEqual(envoyer_lot(), 0)
+
+    def test_nouvel_essai_puis_lettre_morte(self):
+        email = self.mettre_code_en_file()
+
+        self.assertEqual(envoyer_lot(connection=RelaisEnPanne()), 1)
+        email.refresh_from_db()
+        self.assertEqual((email.statut, email.tentatives), ("en_attente", 1))
+        self.assertGreater(email.prochain_essai, email.date_creation)
+        # pas encore dû : le lot suivant ne le reprend pas
+        self.assertEqual(envoyer_lot(connection=RelaisEnPanne()), 0)
+
+        EmailSortant.objects.filter(pk=email.pk).update(prochain_essai=email.date_creation)
+        envoyer_lot(connection=RelaisEnPanne())
+        email.refresh_from_db()
+        self.assertEqual((email.statut, email.tentatives), ("echec", 2))
+        self.assertIn("relais indisponible", email.derniere_erreur)
+
+    def test_arret_en_plein_lot_ne_renvoie_que_les_messages_non_enregistres(self):
+        premier, second = self.mettre_code_en_file(), self.mettre_code_en_file()
+
+        relais = RelaisPuisArret()
+        with self.assertRaises(ArretDuWorker):
+            envoyer_lot(connection=relais)
+        premier.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(premier.statut, "envoye")
+        self.assertEqual(second.statut, "en_cours")
+        # bail en cours : le message n'est pas repris par un autre worker
+        self.assertEqual(envoyer_lot(), 0)
+
+        EmailSortant.objects.filter(pk=second.pk).update(prochain_essai=timezone.now())
+        self.assertEqual(envoyer_lot(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        second.refresh_from_db()
+        self.assertEqual((second.statut, second.tentatives), ("envoye", 2))
+
+    def test_preferences_respectees_sauf_messages_critiques(self):
+        UserPreferences.objects.filter(user=self.personnel.user).update(email_notifications=False)
+
+        self.assertIsNone(self.mettre_code_en_file())
+        self.assertIsNotNone(self.mettre_code_en_file(critique=True))
+        self.assertEqual(EmailSortant.objects.count(), 1)
+
+class FileEmailsSMTPTests(TestCase):
+    """Envoi réel en SMTP vers un serveur local (aiosmtpd dans un thread)."""
+
+    def setUp(self):
+        self.serveur = ServeurSMTPLocal()
+        port = port_libre()
+        controleur = Controller(self.serveur, hostname="127.0.0.1", port=port)
+        controleur.start()
+        self.addCleanup(controleur.stop)
+        reglages = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST="127.0.0.1", EMAIL_PORT=port, EMAIL_USE_TLS=False, EMAIL_USE_SSL=False,
+            EMAIL_HOST_USER="admin@exemple.tn", EMAIL_HOST_PASSWORD="", EMAIL_TIMEOUT=5,
+            EMAIL_OUTBOX_INLINE_WORKER=False,
+        )
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+    def test_lot_envoye_sur_une_seule_session_smtp(self):
+        for i in range(3):
+            mettre_en_file(
+                "Code de connexion", "reset_password_code.html",
+                {"code": f"00000{i}", "year": 2026}, f"p{i}@exemple.tn", critique=True,
+            )
+
+        self.assertEqual(envoyer_lot(), 3)
+        self.assertEqual(self.serveur.sessions, 1)
+        self.assertEqual(sorted(m.rcpt_tos[0] for m in self.serveur.messages), ["p0@exemple.tn", "p1@exemple.tn", "p2@exemple.tn"])
+        self.assertEqual(self.serveur.messages[0].mail_from, "admin@exemple.tn")
+        self.assertEqual(EmailSortant.objects.filter(statut="envoye").count(), 3)
+
+@override_settings(EMAIL_HOST_USER="p1@exemple.tn", EMAIL_OUTBOX_INLINE_WORKER=False, DJANGO_API_URL="http://test/")
+class DigestAdminTests(TestCase):
+
+    def setUp(self):
+        # p1 est l'admin (EMAIL_HOST_USER), en mode résumé
+        self.admin, self.personnel = [
+            Personnel.objects.create(
+                nom=f"Nom{i}", prenoms=f"Prenom{i}", grade="Technicien", specialite="Info",
+                ecole_origine="ENIT", cin=f"C{i:05d}", matricule=f"M{i:05d}", telephone="0",
+                email=f"p{i}@exemple.tn", date_affectation=date(2020, 1, 1), date_passage_grade=date(2020, 1, 1),
+            )
+            for i in (1, 2)
+        ]
+        UserPreferences.objects.filter(user=self.admin.user).update(notifications_admin="digest")
+
+    def test_un_resume_par_intervalle(self):
+        conge = self.personnel.conges.get()
+        for jour in (1, 5):
+            DemandeConge.objects.create(
+                personnel=self.personnel, conge=conge, conge_demande=1, debut_conge=date(conge.annee, 3, jour),
+            )
+        Demande.objects.create(personnel=self.personnel, type_demande="attestation")
+
+        plus_tard = timezone.now() + timedelta(minutes=1)
+        self.assertEqual(envoyer_digest(now=plus_tard), 3)
+        email = EmailSortant.objects.get()
+        self.assertEqual(email.destinataire, "p1@exemple.tn")
+        self.assertIn("M00002", email.corps_html)
+        # intervalle non écoulé : rien de plus
+        self.assertIsNone(envoyer_digest(now=plus_tard + timedelta(minutes=1)))
+        self.assertEqual(EmailSortant.objects.count(), 1)
@@ -14,7 +14,8 @@ import string
 # from datetime import timedelta
 from django.utils import timezone
 # from django.core.mail import send_mail
-from staf_manag.utils.email_utils import send_html_email
+from staf_manag.utils.email_utils import mettre_en_file
+from staf_manag.utils.conditionnel import conditionnel, validateurs_compte
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions, viewsets
@@ -90,19 +91,22 @@ class LoginWithOtpView(APIView):
 
         # autrement générer OTP ( reuse PasswordResetCode)
         code = generate_code()
-        pr_code = PasswordResetCode.objects.create(user=user, code=code)
-       # envoyer email (ton impl existante)
-        masked = mask_email(user.personnel.email)
-        send_html_email(
-            subject="Code de connexion",
-            template="reset_password_code.html",
-            context={
-                "user": user,
-                "code": code,
-                "year": timezone.now().year
-            },
-            recipient_list=user.personnel.email
-        )
+        with transaction.atomic():
+            pr_code = PasswordResetCode.objects.create(user=user, code=code)
+           # envoyer email (ton impl existante)
+            masked = mask_email(user.personnel.email)
+            # code de connexion : envoyé quelles que soient les préférences de notification
+            mettre_en_file(
+                subject="Code de connexion",
+                template="reset_password_code.html",
+                context={
+                    "user": user,
+                    "code": code,
+                    "year": timezone.now().year
+                },
+                recipient_list=user.personnel.email,
+                critique=True
+            )
 
         expire_dt = pr_code.created_at + timezone.timedelta(minutes=float(settings.PASSWORD_RESET_CODE_EXPIRATION_MINUTES))
         expire_at_ms = int(expire_dt.timestamp() * 1000)
@@ -166,7 +170,7 @@ class RequestResetCodeView(APIView):
         expire_at_ms = int(expire_at_dt.timestamp() * 1000)
 
         # envoyer email (ton impl existante)
-        send_html_email(
+        mettre_en_file(
             subject="Code de récupération",
             template="reset_password_code.html",
             context={
@@ -174,7 +178,8 @@ class RequestResetCodeView(APIView):
                 "code": code,
                 "year": timezone.now().year
             },
-            recipient_list=user.personnel.email
+            recipient_list=user.personnel.email,
+            critique=True
         )
 
         # préparer la réponse: on renvoie data utilisateur + expire_at + message + masked email
@@ -308,6 +313,7 @@ class ChangePasswordView(APIView):
 class PreferencesView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @conditionnel(validateurs_compte)
     def get(self, request):
         user = request.user
         preferences, _ = UserPreferences.objects.get_or_create(user=user)
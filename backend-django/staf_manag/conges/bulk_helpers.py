@@ -0,0 +1,285 @@
+from decimal import Decimal
+import time
+import numpy as np
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+
+from conges.models import Conge, RegleConge
+from conges.mouvements import etat_compteurs, preparer_mouvement, enregistrer_mouvements
+from staf_manag.pandas_import import parse_date
+from staf_manag.utils.conges import (
+    to_decimal, repartition_mensuelle, CATEGORIE_TECH, CATEGORIE_AUTRES, MOIS, CHAMPS_MENSUELS, champ_mensuel,
+)
+
+# champs écrits par le rollover en masse (bulk_update ne déclenche pas auto_now -> date_maj explicite)
+ROLLOVER_FIELDS = [
+    "annee",
+    "conge_restant_annee_n_2",
+    "conge_restant_annee_n_1",
+    "conge_restant_annee_courante",
+    "conge_initial",
+    "conge_exceptionnel",
+    "conge_compensatoire",
+    "conge_total",
+    *CHAMPS_MENSUELS,
+    "date_maj",
+]
+
+# champs écrits lors de l'application d'une nouvelle RegleConge
+REGLE_FIELDS = [
+    "conge_initial",
+    "conge_restant_annee_courante",
+    *CHAMPS_MENSUELS,
+    "conge_total",
+    "date_maj",
+]
+
+def conges_a_basculer(new_year: int):
+    """
+    Queryset des conges à basculer vers new_year :
+    - uniquement la ligne la plus récente (< new_year) de chaque personnel
+    - on ignore les personnels qui ont déjà une ligne pour new_year (unique_together personnel/annee)
+    """
+    derniere = (
+        Conge.objects
+        .filter(personnel=OuterRef('personnel'), annee__lt=new_year)
+        .order_by('-annee')
+        .values('pk')[:1]
+    )
+    return (
+        Conge.objects
+        .filter(annee__lt=new_year, pk=Subquery(derniere))
+        .exclude(personnel__conges__annee=new_year)
+    )
+
+def basculer_conge(conge: Conge, new_year: int, mois_courant: int, now=None):
+    """
+    Equivalent en mémoire de Conge.rollover_to_new_year() (sans save ni requête) :
+    n-1 -> n-2, courante -> n-1, puis réinitialisation de l'année courante.
+    `conge.personnel` doit être déjà chargé (select_related).
+    """
+    conge.conge_restant_annee_n_2 = to_decimal(conge.conge_restant_annee_n_1)
+    conge.conge_restant_annee_n_1 = to_decimal(conge.conge_restant_annee_courante)
+
+    conge.annee = new_year
+    conge.conge_exceptionnel = 6
+    conge.conge_compensatoire = Decimal("0.00")
+    if not conge.conge_initial:
+        conge.conge_initial = conge.get_default_conge_initial()
+    conge.conge_restant_annee_courante = to_decimal(conge.conge_initial)
+
+    date_aff = parse_date(getattr(conge.personnel, "date_affectation", None))
+    conge.conge_mensuel_restant = repartition_mensuelle(conge.conge_initial, date_aff, new_year, mois_courant)
+
+    conge.conge_total = (
+        conge.conge_restant_annee_n_2 +
+        conge.conge_restant_annee_n_1 +
+        conge.conge_restant_annee_courante
+    )
+    conge.date_maj = now or timezone.now()
+    return conge
+
+def rollover_en_masse(new_year: int, batch_size: int = 500, depuis_pk: int = 0):
+    """
+    Rollover annuel par lots : chaque lot est lu en une requête (pagination par clé sur pk),
+    recalculé en mémoire puis écrit avec un seul bulk_update dans sa propre transaction.
+    Générateur : produit (nb_lignes_du_lot, dernier_pk) après chaque lot, ce qui permet
+    à l'appelant d'enregistrer un point de reprise.
+    """
+    mois_courant = timezone.now().month
+    dernier_pk = depuis_pk or 0
+    base_qs = (
+        conges_a_basculer(new_year)
+        .select_related('personnel')
+        .only(
+            'id', 'annee', 'conge_initial', 'conge_exceptionnel', 'conge_compensatoire',
+            'conge_restant_annee_n_2', 'conge_restant_annee_n_1', 'conge_restant_annee_courante',
+            'personnel__id', 'personnel__categorie_grade', 'personnel__date_affectation',
+        )
+        .order_by('pk')
+    )
+
+    while True:
+        lot = list(base_qs.filter(pk__gt=dernier_pk)[:batch_size])
+        if not lot:
+            break
+
+        now = timezone.now()
+        avant = {}
+        for conge in lot:
+            avant[conge.pk] = etat_compteurs(conge)
+            basculer_conge(conge, new_year, mois_courant, now=now)
+
+        with transaction.atomic():
+            Conge.objects.bulk_update(lot, ROLLOVER_FIELDS, batch_size=batch_size)
+            enregistrer_mouvements(preparer_mouvement(c, avant[c.pk], 'rollover') for c in lot)
+
+        dernier_pk = lot[-1].pk
+        yield len(lot), dernier_pk
+
+def calculer_parts_mensuelles(conges_initiaux, annees_aff, mois_aff, annee: int, mois_courant: int):
+    """
+    Version vectorisée de repartition_mensuelle pour toute une population.
+    Entrées : tableaux numpy alignés (une case par conge). annees_aff = 0 si pas de date d'affectation.
+    Retourne (parts_centiemes, matrice_centiemes) : part mensuelle en centièmes de jour et la matrice
+    (n, 12) des acquisitions en centièmes, ce qui évite les arrondis flottants.
+    """
+    # arrondi ROUND_HALF_UP de conge_initial / 12 à 2 décimales, en arithmétique entière
+    parts = (np.maximum(conges_initiaux, 0) * 200 + 12) // 24
+
+    debut = np.where(annees_aff == annee, mois_aff, np.where((annees_aff > 0) & (annees_aff < annee), 1, 13))
+    mois = np.arange(1, 13)
+    masque = (mois[None, :] >= debut[:, None]) & (mois[None, :] <= mois_courant)
+    return parts, masque * parts[:, None]
+
+def acquisition_mensuelle_en_masse(as_of=None, dry_run: bool = False, batch_size: int = 500):
+    """
+    Equivalent en lot de Conge.recalculer_acquisition_mensuelle(save=True) pour tous les conges de l'année :
+    - une seule requête pour charger (id, conge_initial, date_affectation, mensuel_01..12)
+    - calcul des 12 mois de toute la population en une passe numpy
+    - écriture des seules lignes modifiées via bulk_update(fields=[...])
+    Retourne un dict de statistiques ; stats["changements"] contient le diff (id, mois, avant, après).
+    """
+    if as_of is None:
+        as_of = timezone.now().date()
+    mesures = {}
+    t0 = time.perf_counter()
+
+    lignes = list(
+        Conge.objects
+        .filter(annee=as_of.year, personnel__date_affectation__isnull=False)
+        .values_list('id', 'conge_initial', 'personnel__date_affectation', *CHAMPS_MENSUELS)
+    )
+    mesures["lecture"] = time.perf_counter() - t0
+
+    stats = {"lus": len(lignes), "modifies": 0, "changements": [], "mesures": mesures}
+    if not lignes:
+        return stats
+
+    t1 = time.perf_counter()
+    dates_aff = [parse_date(ligne[2]) for ligne in lignes]
+    parts, matrice = calculer_parts_mensuelles(
+        np.array([ligne[1] or 0 for ligne in lignes], dtype=np.int64),
+        np.array([d.year if d else 0 for d in dates_aff], dtype=np.int64),
+        np.array([d.month if d else 0 for d in dates_aff], dtype=np.int64),
+        as_of.year,
+        as_of.month,
+    )
+
+    # valeurs stockées, déjà en centièmes : pas de décodage ni d'erreur d'arrondi
+    actuel = np.array([ligne[3:] for ligne in lignes], dtype=np.int64)
+    # même court-circuit que recalculer_acquisition_mensuelle : mois courant déjà crédité -> rien à faire
+    a_traiter = actuel[:, as_of.month - 1] != parts
+    differents = a_traiter & (actuel != matrice).any(axis=1)
+    mesures["calcul"] = time.perf_counter() - t1
+
+    t2 = time.perf_counter()
+    now = timezone.now()
+    a_ecrire = []
+    for i in np.flatnonzero(differents):
+        conge_id = lignes[i][0]
+        for j in np.flatnonzero(actuel[i] != matrice[i]):
+            stats["changements"].append((conge_id, MOIS[j], actuel[i, j] / 100, matrice[i, j] / 100))
+        a_ecrire.append(Conge(id=conge_id, date_maj=now, **dict(zip(CHAMPS_MENSUELS, matrice[i].tolist()))))
+
+    if a_ecrire and not dry_run:
+        with transaction.atomic():
+            Conge.objects.bulk_update(a_ecrire, [*CHAMPS_MENSUELS, "date_maj"], batch_size=batch_size)
+    stats["modifies"] = len(a_ecrire)
+    mesures["ecriture"] = time.perf_counter() - t2
+    mesures["total"] = time.perf_counter() - t0
+    return stats
+
+def appliquer_regle_en_masse(regle: RegleConge = None, batch_size: int = 500, progress=None, as_of=None) -> dict:
+    """
+    Applique la règle (par défaut la plus récente) à tous les conges, par lots :
+    - seuls les conges dont conge_initial diffère de celui de la catégorie du grade
+      (Personnel.categorie_grade, indexé) sont lus : le filtre est fait en SQL
+    - solde courant ajusté de l'écart (nouveau - ancien), jamais négatif
+    - acquisitions mensuelles de l'année en cours recalculées en une passe numpy par lot
+    - un bulk_update (champs modifiés uniquement) par lot, dans sa propre transaction
+    progress(traites, total, modifies) est appelé après chaque lot.
+    """
+    if regle is None:
+        regle = RegleConge.objects.order_by('-date_maj').first()
+    initial_par_categorie = {
+        CATEGORIE_TECH: regle.conge_initial_tech if regle else 72,
+        CATEGORIE_AUTRES: regle.conge_initial_autres if regle else 45,
+    }
+    if as_of is None:
+        as_of = timezone.now().date()
+    a_modifier = Q()
+    for categorie, initial in initial_par_categorie.items():
+        a_modifier |= Q(personnel__categorie_grade=categorie) & ~Q(conge_initial=initial)
+
+    base_qs = (
+        Conge.objects
+        .filter(a_modifier)
+        .select_related('personnel')
+        .only(
+            'id', 'annee', 'conge_initial', 'conge_exceptionnel', 'conge_compensatoire', *CHAMPS_MENSUELS,
+            'conge_restant_annee_n_2', 'conge_restant_annee_n_1', 'conge_restant_annee_courante',
+            'personnel__id', 'personnel__categorie_grade', 'personnel__date_affectation',
+        )
+        .order_by('pk')
+    )
+    total = base_qs.count()
+    traites = modifies = 0
+    dernier_pk = 0
+
+    while True:
+        lot = list(base_qs.filter(pk__gt=dernier_pk)[:batch_size])
+        if not lot:
+            break
+
+        a_ecrire, dates_aff, avant = [], [], {}
+        for conge in lot:
+            nouveau = initial_par_categorie[conge.personnel.categorie_grade]
+            ancien = conge.conge_initial
+            if ancien == nouveau:
+                continue
+
+            avant[conge.pk] = etat_compteurs(conge)
+            conge.conge_initial = nouveau
+            conge.conge_restant_annee_courante = max(
+                Decimal("0.00"), to_decimal(nouveau + to_decimal(conge.conge_restant_annee_courante) - ancien)
+            )
+            a_ecrire.append(conge)
+            dates_aff.append(parse_date(conge.personnel.date_affectation))
+
+        # acquisitions mensuelles (mêmes règles que recalculer_acquisition_mensuelle) pour l'année en cours
+        courants = [i for i, c in enumerate(a_ecrire) if c.annee == as_of.year and dates_aff[i]]
+        if courants:
+            parts, matrice = calculer_parts_mensuelles(
+                np.array([a_ecrire[i].conge_initial or 0 for i in courants], dtype=np.int64),
+                np.array([dates_aff[i].year for i in courants], dtype=np.int64),
+                np.array([dates_aff[i].month for i in courants], dtype=np.int64),
+                as_of.year,
+                as_of.month,
+            )
+            for j, i in enumerate(courants):
+                conge = a_ecrire[i]
+                # mois courant déjà crédité de la nouvelle part -> répartition inchangée
+                if getattr(conge, champ_mensuel(as_of.month)) == parts[j]:
+                    continue
+                for champ, centiemes in zip(CHAMPS_MENSUELS, matrice[j].tolist()):
+                    setattr(conge, champ, centiemes)
+
+        now = timezone.now()
+        for conge in a_ecrire:
+            conge.recalculer_total_conges(save=False)
+            conge.date_maj = now
+
+        if a_ecrire:
+            with transaction.atomic():
+                Conge.objects.bulk_update(a_ecrire, REGLE_FIELDS, batch_size=batch_size)
+                enregistrer_mouvements(preparer_mouvement(c, avant[c.pk], 'regle') for c in a_ecrire)
+
+        traites += len(lot)
+        modifies += len(a_ecrire)
+        dernier_pk = lot[-1].pk
+        if progress:
+            progress(traites, total, modifies)
+
+    return {"lus": traites, "modifies": modifies, "total": total}
@@ -0,0 +1,71 @@
+"""
+Calendrier des absences (congés validés) sur une plage de dates.
+
+- une requête : demandes validées dont [debut_conge, fin_conge] chevauche la plage
+  (index demande_calendrier_idx sur statut, debut_conge, fin_conge), personnel joint pour les filtres
+- filtres optionnels sur grade, specialite, ecole_origine (égalité insensible à la casse)
+- occupation : nombre d'absents par jour, calculée en un passage (tableau de différences)
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+
+from conges.models import DemandeConge
+
+CALENDRIER_FIELDS = [
+    "id",
+    "personnel_id",
+    "type_demande",
+    "debut_conge",
+    "fin_conge",
+]
+
+FILTRES_PERSONNEL = ("grade", "specialite", "ecole_origine")
+
+def valider_plage(debut: date, fin: date):
+    """ValueError si la plage est vide ou dépasse CONGE_CALENDRIER_JOURS_MAX."""
+    if not debut or not fin or fin < debut:
+        raise ValueError("Plage de dates invalide")
+    limite = getattr(settings, "CONGE_CALENDRIER_JOURS_MAX", 366)
+    if (fin - debut).days + 1 > limite:
+        raise ValueError(f"Plage limitée à {limite} jours")
+
+def absences(debut: date, fin: date, **filtres) -> list:
+    """Congés validés chevauchant [debut, fin], avec nom / prénoms / matricule du personnel."""
+    qs = (
+        DemandeConge.objects.valides()
+        .chevauchant(debut, fin)
+        .filter(~Q(annule=True))
+    )
+    for champ in FILTRES_PERSONNEL:
+        valeur = filtres.get(champ)
+        if valeur:
+            qs = qs.filter(**{f"personnel__{champ}__iexact": valeur})
+
+    return list(
+        qs.order_by("debut_conge", "id").values(
+            *CALENDRIER_FIELDS,
+            matricule=F("personnel__matricule"),
+            nom=F("personnel__nom"),
+            prenoms=F("personnel__prenoms"),
+        )
+    )
+
+def occupation_par_jour(lignes: list, debut: date, fin: date) -> list:
+    """
+    [{"date", "absents"}] pour chaque jour de [debut, fin].
+    Les congés validés d'un même personnel ne se chevauchent pas (contrôle à la validation) :
+    un absent compte une fois par jour.
+    """
+    nb_jours = (fin - debut).days + 1
+    diff = [0] * (nb_jours + 1)
+    for ligne in lignes:
+        diff[max((ligne["debut_conge"] - debut).days, 0)] += 1
+        diff[min((ligne["fin_conge"] - debut).days, nb_jours - 1) + 1] -= 1
+
+    occupation, absents = [], 0
+    for k in range(nb_jours):
+        absents += diff[k]
+        occupation.append({"date": (debut + timedelta(days=k)).isoformat(), "absents": absents})
+    return occupation
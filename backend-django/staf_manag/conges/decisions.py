@@ -0,0 +1,174 @@
+"""
+Décisions en lot (validation / refus) sur des demandes de congé.
+
+- une seule transaction : demandes puis conges verrouillés par ordre de pk (ordre déterministe,
+  pas de deadlock entre deux sessions d'approbation concurrentes)
+- demandes traitées par ordre de soumission ; les débits d'un même personnel s'enchaînent en mémoire
+- conflits de période vérifiés contre les congés déjà validés (une requête) et ceux validés dans le lot
+- écritures en bulk_update + mouvements du journal, emails mis en file (EmailSortant) dans la transaction, envoyés après commit
+- résultat par demande, dans l'ordre des ids reçus
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from conges.models import Conge, DemandeConge
+from conges.mouvements import etat_compteurs, preparer_mouvement, enregistrer_mouvements
+from staf_manag.utils.conges import to_decimal, CHAMPS_MENSUELS
+from staf_manag.utils.email_utils import mettre_en_file
+
+DECISIONS = ("valider", "refuser")
+
+# champs du Conge modifiés par un débit
+DEBIT_FIELDS = [
+    "conge_restant_annee_n_2",
+    "conge_restant_annee_n_1",
+    "conge_restant_annee_courante",
+    "conge_exceptionnel",
+    "conge_compensatoire",
+    "conge_total",
+    *CHAMPS_MENSUELS,
+    "date_maj",
+]
+
+def _messages(e: DjangoValidationError) -> str:
+    if hasattr(e, 'message_dict'):
+        return " | ".join(str(m) for v in e.message_dict.values() for m in (v if isinstance(v, (list, tuple)) else [v]))
+    return " | ".join(str(m) for m in e.messages)
+
+def _controle_commun(demande: DemandeConge, decision: str):
+    if demande.annule:
+        return "Demande annulée par l'utilisateur."
+    if decision == "valider" and demande.statut == 'valide':
+        return "Congé deja validé."
+    if decision == "valider" and demande.statut != 'en_attente':
+        return "Vous ne pouvez valider que les demandes en attente."
+    if decision == "refuser" and demande.statut == 'refuse':
+        return "Congé deja refusé."
+    if demande.is_locked():
+        return "Délai de modification expiré."
+    return None
+
+def _conflit_periode(demande: DemandeConge, valides: list):
+    """valides : [(debut, fin, annee, periode)] du personnel, base + lot courant."""
+    fin = demande.fin_conge
+    if not fin:
+        return "Période de congé incomplète."
+    for debut_v, fin_v, annee_v, periode_v in valides:
+        if annee_v == demande.annee and fin_v and fin_v > fin:
+            return f"Impossible de valider cette demande de congé car une demande plus récente {periode_v} a déjà été validée."
+    for debut_v, fin_v, annee_v, periode_v in valides:
+        if debut_v and fin_v and debut_v <= fin and fin_v >= demande.debut_conge:
+            return f"Impossible de valider cette demande de congé car elle chevauche le congé validé {periode_v}."
+    return None
+
+def decider_en_masse(ids: list, decision: str, motif: str = "", user=None) -> list:
+    """Valide ou refuse les demandes `ids` ; retourne [{"id", "statut", "detail"}] dans l'ordre des ids."""
+    if decision not in DECISIONS:
+        raise ValueError(f"Décision inconnue: {decision}")
+    limite = getattr(settings, "CONGE_DECISIONS_MAX", 500)
+    if len(ids) > limite:
+        raise ValueError(f"Au plus {limite} demandes par lot.")
+
+    resultats = {pk: {"id": pk, "statut": "erreur", "detail": "Demande introuvable."} for pk in ids}
+    a_notifier = []
+
+    with transaction.atomic():
+        demandes = list(
+            DemandeConge.objects.select_for_update(of=("self",))
+            .select_related('personnel')
+            .filter(pk__in=ids)
+            .order_by('pk')
+        )
+        conges = {
+            c.pk: c
+            for c in Conge.objects.select_for_update().filter(pk__in={d.conge_id for d in demandes}).order_by('pk')
+        }
+
+        valides = defaultdict(list)
+        if decision == "valider":
+            for ligne in (
+                DemandeConge.objects.valides()
+                .filter(personnel_id__in={d.personnel_id for d in demandes})
+                .exclude(pk__in=ids)
+                .values_list('personnel_id', 'debut_conge', 'fin_conge', 'annee', 'periode')
+            ):
+                valides[ligne[0]].append(ligne[1:])
+
+        now = timezone.now()
+        demandes_modifiees, conges_modifies, mouvements = [], {}, []
+        for demande in sorted(demandes, key=lambda d: (d.date_soumission, d.pk)):
+            erreur = _controle_commun(demande, decision)
+            if erreur is None and decision == "valider":
+                erreur = _conflit_periode(demande, valides[demande.personnel_id])
+
+            if erreur is None and decision == "valider":
+                demande_jours = to_decimal(demande.conge_demande or 0)
+                conge = conges[demande.conge_id]
+                avant = etat_compteurs(conge)
+                try:
+                    if demande_jours <= Decimal('0.00'):
+                        raise DjangoValidationError({'conge_demande': 'Le nombre de jours demandé doit être supérieur a 0'})
+                    conge.debiter_demande(demande_jours, demande.type_demande, demande.debut_conge)
+                except DjangoValidationError as e:
+                    erreur = _messages(e)
+                else:
+                    conge.recalculer_total_conges(save=False)
+                    conge.date_maj = now
+                    conges_modifies[conge.pk] = conge
+                    mouvements.append(preparer_mouvement(conge, avant, 'validation', demande=demande, cree_par=user))
+                    valides[demande.personnel_id].append(
+                        (demande.debut_conge, demande.fin_conge, demande.annee, demande.periode)
+                    )
+                    demande.statut = 'valide'
+                    demande.date_validation = now
+
+            elif erreur is None:
+                demande.statut = 'refuse'
+                demande.date_annulation = now
+
+            if erreur:
+                resultats[demande.pk] = {"id": demande.pk, "statut": "erreur", "detail": erreur}
+                continue
+
+            demande.date_maj = now
+            demandes_modifiees.append(demande)
+            resultats[demande.pk] = {"id": demande.pk, "statut": demande.statut, "detail": ""}
+            a_notifier.append(demande)
+
+        if demandes_modifiees:
+            DemandeConge.objects.bulk_update(
+                demandes_modifiees, ['statut', 'date_validation', 'date_annulation', 'date_maj'], batch_size=500
+            )
+        if conges_modifies:
+            Conge.objects.bulk_update(list(conges_modifies.values()), DEBIT_FIELDS, batch_size=500)
+        enregistrer_mouvements(mouvements)
+
+        for demande in a_notifier:
+            _notifier(demande, motif)
+
+    return [resultats[pk] for pk in ids]
+
+def _notifier(demande: DemandeConge, motif: str = ""):
+    """Email de décision à l'agent, mis en file dans la transaction (mêmes templates que valider / refuser)."""
+    to_mail = demande.personnel.email or None
+    if not to_mail or not demande.periode:
+        return
+    date_debut, date_retour = demande.periode.split(" - ")
+    context = {
+        "conge": demande,
+        "user": demande,
+        "year": timezone.now().year,
+        "lien_espace": settings.DJANGO_API_URL + "login",
+        "date_retour": date_retour,
+        "date_debut": date_debut,
+    }
+    if demande.statut == 'valide':
+        mettre_en_file("Demande de conge validée", "conge_valide.html", context, to_mail)
+    else:
+        context["motif"] = motif or "Raisons techniques."
+        mettre_en_file("Demande de congé refusée", "conge_refuse.html", context, to_mail)
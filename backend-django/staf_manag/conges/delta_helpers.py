@@ -0,0 +1,133 @@
+"""
+Export incrémental (delta) des conges et demandes de congé, basé sur date_maj.
+
+- premier appel : ?depuis=<watermark> (absent = tout l'historique)
+- la borne haute est figée au premier appel (now() - CONGE_DELTA_MARGE_SECONDES) pour ne pas
+  rater les transactions encore en cours, puis transportée dans le curseur
+- pages suivantes : ?curseur=<curseur_suivant> (pagination par clé (date_maj, id), index dédié)
+- quand "complet" est vrai, le client enregistre "watermark" et le renvoie dans ?depuis= au prochain sync
+- date_maj est l'heure de l'écriture, pas du commit : la marge doit dépasser la plus longue transaction
+  d'écriture des conges / demandes (lots du rollover et des règles, acquisition mensuelle), sinon des lignes
+  validées après coup passent sous un watermark déjà rendu
+- les lignes supprimées n'apparaissent pas dans le delta (export complet périodique côté client)
+"""
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from conges.models import Conge, DemandeConge
+from staf_manag.utils.conges import CHAMPS_MENSUELS
+
+DELTA_CONGE_FIELDS = [
+    "id",
+    "personnel_id",
+    "annee",
+    "conge_restant_annee_n_2",
+    "conge_restant_annee_n_1",
+    "conge_restant_annee_courante",
+    "conge_initial",
+    "conge_total",
+    "conge_exceptionnel",
+    "conge_compensatoire",
+    *CHAMPS_MENSUELS,  # centièmes de jour
+    "date_maj",
+]
+
+DELTA_DEMANDE_FIELDS = [
+    "id",
+    "personnel_id",
+    "conge_id",
+    "annee",
+    "type_demande",
+    "conge_demande",
+    "debut_conge",
+    "periode",
+    "fin_conge",
+    "statut",
+    "annule",
+    "date_soumission",
+    "date_validation",
+    "date_annulation",
+    "date_maj",
+]
+
+DELTA_SOURCES = {
+    "conges": (Conge, DELTA_CONGE_FIELDS),
+    "demandes": (DemandeConge, DELTA_DEMANDE_FIELDS),
+}
+
+def parse_watermark(valeur: str):
+    """Date ISO 8601 -> datetime aware ; ValueError si invalide."""
+    dt = parse_datetime(valeur or "")
+    if dt is None:
+        raise ValueError(f"Date invalide: {valeur}")
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+def encode_curseur(source: str, date_maj, pk: int, borne) -> str:
+    brut = json.dumps({"s": source, "d": date_maj.isoformat(), "i": pk, "b": borne.isoformat()})
+    return base64.urlsafe_b64encode(brut.encode()).decode()
+
+def decode_curseur(curseur: str) -> dict:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(curseur.encode()).decode())
+        return {
+            "source": data["s"],
+            "date_maj": parse_watermark(data["d"]),
+            "pk": int(data["i"]),
+            "borne": parse_watermark(data["b"]),
+        }
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Curseur invalide")
+
+def page_delta(source: str, depuis=None, curseur: str = None, limite: int = 500) -> dict:
+    """
+    Une page de lignes modifiées, triées par (date_maj, id).
+    Retourne {results, curseur_suivant, complet, watermark}.
+    """
+    if source not in DELTA_SOURCES:
+        raise ValueError(f"Source inconnue: {source}")
+    model, fields = DELTA_SOURCES[source]
+    limite = max(1, min(limite, getattr(settings, "CONGE_DELTA_LIMITE_MAX", 1000)))
+
+    qs = model.objects.all()
+    if curseur:
+        position = decode_curseur(curseur)
+        if position["source"] != source:
+            raise ValueError("Curseur d'une autre source")
+        borne = position["borne"]
+        qs = qs.filter(
+            Q(date_maj__gt=position["date_maj"]) |
+            Q(date_maj=position["date_maj"], id__gt=position["pk"])
+        )
+    else:
+        borne = timezone.now() - timedelta(seconds=getattr(settings, "CONGE_DELTA_MARGE_SECONDES", 300))
+        if depuis is not None:
+            qs = qs.filter(date_maj__gt=depuis)
+
+    lignes = list(
+        qs.filter(date_maj__lte=borne)
+        .order_by("date_maj", "id")
+        .values(*fields, matricule=F("personnel__matricule"))[:limite + 1]
+    )
+    complet = len(lignes) <= limite
+    lignes = lignes[:limite]
+
+    curseur_suivant = None
+    if not complet:
+        dernier = lignes[-1]
+        curseur_suivant = encode_curseur(source, dernier["date_maj"], dernier["id"], borne)
+
+    return {
+        "results": lignes,
+        "curseur_suivant": curseur_suivant,
+        "complet": complet,
+        # à enregistrer par le client une fois "complet" atteint
+        "watermark": borne.isoformat(),
+    }
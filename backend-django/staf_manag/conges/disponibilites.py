@@ -0,0 +1,121 @@
+"""
+Solde disponible d'un Conge, mois par mois (read model précalculé).
+
+- standard[m] : reliquats n-2 + n-1 + acquisitions de janvier au mois m inclus
+- exceptionnel / compensatoire : soldes courants
+- un calcul par Conge, mis en cache sous une clé versionnée par date_maj :
+  toute écriture du Conge (save, bulk_update, import, règle, rollover) change date_maj,
+  l'ancienne entrée n'est plus lue et expire d'elle-même (CONGE_DISPONIBLE_CACHE_TTL)
+- partagé par la validation du formulaire, DemandeConge.valider et l'endpoint /conges/disponibilites/
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+
+from staf_manag.utils.conges import to_decimal, depuis_centiemes, MOIS, CHAMPS_MENSUELS
+
+# champs du Conge nécessaires au calcul (pour .only())
+DISPONIBLE_FIELDS = [
+    "id",
+    "personnel_id",
+    "annee",
+    "conge_restant_annee_n_2",
+    "conge_restant_annee_n_1",
+    "conge_exceptionnel",
+    "conge_compensatoire",
+    *CHAMPS_MENSUELS,
+    "date_maj",
+]
+
+@dataclass(frozen=True)
+class Disponibilite:
+    conge_id: int
+    personnel_id: int
+    annee: int
+    standard: tuple  # 12 Decimal, disponible cumulé à la fin de chaque mois
+    exceptionnel: Decimal
+    compensatoire: Decimal
+    date_maj: datetime
+
+    def standard_au_mois(self, mois: int) -> Decimal:
+        return self.standard[min(max(int(mois), 1), 12) - 1]
+
+    def pour_type(self, type_demande: str, mois: int = 12) -> Decimal:
+        """Jours disponibles pour un type de demande (standard : acquis jusqu'au mois donné)."""
+        if type_demande == 'exceptionnel':
+            return self.exceptionnel
+        if type_demande == 'compensatoire':
+            return self.compensatoire
+        return self.standard_au_mois(mois)
+
+    def as_dict(self) -> dict:
+        return {
+            "conge_id": self.conge_id,
+            "personnel_id": self.personnel_id,
+            "annee": self.annee,
+            "standard": {mois: float(v) for mois, v in zip(MOIS, self.standard)},
+            "exceptionnel": float(self.exceptionnel),
+            "compensatoire": float(self.compensatoire),
+            "date_maj": self.date_maj.isoformat() if self.date_maj else None,
+        }
+
+def calculer_disponibilite(conge) -> Disponibilite:
+    """Calcul pur depuis l'état en mémoire du Conge (aucune requête, pas de cache)."""
+    cumul = to_decimal(conge.conge_restant_annee_n_2) + to_decimal(conge.conge_restant_annee_n_1)
+    standard = []
+    for champ in CHAMPS_MENSUELS:
+        cumul += depuis_centiemes(getattr(conge, champ))
+        standard.append(cumul)
+    return Disponibilite(
+        conge_id=conge.pk,
+        personnel_id=conge.personnel_id,
+        annee=conge.annee,
+        standard=tuple(standard),
+        exceptionnel=to_decimal(conge.conge_exceptionnel),
+        compensatoire=to_decimal(conge.conge_compensatoire),
+        date_maj=conge.date_maj,
+    )
+
+def _cle(conge_id, date_maj) -> str:
+    version = date_maj.timestamp() if date_maj else 0
+    return f"conges:disponible:{conge_id}:{version}"
+
+def _ttl() -> int:
+    return getattr(settings, "CONGE_DISPONIBLE_CACHE_TTL", 86400)
+
+def disponibilite(conge) -> Disponibilite:
+    """Disponibilité d'un Conge chargé depuis la base (cache lu puis rempli si absent)."""
+    if conge.pk is None:
+        return calculer_disponibilite(conge)
+    cle = _cle(conge.pk, conge.date_maj)
+    dispo = cache.get(cle)
+    if dispo is None:
+        dispo = calculer_disponibilite(conge)
+        cache.set(cle, dispo, _ttl())
+    return dispo
+
+def disponibilites(conges_qs) -> list:
+    """
+    Disponibilités de plusieurs Conge : une requête légère (id, date_maj) + un get_many,
+    les lignes absentes du cache sont chargées en une seule requête puis mises en cache.
+    """
+    versions = list(conges_qs.values_list("id", "date_maj"))
+    cles = {pk: _cle(pk, date_maj) for pk, date_maj in versions}
+    en_cache = cache.get_many(list(cles.values()))
+
+    resultats = {pk: en_cache[cle] for pk, cle in cles.items() if cle in en_cache}
+    manquants = [pk for pk in cles if pk not in resultats]
+    if manquants:
+        from conges.models import Conge
+
+        nouveaux = {}
+        for conge in Conge.objects.filter(pk__in=manquants).only(*DISPONIBLE_FIELDS):
+            dispo = calculer_disponibilite(conge)
+            resultats[conge.pk] = dispo
+            nouveaux[_cle(conge.pk, conge.date_maj)] = dispo
+        cache.set_many(nouveaux, _ttl())
+
+    return [resultats[pk] for pk, _ in versions if pk in resultats]
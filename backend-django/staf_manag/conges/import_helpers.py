@@ -0,0 +1,121 @@
+from django.db import transaction
+from django.utils import timezone
+import pandas as pd
+
+from conges.models import Conge, MouvementConge
+from conges.mouvements import ETAT_VIDE, etat_compteurs, preparer_mouvement, enregistrer_mouvements
+from personnel.models import Personnel
+from staf_manag.utils.conges import to_decimal, COL_MAP, detect_header_row, safe_value, normalize, get_col
+
+IMPORT_FIELDS = [
+    "conge_restant_annee_n_2",
+    "conge_restant_annee_n_1",
+    "conge_restant_annee_courante",
+    "conge_compensatoire",
+    "conge_exceptionnel",
+    "conge_total",
+    "date_maj",
+]
+
+def lire_feuille_conges(fichier) -> pd.DataFrame:
+    """
+    Lit le classeur une seule fois (header=None), détecte la ligne d'en-tête
+    puis reconstruit le DataFrame avec les colonnes normalisées.
+    """
+    df_row = pd.read_excel(fichier, header=None)
+    header_now = detect_header_row(df_row)
+
+    df = df_row.iloc[header_now + 1:].reset_index(drop=True)
+    df.columns = [normalize(col) for col in df_row.iloc[header_now]]
+    return df
+
+def import_conges_df(df: pd.DataFrame, annee: int = None) -> list:
+    """
+    Applique les soldes du DataFrame aux conges de `annee` en un nombre fixe de requêtes :
+    - 1 requête matricule__in pour résoudre les personnels
+    - 1 requête pour charger les conges existants
+    - bulk_create des conges manquants (conflits ignorés) puis bulk_update des soldes, dans une seule transaction
+    - mouvements 'import' (journal) insérés en lot dans la même transaction
+    Retourne les logs (mêmes messages que l'import ligne par ligne).
+    """
+    if annee is None:
+        annee = timezone.now().year
+
+    lignes = []
+    for _, row in df.iterrows():
+        matricule = get_col(row, COL_MAP["matricule"])
+        if not matricule or pd.isna(matricule):
+            continue
+        lignes.append((
+            str(matricule).strip(),
+            get_col(row, COL_MAP["reste_n_2"]),
+            get_col(row, COL_MAP["reste_n_1"]),
+            get_col(row, COL_MAP["reste_n"]),
+            get_col(row, COL_MAP["compensation"]),
+            get_col(row, COL_MAP["exceptionnel"]),
+        ))
+
+    logs = []
+    if not lignes:
+        return logs
+
+    personnels = dict(
+        Personnel.objects
+        .filter(matricule__in={l[0] for l in lignes})
+        .values_list('matricule', 'id')
+    )
+
+    with transaction.atomic():
+        conges = {
+            c.personnel_id: c
+            for c in Conge.objects.select_for_update().filter(personnel_id__in=personnels.values(), annee=annee)
+        }
+
+        manquants = [
+            Conge(personnel_id=pid, annee=annee)
+            for pid in set(personnels.values()) - set(conges)
+        ]
+        if manquants:
+            # un import concurrent peut créer les mêmes (personnel, annee) : conflit ignoré, la ligne est relue
+            Conge.objects.bulk_create(manquants, ignore_conflicts=True)
+            # recharger pour récupérer les pk (pas renvoyés avec ignore_conflicts)
+            crees = list(
+                Conge.objects.select_for_update()
+                .filter(personnel_id__in=[c.personnel_id for c in manquants], annee=annee)
+            )
+            conges.update({c.personnel_id: c for c in crees})
+            # bulk_create ne passe pas par post_save : ouverture du journal ici,
+            # sauf pour les conges créés (et déjà ouverts) par l'autre transaction
+            ouverts = set(
+                MouvementConge.objects.filter(conge__in=crees, type_mouvement='ouverture')
+                .values_list('conge_id', flat=True)
+            )
+            enregistrer_mouvements(preparer_mouvement(c, ETAT_VIDE, 'ouverture') for c in crees if c.pk not in ouverts)
+
+        modifies = {}
+        avant = {}
+        now = timezone.now()
+        for matricule, reste_n_2, reste_n_1, reste_n, compensation, exceptionnel in lignes:
+            pid = personnels.get(matricule)
+            if pid is None:
+                logs.append(f"Matricule {matricule} introuvable.")
+                continue
+
+            conge = conges[pid]
+            avant.setdefault(conge.pk, etat_compteurs(conge))
+            conge.conge_restant_annee_n_2 = to_decimal(safe_value(reste_n_2, conge.conge_restant_annee_n_2))
+            conge.conge_restant_annee_n_1 = to_decimal(safe_value(reste_n_1, conge.conge_restant_annee_n_1))
+            conge.conge_restant_annee_courante = to_decimal(safe_value(reste_n, conge.conge_restant_annee_courante))
+            conge.conge_compensatoire = to_decimal(safe_value(compensation, conge.conge_compensatoire))
+            conge.conge_exceptionnel = int(to_decimal(safe_value(exceptionnel, conge.conge_exceptionnel)))
+
+            conge.recalculer_total_conges(save=False)
+            conge.date_maj = now
+            modifies[conge.pk] = conge
+            logs.append(f"Congé de {matricule} pour l'annee {conge.annee} mis à jour avec success.")
+
+        if modifies:
+            Conge.objects.bulk_update(list(modifies.values()), IMPORT_FIELDS, batch_size=500)
+            enregistrer_mouvements(preparer_mouvement(c, avant[pk], 'import') for pk, c in modifies.items())
+
+    return logs
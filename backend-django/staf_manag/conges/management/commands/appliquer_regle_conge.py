@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+import time
+from conges.models import RegleConge
+from conges.regle_jobs import executer_application
+
+class Command(BaseCommand):
+    help = "Applique aux conges les règles de congé en attente (worker hors process web)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Nombre de conges traités par lot")
+        parser.add_argument('--forcer', action='store_true', help="Réapplique la règle courante même si elle est déjà appliquée")
+
+    def handle(self, *args, **options):
+        if options['forcer']:
+            regle = RegleConge.objects.order_by('-date_maj').first()
+            if regle:
+                RegleConge.objects.filter(pk=regle.pk).update(statut_application='en_attente')
+
+        ids = list(RegleConge.objects.filter(statut_application='en_attente').order_by('date_maj').values_list('id', flat=True))
+        for regle_id in ids:
+            debut = time.perf_counter()
+            if executer_application(regle_id, batch_size=max(1, options['batch_size'])):
+                regle = RegleConge.objects.get(pk=regle_id)
+                self.stdout.write(self.style.SUCCESS(
+                    f"Règle #{regle.pk} {regle.statut_application}: {regle.conges_modifies} conge(s) modifié(s) "
+                    f"sur {regle.conges_traites} en {time.perf_counter() - debut:.2f}s"
+                ))
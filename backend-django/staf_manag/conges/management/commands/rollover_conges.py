@@ -1,19 +1,69 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
+from pathlib import Path
 import time
 from conges.models import Conge, DemandeConge
+from conges.bulk_helpers import rollover_en_masse
+from conges.mouvements import etat_compteurs, enregistrer_mouvement
 
 class Command(BaseCommand):
     help = "Rollover annuel des congés (01 janvier UTC)"
 
+    def add_arguments(self, parser):
+        parser.add_argument('--annee', type=int, default=None, help="Année cible (par défaut l'année courante)")
+        parser.add_argument('--batch-size', type=int, default=500, help="Nombre de conges traités par lot")
+        parser.add_argument(
+            '--checkpoint', type=str, default=None,
+            help="Fichier de point de reprise (dernier id traité). Relancer avec le même fichier reprend après ce lot."
+        )
+        parser.add_argument('--unitaire', action='store_true', help="Ancien mode ligne par ligne (rollover_to_new_year)")
+
     def handle(self, *args, **options):
         # year = 2028
-        year = timezone.now().year
+        year = options['annee'] or timezone.now().year
+
+        if options['unitaire']:
+            return self.rollover_unitaire(year)
+
+        batch_size = max(1, options['batch_size'])
+        checkpoint = Path(options['checkpoint']) if options['checkpoint'] else None
+
+        depuis_pk = 0
+        if checkpoint and checkpoint.exists():
+            try:
+                depuis_pk = int(checkpoint.read_text().strip() or 0)
+                self.stdout.write(f"Reprise après le conge id={depuis_pk}")
+            except ValueError:
+                self.stderr.write(f"Point de reprise illisible ({checkpoint}), on repart du début")
+
+        count = 0
+        debut = time.perf_counter()
+        for nb, dernier_pk in rollover_en_masse(year, batch_size=batch_size, depuis_pk=depuis_pk):
+            count += nb
+            if checkpoint:
+                checkpoint.write_text(str(dernier_pk))
+            ecoule = time.perf_counter() - debut
+            self.stdout.write(
+                f"  lot de {nb} conge(s) jusqu'à id={dernier_pk} - {count} au total ({count / ecoule:.0f} lignes/s)"
+            )
+
+        ecoule = time.perf_counter() - debut
+        if checkpoint and checkpoint.exists():
+            checkpoint.unlink()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{count} conge(s) mis à jour pour l'annee {year} en {ecoule:.2f}s"
+            + (f" ({count / ecoule:.0f} lignes/s)" if count and ecoule > 0 else "")
+        ))
+
+    def rollover_unitaire(self, year):
         count = 0
 
         for conge in Conge.objects.all():
             if conge.annee < year:
+                avant = etat_compteurs(conge)
                 conge.rollover_to_new_year(year)
+                enregistrer_mouvement(conge, avant, 'rollover')
                 count += 1
 
         if count > 0:
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from datetime import timedelta
+import time
+from conges.mouvements import snapshot_soldes
+from staf_manag.pandas_import import parse_date
+
+class Command(BaseCommand):
+    help = "Fige les soldes de congés (journal des mouvements) à une date, par défaut le dernier jour du mois précédent"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=str, default=None, help="Date du snapshot (YYYY-MM-DD)")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            jour = parse_date(options['date']) if options['date'] else None
+        except ValueError as e:
+            raise CommandError(str(e))
+        if jour is None:
+            jour = timezone.localdate().replace(day=1) - timedelta(days=1)
+
+        debut = time.perf_counter()
+        nb = snapshot_soldes(jour, batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(
+            f"{nb} solde(s) figé(s) au {jour:%d/%m/%Y} en {time.perf_counter() - debut:.2f}s"
+        ))
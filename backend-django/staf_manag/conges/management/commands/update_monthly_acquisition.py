@@ -2,18 +2,41 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from conges.models import Conge
+from conges.bulk_helpers import acquisition_mensuelle_en_masse
 
 class Command(BaseCommand):
     help = "Mise à jour mensuelle des congés acquis"
 
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Affiche le diff sans rien écrire en base")
+        parser.add_argument('--batch-size', type=int, default=500, help="Taille des lots du bulk_update")
+        parser.add_argument('--unitaire', action='store_true', help="Ancien mode ligne par ligne (recalculer_acquisition_mensuelle)")
+
     def handle(self, *args, **options):
         today = timezone.now().date()
-        count = 0
 
-        for conge in Conge.objects.filter(annee=today.year):
-            conge.recalculer_acquisition_mensuelle(as_of=today, save=True)
-            count += 1
+        if options['unitaire']:
+            count = 0
+            for conge in Conge.objects.filter(annee=today.year):
+                conge.recalculer_acquisition_mensuelle(as_of=today, save=True)
+                count += 1
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{count} congé(s) mensuels mis à jour"
+            ))
+            return
+
+        dry_run = options['dry_run']
+        stats = acquisition_mensuelle_en_masse(as_of=today, dry_run=dry_run, batch_size=max(1, options['batch_size']))
+
+        if dry_run:
+            for conge_id, mois, avant, apres in stats["changements"]:
+                self.stdout.write(f"  conge {conge_id} mois {mois}: {avant:.2f} -> {apres:.2f}")
 
+        mesures = stats["mesures"]
+        self.stdout.write(
+            "Temps: " + ", ".join(f"{etape} {duree * 1000:.1f} ms" for etape, duree in mesures.items())
+        )
         self.stdout.write(self.style.SUCCESS(
-            f"{count} congé(s) mensuels mis à jour"
+            f"{stats['modifies']} congé(s) mensuels {'à mettre' if dry_run else 'mis'} à jour sur {stats['lus']} lu(s)"
         ))
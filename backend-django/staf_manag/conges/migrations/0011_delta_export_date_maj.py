@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("conges", "0010_remove_conge_quota_mensuel"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="demandeconge",
+            name="date_maj",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="conge",
+            index=models.Index(fields=["date_maj", "id"], name="conge_date_maj_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="demandeconge",
+            index=models.Index(fields=["date_maj", "id"], name="demande_date_maj_id_idx"),
+        ),
+    ]
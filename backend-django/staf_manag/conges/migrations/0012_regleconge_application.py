@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+
+def marquer_regles_existantes(apps, schema_editor):
+    # les règles existantes ont déjà été appliquées par l'ancien signal synchrone
+    RegleConge = apps.get_model("conges", "RegleConge")
+    RegleConge.objects.update(statut_application="termine")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("conges", "0011_delta_export_date_maj"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="regleconge",
+            name="statut_application",
+            field=models.CharField(
+                choices=[
+                    ("en_attente", "En attente"),
+                    ("en_cours", "En cours"),
+                    ("termine", "Terminé"),
+                    ("echec", "Échec"),
+                ],
+                default="en_attente",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="regleconge",
+            name="conges_a_traiter",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="regleconge",
+            name="conges_traites",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="regleconge",
+            name="conges_modifies",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="regleconge",
+            name="date_application",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(marquer_regles_existantes, migrations.RunPython.noop),
+    ]
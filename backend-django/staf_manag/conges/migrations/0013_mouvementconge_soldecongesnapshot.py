@@ -0,0 +1,153 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def ouvrir_journal(apps, schema_editor):
+    # un mouvement d'ouverture par conge existant, avec ses soldes actuels
+    Conge = apps.get_model("conges", "Conge")
+    MouvementConge = apps.get_model("conges", "MouvementConge")
+    aujourd_hui = timezone.localdate()
+    lot = []
+    for conge in Conge.objects.order_by("pk").iterator(chunk_size=1000):
+        lot.append(MouvementConge(
+            conge_id=conge.pk,
+            personnel_id=conge.personnel_id,
+            annee=conge.annee,
+            type_mouvement="ouverture",
+            date_effet=aujourd_hui,
+            motif="Reprise des soldes existants",
+            delta_n_2=conge.conge_restant_annee_n_2,
+            delta_n_1=conge.conge_restant_annee_n_1,
+            delta_courante=conge.conge_restant_annee_courante,
+            delta_exceptionnel=conge.conge_exceptionnel,
+            # nom de la colonne à ce stade des migrations (renommée en 0018)
+            delta_compensatoire=conge.conge_compasatoire,
+        ))
+        if len(lot) >= 1000:
+            MouvementConge.objects.bulk_create(lot)
+            lot = []
+    if lot:
+        MouvementConge.objects.bulk_create(lot)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("conges", "0012_regleconge_application"),
+        ("personnel", "0010_personnel_categorie_grade"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MouvementConge",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("annee", models.IntegerField()),
+                (
+                    "type_mouvement",
+                    models.CharField(
+                        choices=[
+                            ("ouverture", "Ouverture de solde"),
+                            ("acquisition", "Acquisition"),
+                            ("validation", "Validation de demande"),
+                            ("import", "Import"),
+                            ("ajustement", "Ajustement manuel"),
+                            ("rollover", "Rollover annuel"),
+                            ("regle", "Nouvelle règle de congé"),
+                            ("grade", "Changement de grade"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("date_effet", models.DateField()),
+                ("date_creation", models.DateTimeField(auto_now_add=True)),
+                ("motif", models.CharField(blank=True, default="", max_length=255)),
+                ("delta_n_2", models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ("delta_n_1", models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ("delta_courante", models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ("delta_exceptionnel", models.IntegerField(default=0)),
+                ("delta_compensatoire", models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                (
+                    "conge",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="mouvements", to="conges.conge"
+                    ),
+                ),
+                (
+                    "cree_par",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="mouvements_conges",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "demande",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="mouvements",
+                        to="conges.demandeconge",
+                    ),
+                ),
+                (
+                    "personnel",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="mouvements_conges",
+                        to="personnel.personnel",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["date_effet", "id"],
+                "indexes": [
+                    models.Index(fields=["conge", "date_effet", "id"], name="mvt_conge_date_idx"),
+                    models.Index(fields=["personnel", "date_effet"], name="mvt_personnel_date_idx"),
+                    models.Index(fields=["type_mouvement", "date_effet"], name="mvt_type_date_idx"),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="SoldeCongeSnapshot",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("date_snapshot", models.DateField()),
+                ("conge_restant_annee_n_2", models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ("conge_restant_annee_n_1", models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ("conge_restant_annee_courante", models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ("conge_exceptionnel", models.IntegerField(default=0)),
+                ("conge_compensatoire", models.DecimalField(decimal_places=2, default=0, max_digits=6)),
+                ("date_creation", models.DateTimeField(auto_now_add=True)),
+                (
+                    "conge",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="snapshots", to="conges.conge"
+                    ),
+                ),
+                (
+                    "personnel",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshots_conges",
+                        to="personnel.personnel",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-date_snapshot"],
+                "constraints": [
+                    models.UniqueConstraint(fields=("conge", "date_snapshot"), name="snapshot_conge_date_unique"),
+                ],
+            },
+        ),
+        migrations.RunPython(ouvrir_journal, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:00
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+MOIS = [f"{m:02d}" for m in range(1, 13)]
+
+
+def _centiemes(valeur):
+    try:
+        return int((Decimal(str(valeur or 0)) * 100).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+    except Exception:
+        return 0
+
+
+def json_vers_colonnes(apps, schema_editor):
+    Conge = apps.get_model("conges", "Conge")
+    champs = [f"mensuel_{mois}" for mois in MOIS]
+    lot = []
+    for conge in Conge.objects.only("id", "conge_mensuel_restant").iterator(chunk_size=1000):
+        mensuel = conge.conge_mensuel_restant or {}
+        for mois in MOIS:
+            setattr(conge, f"mensuel_{mois}", _centiemes(mensuel.get(mois)))
+        lot.append(conge)
+        if len(lot) >= 1000:
+            Conge.objects.bulk_update(lot, champs)
+            lot = []
+    if lot:
+        Conge.objects.bulk_update(lot, champs)
+
+
+def colonnes_vers_json(apps, schema_editor):
+    Conge = apps.get_model("conges", "Conge")
+    lot = []
+    for conge in Conge.objects.iterator(chunk_size=1000):
+        conge.conge_mensuel_restant = {
+            mois: float(Decimal(getattr(conge, f"mensuel_{mois}")) / 100) for mois in MOIS
+        }
+        lot.append(conge)
+        if len(lot) >= 1000:
+            Conge.objects.bulk_update(lot, ["conge_mensuel_restant"])
+            lot = []
+    if lot:
+        Conge.objects.bulk_update(lot, ["conge_mensuel_restant"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("conges", "0013_mouvementconge_soldecongesnapshot"),
+    ]
+
+    operations = [
+        *[
+            migrations.AddField(
+                model_name="conge",
+                name=f"mensuel_{mois}",
+                field=models.IntegerField(default=0),
+            )
+            for mois in MOIS
+        ],
+        migrations.RunPython(json_vers_colonnes, colonnes_vers_json),
+        migrations.RemoveField(
+            model_name="conge",
+            name="conge_mensuel_restant",
+        ),
+    ]
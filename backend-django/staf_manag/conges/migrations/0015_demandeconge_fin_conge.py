@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:30
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def remplir_fin_conge(apps, schema_editor):
+    DemandeConge = apps.get_model("conges", "DemandeConge")
+    lot = []
+    demandes = (
+        DemandeConge.objects
+        .filter(debut_conge__isnull=False, conge_demande__gt=0)
+        .only("id", "debut_conge", "conge_demande")
+    )
+    for demande in demandes.iterator(chunk_size=1000):
+        demande.fin_conge = demande.debut_conge + timedelta(days=demande.conge_demande - 1)
+        lot.append(demande)
+        if len(lot) >= 1000:
+            DemandeConge.objects.bulk_update(lot, ["fin_conge"])
+            lot = []
+    if lot:
+        DemandeConge.objects.bulk_update(lot, ["fin_conge"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("conges", "0014_conge_mensuels_colonnes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="demandeconge",
+            name="fin_conge",
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(remplir_fin_conge, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="demandeconge",
+            index=models.Index(
+                fields=["personnel", "statut", "debut_conge", "fin_conge"], name="demande_periode_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("conges", "0015_demandeconge_fin_conge"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="demandeconge",
+            index=models.Index(fields=["statut", "debut_conge", "fin_conge"], name="demande_calendrier_idx"),
+        ),
+    ]
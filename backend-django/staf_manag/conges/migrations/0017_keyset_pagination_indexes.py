@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("conges", "0016_demande_calendrier_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="conge",
+            index=models.Index(fields=["annee", "id"], name="conge_annee_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="demandeconge",
+            index=models.Index(fields=["date_soumission", "id"], name="demande_soumission_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="demandeconge",
+            index=models.Index(fields=["personnel", "date_soumission", "id"], name="demande_pers_soumission_idx"),
+        ),
+    ]
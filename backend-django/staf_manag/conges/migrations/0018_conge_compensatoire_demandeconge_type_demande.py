@@ -0,0 +1,110 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:50
+
+from django.db import migrations, models
+
+
+def colonnes(schema_editor, table):
+    with schema_editor.connection.cursor() as cursor:
+        return {c.name for c in schema_editor.connection.introspection.get_table_description(cursor, table)}
+
+def renommer_colonne(schema_editor, table, ancien, nouveau):
+    existantes = colonnes(schema_editor, table)
+    if ancien in existantes and nouveau not in existantes:
+        schema_editor.execute(schema_editor.sql_rename_column % {
+            "table": schema_editor.quote_name(table),
+            "old_column": schema_editor.quote_name(ancien),
+            "new_column": schema_editor.quote_name(nouveau),
+        })
+
+def aligner_colonnes(apps, schema_editor):
+    """
+    Les bases qui ont suivi les modèles sans migration ont déjà conge_compensatoire / type_demande :
+    renommage et ajout seulement quand la colonne manque.
+    """
+    Conge = apps.get_model("conges", "Conge")
+    DemandeConge = apps.get_model("conges", "DemandeConge")
+
+    # les soldes sont conservés
+    renommer_colonne(schema_editor, Conge._meta.db_table, "conge_compasatoire", "conge_compensatoire")
+    if "type_demande" not in colonnes(schema_editor, DemandeConge._meta.db_table):
+        schema_editor.add_field(DemandeConge, DemandeConge._meta.get_field("type_demande"))
+
+def restaurer_colonnes(apps, schema_editor):
+    # retour arrière : seul le renommage est défait ; type_demande est gardé (il a pu exister avant)
+    Conge = apps.get_model("conges", "Conge")
+    renommer_colonne(schema_editor, Conge._meta.db_table, "conge_compensatoire", "conge_compasatoire")
+
+
+class Migration(migrations.Migration):
+    """
+    Rattrapage d'une dérive antérieure (modèles modifiés sans migration), indépendant des index keyset (0017) :
+    renommage (les soldes sont conservés), type de demande et bornes des champs décimaux.
+    """
+
+    dependencies = [
+        ("conges", "0017_keyset_pagination_indexes"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.RenameField(
+                model_name="conge",
+                old_name="conge_compasatoire",
+                new_name="conge_compensatoire",
+            ),
+            migrations.AddField(
+                model_name="demandeconge",
+                name="type_demande",
+                field=models.CharField(
+                    choices=[
+                        ("standard", "Demande Standard"),
+                        ("exceptionnel", "Demande Exceptionnelle"),
+                        ("compensatoire", "Demande Compensatoire"),
+                    ],
+                    default="standard",
+                    max_length=20,
+                ),
+            ),
+        ]),
+        migrations.RunPython(aligner_colonnes, restaurer_colonnes),
+        migrations.AlterField(
+            model_name="conge",
+            name="conge_compensatoire",
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=5),
+        ),
+        migrations.AlterField(
+            model_name="conge",
+            name="annee",
+            field=models.IntegerField(),
+        ),
+        migrations.AlterField(
+            model_name="conge",
+            name="conge_restant_annee_courante",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+        ),
+        migrations.AlterField(
+            model_name="conge",
+            name="conge_restant_annee_n_1",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+        ),
+        migrations.AlterField(
+            model_name="conge",
+            name="conge_restant_annee_n_2",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+        ),
+        migrations.AlterField(
+            model_name="conge",
+            name="conge_total",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=5),
+        ),
+        migrations.AlterField(
+            model_name="demandeconge",
+            name="annee",
+            field=models.IntegerField(),
+        ),
+        migrations.AlterField(
+            model_name="demandeconge",
+            name="periode",
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+    ]
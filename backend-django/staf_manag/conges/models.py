@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from personnel.models import Personnel
 from accounts.models import CustomUser
 from datetime import datetime, timedelta
@@ -9,8 +9,13 @@ from django.core.exceptions import ValidationError as DjangoValidationError
 
 import re
 from datetime import date
-from staf_manag.utils.conges import mois_de_travail, to_decimal
+from collections.abc import MutableMapping
+from staf_manag.utils.conges import (
+    mois_de_travail, to_decimal, repartition_mensuelle,
+    MOIS, CHAMPS_MENSUELS, champ_mensuel, en_centiemes, depuis_centiemes,
+)
 from staf_manag.pandas_import import parse_date
+from conges.regle_cache import conge_initial_pour_categorie
 
 def get_lock_minutes():
     return getattr(settings, "CONGE_DECISION_LOCK_MINUTES", 15)
@@ -19,11 +24,51 @@ DEC2 = Decimal("0.01")
 def _quant(d: Decimal) -> Decimal:
     return d.quantize(DEC2, rounding=ROUND_HALF_UP)
 
+class AcquisMensuels(MutableMapping):
+    """
+    Vue dict {"01": jours, ..., "12": jours} sur les colonnes mensuel_01..12 d'un Conge,
+    pour garder l'API de l'ancien champ JSON conge_mensuel_restant (valeurs float en lecture).
+    """
+    def __init__(self, conge):
+        self._conge = conge
+
+    def __getitem__(self, mois):
+        return float(depuis_centiemes(getattr(self._conge, champ_mensuel(mois))))
+
+    def __setitem__(self, mois, valeur):
+        setattr(self._conge, champ_mensuel(mois), en_centiemes(valeur))
+
+    def __delitem__(self, mois):
+        setattr(self._conge, champ_mensuel(mois), 0)
+
+    def __iter__(self):
+        return iter(MOIS)
+
+    def __len__(self):
+        return len(MOIS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
 class RegleConge(models.Model):
+    STATUT_APPLICATION = [
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('termine', 'Terminé'),
+        ('echec', 'Échec'),
+    ]
+
     conge_initial_tech = models.IntegerField(default=72)
     conge_initial_autres = models.IntegerField(default=45)
     date_maj = models.DateTimeField(auto_now=True, editable=False)
     modifie_par = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='regles_conges')
+
+    # application de la règle aux conges (conges/regle_jobs.py), mise à jour par .update()
+    statut_application = models.CharField(max_length=20, choices=STATUT_APPLICATION, default='en_attente')
+    conges_a_traiter = models.PositiveIntegerField(default=0)
+    conges_traites = models.PositiveIntegerField(default=0)
+    conges_modifies = models.PositiveIntegerField(default=0)
+    date_application = models.DateTimeField(null=True, blank=True)
     
     def __str__(self):
         nom = ""
@@ -47,14 +92,42 @@ class Conge(models.Model):
     conge_compensatoire = models.DecimalField(max_digits=5, decimal_places=2, default=0.0)
     date_maj = models.DateTimeField(auto_now=True)
 
-    conge_mensuel_restant = models.JSONField(default=dict, blank=True, null=True)
+    # acquisitions mensuelles restantes en centièmes de jour (accès dict : conge_mensuel_restant)
+    mensuel_01 = models.IntegerField(default=0)
+    mensuel_02 = models.IntegerField(default=0)
+    mensuel_03 = models.IntegerField(default=0)
+    mensuel_04 = models.IntegerField(default=0)
+    mensuel_05 = models.IntegerField(default=0)
+    mensuel_06 = models.IntegerField(default=0)
+    mensuel_07 = models.IntegerField(default=0)
+    mensuel_08 = models.IntegerField(default=0)
+    mensuel_09 = models.IntegerField(default=0)
+    mensuel_10 = models.IntegerField(default=0)
+    mensuel_11 = models.IntegerField(default=0)
+    mensuel_12 = models.IntegerField(default=0)
     class Meta:
         unique_together = ('personnel', 'annee') # Un seul état de conges par personnel et par année
         ordering = ['-annee'] # ordonner par annee decroissante
+        indexes = [
+            # export incrémental : WHERE (date_maj, id) > (watermark, curseur) ORDER BY date_maj, id
+            models.Index(fields=['date_maj', 'id'], name='conge_date_maj_id_idx'),
+            # liste paginée par clé : ORDER BY annee DESC, id DESC
+            models.Index(fields=['annee', 'id'], name='conge_annee_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.personnel.nom} ({self.annee}) : {self.conge_total} jour(s)"
 
+    @property
+    def conge_mensuel_restant(self) -> AcquisMensuels:
+        return AcquisMensuels(self)
+
+    @conge_mensuel_restant.setter
+    def conge_mensuel_restant(self, valeurs):
+        valeurs = dict(valeurs or {})
+        for mois, champ in zip(MOIS, CHAMPS_MENSUELS):
+            setattr(self, champ, en_centiemes(valeurs.get(mois, 0)))
+
     
     def initialiser(self):
         if not self.annee:
@@ -72,29 +145,12 @@ class Conge(models.Model):
             self.conge_mensuel_restant = {f"{m:02d}": 0.0 for m in range(1, 13)}
             return
 
-        part = _quant(total / Decimal(12))
-
         # date d'affectation et date actuelle
         date_aff = parse_date(getattr(self.personnel, "date_affectation", None))
         today = timezone.now().date()
 
-        months = [f"{m:02d}" for m in range(1, 13)]
-        result = {m: Decimal("0.00") for m in months}
-
-        if date_aff:
-            if date_aff.year == self.annee:
-                months_to_fill = [f"{m:02d}" for m in range(date_aff.month, today.month + 1)]
-            elif date_aff and date_aff.year < self.annee:
-                months_to_fill = [f"{m:02d}" for m in range(1, today.month + 1)]
-            else:
-                months_to_fill = []
-
-            # remplir par parts
-            for m in months_to_fill:
-                result[m] = part
-
-        # stocker en JSON
-        self.conge_mensuel_restant = {k: float(v or 0.0) for k, v in result.items()}
+        # remplir par parts (colonnes mensuel_01..12)
+        self.conge_mensuel_restant = repartition_mensuelle(self.conge_initial, date_aff, self.annee, today.month)
 
         self.recalculer_total_conges(save=False)
        
@@ -103,12 +159,6 @@ class Conge(models.Model):
         if not getattr(self, "annee", None):
             self.annee = timezone.now().year
 
-        # garantir types float pour JSON (défensive)
-        try:
-            self.conge_mensuel_restant = {k: float(v or 0.0) for k, v in (self.conge_mensuel_restant or {}).items()}
-        except Exception:
-            self.conge_mensuel_restant = {f"{m:02d}": 0.0 for m in range(1, 13)}
-
         # recalculer conge_total sans save récursif
         self.conge_total = (
             to_decimal(self.conge_restant_annee_n_1) +
@@ -141,9 +191,8 @@ class Conge(models.Model):
 
         part = _quant(Decimal(self.conge_initial) / Decimal(12))
         mois_courant = as_of.month
-        mois_str = f"{mois_courant:02d}"
 
-        if to_decimal(self.conge_mensuel_restant.get(mois_str, 0)) == part:
+        if getattr(self, champ_mensuel(mois_courant)) == en_centiemes(part):
             return
 
         result = {f"{m:02d}": Decimal("0.00") for m in range(1, 13)}
@@ -159,7 +208,7 @@ class Conge(models.Model):
         for m in mois_range:
             result[f"{m:02d}"] = part
 
-        self.conge_mensuel_restant = {k: float(v) for k, v in result.items()}
+        self.conge_mensuel_restant = result
         
         self.recalculer_total_conges(save=False)
 
@@ -172,18 +221,8 @@ class Conge(models.Model):
         ).aggregate(total=models.Sum('conge_demande'))['total'] or 0
     
     def get_default_conge_initial(self):
-        regle = RegleConge.objects.order_by('-date_maj').first()
-        grade = self.personnel.grade
-        
-        if not regle:
-            # on utilise les valeurs par défaut définies dans le modèle
-            if grade and (re.search(r'technicien(ne)?', grade, re.IGNORECASE) or re.search(r'assistant(e)?', grade, re.IGNORECASE)):
-                return 72
-            return 45
-        
-        if grade and re.search(r'technicien(ne)?', grade, re.IGNORECASE) or re.search(r'assistant(e)?', grade, re.IGNORECASE):
-            return regle.conge_initial_tech
-        return regle.conge_initial_autres
+        # règle en vigueur lue dans le cache (conges/regle_cache.py), catégorie stockée sur le personnel
+        return conge_initial_pour_categorie(self.personnel.categorie_grade)
 
     def rollover_to_new_year(self, new_year: int):
         if self.annee >= new_year:
@@ -236,14 +275,13 @@ class Conge(models.Model):
             for m in range(1, mois_limit + 1):
                 if montant <= 0:
                     break
-                key = f'{m:02d}'
-                available = to_decimal(self.conge_mensuel_restant.get(key, 0))
+                champ = champ_mensuel(m)
+                available = depuis_centiemes(getattr(self, champ))
                 if available <= Decimal('0.00'):
                     continue
 
                 debit = min(montant, available)
-                new_val = _quant(available - debit)
-                self.conge_mensuel_restant[key] = float(new_val)
+                setattr(self, champ, en_centiemes(_quant(available - debit)))
                 
                 # décrémenter le conge restant de l'annee courante
                 self.conge_restant_annee_courante = _quant(to_decimal(self.conge_restant_annee_courante) - debit)
@@ -251,7 +289,44 @@ class Conge(models.Model):
 
         # Après prélèvements, recalculer conge total sans save
         self.recalculer_total_conges(save=False)
+
+    def debiter_demande(self, demande_jours: Decimal, type_demande: str, as_of: date, disponible: Decimal = None):
+        """
+        Vérifie le solde correspondant au type de demande puis le débite (sans save).
+        disponible : jours disponibles au mois de as_of (read model conges.disponibilites), recalculé en mémoire si absent.
+        Lève DjangoValidationError si le solde est insuffisant.
+        """
+        from conges.disponibilites import calculer_disponibilite
+
+        if disponible is None:
+            disponible = calculer_disponibilite(self).pour_type(type_demande, as_of.month)
+
+        if type_demande == 'standard':
+            if demande_jours > disponible:
+                raise DjangoValidationError({ "conge_demande_non_valide": f"Solde de congé insuffisant. Il ne reste que {disponible} jours de congés." })
+
+            #  prélèvement de conges
+            self.prelement_conges(demande_jours, as_of=as_of)
+        elif type_demande == 'exceptionnel':
+            if demande_jours > disponible:
+                raise DjangoValidationError({ "conge_demande_non_valide": f"Solde de congé exceptionnel insuffisant. Disponible: {self.conge_exceptionnel} jours." })
+            
+            self.conge_exceptionnel = int(self.conge_exceptionnel - demande_jours)
+        
+        elif type_demande == 'compensatoire':
+            if demande_jours > disponible:
+                raise DjangoValidationError({ "conge_demande_non_valide": f"Solde de congé compensatoire insuffisant. Disponible: {self.conge_compensatoire} jours." })
+            
+            self.conge_compensatoire = _quant(to_decimal(self.conge_compensatoire) - demande_jours)
         
+class DemandeCongeQuerySet(models.QuerySet):
+    def valides(self):
+        return self.filter(statut='valide')
+
+    def chevauchant(self, debut, fin):
+        """Demandes dont [debut_conge, fin_conge] chevauche [debut, fin] (bornes incluses)."""
+        return self.filter(debut_conge__lte=fin, fin_conge__gte=debut)
+
 # Models Demande Congé à créer
 class DemandeConge(models.Model):
     STATUT_CHOICES = [
@@ -272,6 +347,7 @@ class DemandeConge(models.Model):
     conge_demande = models.PositiveIntegerField(default=0, blank=True, null=True) # PositiveIntegerField empêche les entiers négatifs
     debut_conge = models.DateField(null=True, blank=True)
     periode = models.CharField(max_length=100, blank=True, null=True)  # exemple : "12/05/2025 - 22/05/2025"
+    fin_conge = models.DateField(null=True, blank=True, editable=False)  # dernier jour de congé, calculé au save
     statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='en_attente')
     motif = models.TextField(blank=True, null=True)
     date_soumission = models.DateTimeField(auto_now_add=True, editable=False)
@@ -280,9 +356,27 @@ class DemandeConge(models.Model):
     date_annulation = models.DateTimeField(null=True, blank=True, editable=False)
 
     type_demande = models.CharField(max_length=20, choices=TYPE_DEMANDE, default='standard')
+    date_maj = models.DateTimeField(auto_now=True)
+
+    objects = DemandeCongeQuerySet.as_manager()
     
     class Meta:
         ordering =  ['-date_soumission']
+        indexes = [
+            models.Index(fields=['date_maj', 'id'], name='demande_date_maj_id_idx'),
+            # recherche de chevauchement : personnel + statut puis bornes de la période
+            models.Index(fields=['personnel', 'statut', 'debut_conge', 'fin_conge'], name='demande_periode_idx'),
+            # calendrier des absences, tous personnels confondus : statut puis bornes de la période
+            models.Index(fields=['statut', 'debut_conge', 'fin_conge'], name='demande_calendrier_idx'),
+            # listes paginées par clé : ORDER BY date_soumission DESC, id DESC (toutes / par personnel)
+            models.Index(fields=['date_soumission', 'id'], name='demande_soumission_id_idx'),
+            models.Index(fields=['personnel', 'date_soumission', 'id'], name='demande_pers_soumission_idx'),
+        ]
+
+    def calculer_fin_conge(self):
+        if self.debut_conge and self.conge_demande and self.conge_demande > 0:
+            return self.debut_conge + timedelta(days=self.conge_demande - 1)
+        return None
 
     def is_locked(self) -> bool:
         """Après une décision (valider/refuser), on empêche toute modification 
@@ -301,54 +395,31 @@ class DemandeConge(models.Model):
         if demande_jours <= Decimal('0.00'):
             return DjangoValidationError({'conge_demande': 'Le nombre de jours demandé doit être supérieur a 0'})
         
+        from conges.mouvements import etat_compteurs, enregistrer_mouvement
+        from conges.disponibilites import disponibilite
+
         #  on locke la demande de conge pour la sécurité
         with transaction.atomic():
-            demande = DemandeConge.objects.select_for_update().get(pk=self.pk)
-            conge = Conge.objects.select_for_update().get(pk=demande.conge.pk)
-
             #  calculer droit acquis à la date de soumission
             as_of = parse_date(self.debut_conge) if self.debut_conge else timezone.now()
             # droit_acquis = to_decimal(conge.jours_acquis(as_of=as_of))
 
-            if demande.type_demande == 'standard':
-                #  calculer restes mensuels jusqu' avant prélèvement
-                mois_debut = as_of.month
-                print(mois_debut)
-                restes_mensuels = Decimal('0.00')
-                for m in range(1, mois_debut + 1):
-                    key=f"{m:02d}"
-                    restes_mensuels += to_decimal(conge.conge_mensuel_restant.get(key, 0))
-
-                print(restes_mensuels)
-                total_dispo = (
-                    to_decimal(conge.conge_restant_annee_n_2) +
-                    to_decimal(conge.conge_restant_annee_n_1) +
-                    restes_mensuels
-                )
-                print(total_dispo)
-                if demande_jours > total_dispo:
-                    raise DjangoValidationError({ "conge_demande_non_valide": f"Solde de congé insuffisant. Il ne reste que {total_dispo} jours de congés." })
-
-                #  prélèvement de conges
-                conge.prelement_conges(demande_jours, as_of=as_of)
-            elif demande.type_demande == 'exceptionnel':
-                if demande_jours > to_decimal(conge.conge_exceptionnel):
-                    raise DjangoValidationError({ "conge_demande_non_valide": f"Solde de congé exceptionnel insuffisant. Disponible: {conge.conge_exceptionnel} jours." })
-                
-                conge.conge_exceptionnel = int(conge.conge_exceptionnel - demande_jours)
-            
-            elif demande.type_demande == 'compensatoire':
-                reste = to_decimal(conge.conge_compensatoire)
-                if demande_jours > reste:
-                    raise DjangoValidationError({ "conge_demande_non_valide": f"Solde de congé compensatoire insuffisant. Disponible: {conge.conge_compensatoire} jours." })
-                
-                conge.conge_compensatoire = _quant(reste - demande_jours)
+            demande = DemandeConge.objects.select_for_update().get(pk=self.pk)
+            conge = Conge.objects.select_for_update().get(pk=demande.conge_id)
+            avant = etat_compteurs(conge)
+
+            #  disponible au mois de début (avant prélèvement), lu dans le cache versionné par date_maj
+            conge.debiter_demande(
+                demande_jours, demande.type_demande, as_of,
+                disponible=disponibilite(conge).pour_type(demande.type_demande, as_of.month),
+            )
     
             demande.statut = 'valide'
             demande.date_validation = timezone.now()
             demande.save()
 
             conge.save()
+            enregistrer_mouvement(conge, avant, 'validation', demande=demande)
 
             return demande
     
@@ -364,9 +435,9 @@ class DemandeConge(models.Model):
             self.annee = new_year
             
          # Gestion de la période à partir de la date_debut
-        if self.debut_conge and self.conge_demande and self.conge_demande > 0:
-            fin_conge = self.debut_conge + timedelta(days = self.conge_demande - 1)
-            self.periode = f"{self.debut_conge.strftime('%d/%m/%Y')} - {fin_conge.strftime('%d/%m/%Y')}"
+        self.fin_conge = self.calculer_fin_conge()
+        if self.fin_conge:
+            self.periode = f"{self.debut_conge.strftime('%d/%m/%Y')} - {self.fin_conge.strftime('%d/%m/%Y')}"
         else:
             self.periode = None
         super().save(*args, **kwargs)
@@ -383,31 +454,102 @@ class DemandeConge(models.Model):
         if not self.conge_demande and self.debut_conge is not None:
             errors["conge_demande"] = "Le champ 'conge_demande' est requis si 'debut_conge' est rempli"
         
-        conflits = DemandeConge.objects.filter(
-            personnel = self.personnel,
-            statut = 'valide',
-            debut_conge = self.debut_conge
-        ).exclude(id=self.id)
-
-        if conflits.exists():
-            errors["conflits"] = f"Un congé validé se chevauche avec celui-ci pour {self.personnel.matricule}."
-        
-        # verifier si un congé validé existe juste avant
-        dernier_conge = DemandeConge.objects.filter(
-            personnel = self.personnel,
-            statut = 'valide',
-            debut_conge__lt = self.debut_conge
-        ).order_by('-debut_conge').first()
-
-        if dernier_conge and dernier_conge.periode:
-            try:
-                _, fin_conge = dernier_conge.periode.split(" - ")
-                fin_conge = datetime.strptime(fin_conge, "%d/%m/%Y").date()
-                if self.debut_conge <= fin_conge:
-                    errors["demande interdite"] = "Un congé validé se termine avant ou le début de cette nouvelle demande pour ce personnel."
-            except ValueError:
-                pass
+        # congés validés qui chevauchent cette demande : une seule requête indexée
+        fin = self.calculer_fin_conge()
+        if self.debut_conge and fin:
+            conflits = list(
+                DemandeConge.objects.valides()
+                .filter(personnel=self.personnel)
+                .chevauchant(self.debut_conge, fin)
+                .exclude(id=self.id)
+                .order_by('debut_conge')
+                .values_list('debut_conge', 'periode')
+            )
+            debuts = [debut for debut, _ in conflits]
+            suivants = [periode for debut, periode in conflits if debut > self.debut_conge]
+            if self.debut_conge in debuts:
+                errors["conflits"] = f"Un congé validé se chevauche avec celui-ci pour {self.personnel.matricule}."
+            elif any(debut < self.debut_conge for debut in debuts):
+                errors["demande interdite"] = "Un congé validé se termine avant ou le début de cette nouvelle demande pour ce personnel."
+            elif suivants:
+                # la demande déborde sur un congé validé qui commence après elle
+                errors["chevauchement"] = f"La période demandée chevauche le congé validé {suivants[0]}."
         if errors:
             raise DjangoValidationError(errors)    
     
 
+
+# Journal des mouvements de congés (append-only) et soldes mensuels figés
+class MouvementConge(models.Model):
+    """
+    Un mouvement = la variation des compteurs d'un Conge lors d'une opération.
+    Les lignes ne sont jamais modifiées ni supprimées : une correction est un nouveau mouvement.
+    Solde à une date = dernier SoldeCongeSnapshot + somme des mouvements postérieurs (conges/mouvements.py).
+    """
+    TYPE_MOUVEMENT = [
+        ('ouverture', 'Ouverture de solde'),
+        ('acquisition', 'Acquisition'),
+        ('validation', 'Validation de demande'),
+        ('import', 'Import'),
+        ('ajustement', 'Ajustement manuel'),
+        ('rollover', 'Rollover annuel'),
+        ('regle', 'Nouvelle règle de congé'),
+        ('grade', 'Changement de grade'),
+    ]
+
+    conge = models.ForeignKey(Conge, on_delete=models.CASCADE, related_name='mouvements')
+    personnel = models.ForeignKey(Personnel, on_delete=models.CASCADE, related_name='mouvements_conges')
+    demande = models.ForeignKey('DemandeConge', on_delete=models.SET_NULL, null=True, blank=True, related_name='mouvements')
+    annee = models.IntegerField()  # année du Conge après le mouvement
+    type_mouvement = models.CharField(max_length=20, choices=TYPE_MOUVEMENT)
+    date_effet = models.DateField()
+    date_creation = models.DateTimeField(auto_now_add=True, editable=False)
+    cree_par = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='mouvements_conges')
+    motif = models.CharField(max_length=255, blank=True, default='')
+
+    # variations signées des compteurs (après - avant)
+    delta_n_2 = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    delta_n_1 = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    delta_courante = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    delta_exceptionnel = models.IntegerField(default=0)
+    delta_compensatoire = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['date_effet', 'id']
+        indexes = [
+            models.Index(fields=['conge', 'date_effet', 'id'], name='mvt_conge_date_idx'),
+            models.Index(fields=['personnel', 'date_effet'], name='mvt_personnel_date_idx'),
+            models.Index(fields=['type_mouvement', 'date_effet'], name='mvt_type_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_type_mouvement_display()} {self.conge_id} ({self.date_effet})"
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise DjangoValidationError("Un mouvement de congé ne peut pas être modifié.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise DjangoValidationError("Un mouvement de congé ne peut pas être supprimé.")
+
+class SoldeCongeSnapshot(models.Model):
+    """Soldes d'un Conge figés à date_snapshot (fin de mois), tous mouvements de date_effet <= date_snapshot inclus."""
+    conge = models.ForeignKey(Conge, on_delete=models.CASCADE, related_name='snapshots')
+    personnel = models.ForeignKey(Personnel, on_delete=models.CASCADE, related_name='snapshots_conges')
+    date_snapshot = models.DateField()
+    conge_restant_annee_n_2 = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    conge_restant_annee_n_1 = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    conge_restant_annee_courante = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    conge_exceptionnel = models.IntegerField(default=0)
+    conge_compensatoire = models.DecimalField(max_digits=6, decimal_places=2, default=0)
+    date_creation = models.DateTimeField(auto_now_add=True, editable=False)
+
+    class Meta:
+        ordering = ['-date_snapshot']
+        constraints = [
+            models.UniqueConstraint(fields=['conge', 'date_snapshot'], name='snapshot_conge_date_unique'),
+        ]
+
+    def __str__(self):
+        return f"Solde {self.conge_id} au {self.date_snapshot}"
@@ -0,0 +1,136 @@
+"""
+Journal des mouvements de congés (MouvementConge) et soldes mensuels figés (SoldeCongeSnapshot).
+
+- chaque opération qui modifie les compteurs d'un Conge enregistre un mouvement (après - avant) :
+      avant = etat_compteurs(conge)
+      ... modification du conge ...
+      enregistrer_mouvement(conge, avant, 'ajustement', cree_par=user)
+- snapshot_soldes(date) fige les soldes de tous les conges à une date (commande snapshot_soldes_conges)
+- solde_a_date(conge_id, date) = dernier snapshot <= date + somme des mouvements suivants (2 requêtes)
+"""
+from datetime import date
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from conges.models import MouvementConge, SoldeCongeSnapshot
+from staf_manag.utils.conges import to_decimal
+
+# champ delta du mouvement -> compteur du Conge (et du snapshot)
+COMPTEURS = {
+    "delta_n_2": "conge_restant_annee_n_2",
+    "delta_n_1": "conge_restant_annee_n_1",
+    "delta_courante": "conge_restant_annee_courante",
+    "delta_exceptionnel": "conge_exceptionnel",
+    "delta_compensatoire": "conge_compensatoire",
+}
+
+# état "avant" d'un conge qui vient d'être créé (mouvement d'ouverture)
+ETAT_VIDE = {champ: Decimal("0.00") for champ in COMPTEURS.values()}
+
+def etat_compteurs(conge) -> dict:
+    return {champ: to_decimal(getattr(conge, champ)) for champ in COMPTEURS.values()}
+
+def preparer_mouvement(conge, avant: dict, type_mouvement: str, date_effet: date = None, **extra) -> Optional[MouvementConge]:
+    """Mouvement (non enregistré) entre `avant` et l'état courant du conge ; None si rien n'a changé."""
+    apres = etat_compteurs(conge)
+    deltas = {delta: apres[champ] - avant[champ] for delta, champ in COMPTEURS.items()}
+    if not any(deltas.values()):
+        return None
+    deltas["delta_exceptionnel"] = int(deltas["delta_exceptionnel"])
+    return MouvementConge(
+        conge_id=conge.pk,
+        personnel_id=conge.personnel_id,
+        annee=conge.annee,
+        type_mouvement=type_mouvement,
+        date_effet=date_effet or timezone.localdate(),
+        **deltas,
+        **extra,
+    )
+
+def enregistrer_mouvements(mouvements: Iterable[Optional[MouvementConge]]) -> int:
+    """
+    Insère les mouvements en lot. Les snapshots datés du jour d'effet ou après
+    ne reflètent plus ces mouvements : ils sont supprimés (recalculés au prochain snapshot).
+    """
+    mouvements = [m for m in mouvements if m is not None]
+    if not mouvements:
+        return 0
+    MouvementConge.objects.bulk_create(mouvements, batch_size=1000)
+    SoldeCongeSnapshot.objects.filter(
+        conge_id__in={m.conge_id for m in mouvements},
+        date_snapshot__gte=min(m.date_effet for m in mouvements),
+    ).delete()
+    return len(mouvements)
+
+def enregistrer_mouvement(conge, avant: dict, type_mouvement: str, **kwargs) -> int:
+    return enregistrer_mouvements([preparer_mouvement(conge, avant, type_mouvement, **kwargs)])
+
+def solde_a_date(conge_id: int, jour: date) -> dict:
+    """Soldes d'un conge à la fin de `jour`, sans relire tout l'historique."""
+    snapshot = (
+        SoldeCongeSnapshot.objects
+        .filter(conge_id=conge_id, date_snapshot__lte=jour)
+        .order_by('-date_snapshot')
+        .first()
+    )
+    mouvements = MouvementConge.objects.filter(conge_id=conge_id, date_effet__lte=jour)
+    if snapshot:
+        mouvements = mouvements.filter(date_effet__gt=snapshot.date_snapshot)
+    sommes = mouvements.aggregate(**{delta: Sum(delta) for delta in COMPTEURS})
+
+    solde = {
+        champ: to_decimal(getattr(snapshot, champ, 0)) + to_decimal(sommes[delta] or 0)
+        for delta, champ in COMPTEURS.items()
+    }
+    solde["conge_exceptionnel"] = int(solde["conge_exceptionnel"])
+    solde["conge_total"] = (
+        solde["conge_restant_annee_n_2"] + solde["conge_restant_annee_n_1"] + solde["conge_restant_annee_courante"]
+    )
+    solde["date"] = jour
+    solde["date_snapshot"] = snapshot.date_snapshot if snapshot else None
+    return solde
+
+def snapshot_soldes(date_snapshot: date, batch_size: int = 1000) -> int:
+    """
+    Fige les soldes de tous les conges au `date_snapshot` : snapshot précédent de chaque conge
+    + somme en SQL de ses mouvements depuis ce snapshot. Remplace un snapshot existant à cette date.
+    """
+    # dernier snapshot de chaque conge avant la date (sous-requête corrélée, sans DISTINCT ON)
+    dernier = SoldeCongeSnapshot.objects.filter(conge=OuterRef('conge'), date_snapshot__lt=date_snapshot)
+    date_dernier = Subquery(dernier.order_by('-date_snapshot').values('date_snapshot')[:1])
+    precedents = {
+        s.conge_id: s
+        for s in SoldeCongeSnapshot.objects.filter(date_snapshot=date_dernier)
+    }
+
+    sommes = {
+        ligne["conge_id"]: ligne
+        for ligne in MouvementConge.objects
+        .filter(date_effet__lte=date_snapshot)
+        .filter(~Exists(dernier) | Q(date_effet__gt=date_dernier))
+        .values('conge_id', 'personnel_id')
+        .annotate(**{delta: Sum(delta) for delta in COMPTEURS})
+        .order_by()
+    }
+
+    nouveaux = []
+    for conge_id in precedents.keys() | sommes.keys():
+        precedent, somme = precedents.get(conge_id), sommes.get(conge_id, {})
+        nouveaux.append(SoldeCongeSnapshot(
+            conge_id=conge_id,
+            personnel_id=precedent.personnel_id if precedent else somme["personnel_id"],
+            date_snapshot=date_snapshot,
+            **{
+                champ: to_decimal(getattr(precedent, champ, 0)) + to_decimal(somme.get(delta) or 0)
+                for delta, champ in COMPTEURS.items()
+            },
+        ))
+
+    with transaction.atomic():
+        SoldeCongeSnapshot.objects.filter(date_snapshot=date_snapshot).delete()
+        SoldeCongeSnapshot.objects.bulk_create(nouveaux, batch_size=batch_size)
+    return len(nouveaux)
@@ -1,6 +1,118 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+from datetime import date, datetime, time
+from decimal import Decimal
+import json
+from functools import reduce
+import operator
+import uuid
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 class StandardReesultatsSetPagination(PageNumberPagination):
     page_size = 25
     page_size_query_param = 'page_size'
-    max_page_size = 100
\ No newline at end of file
+    max_page_size = 100
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination par clé (keyset) sur un tri composite, ex. ('-date_soumission', '-id').
+
+    - pas de COUNT(*) ni d'OFFSET : chaque page est un WHERE (tri) > (dernière ligne) LIMIT n,
+      servi par l'index composite correspondant ; le coût ne dépend pas de la profondeur
+    - le tri vient de `keyset_ordering` sur la vue (sinon `ordering`), le dernier champ doit être unique (id)
+    - ?page_size= (borné par max_page_size), ?curseur= opaque renvoyé dans "next"
+    - réponse : {"next": url | null, "results": [...]}
+    """
+    ordering = ('-id',)
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'curseur'
+
+    def get_ordering(self, view):
+        return tuple(getattr(view, 'keyset_ordering', None) or self.ordering)
+
+    def get_page_size(self, request):
+        try:
+            taille = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            taille = self.page_size
+        return max(1, min(taille, self.max_page_size))
+
+    @staticmethod
+    def valeur_curseur(valeur):
+        # valeur exacte (isoformat garde les microsecondes, DjangoJSONEncoder les tronque à la milliseconde :
+        # les lignes tombant dans les microsecondes perdues seraient sautées)
+        if isinstance(valeur, (datetime, date, time)):
+            return valeur.isoformat()
+        if isinstance(valeur, (Decimal, uuid.UUID)):
+            return str(valeur)
+        return valeur
+
+    @classmethod
+    def encode_curseur(cls, valeurs: list) -> str:
+        return base64.urlsafe_b64encode(json.dumps([cls.valeur_curseur(v) for v in valeurs]).encode()).decode()
+
+    @staticmethod
+    def decode_curseur(curseur: str, nb_champs: int) -> list:
+        try:
+            valeurs = json.loads(base64.urlsafe_b64decode(curseur.encode()).decode())
+        except (ValueError, TypeError):
+            raise NotFound("Curseur invalide")
+        if not isinstance(valeurs, list) or len(valeurs) != nb_champs:
+            raise NotFound("Curseur invalide")
+        return valeurs
+
+    @staticmethod
+    def apres(ordering, valeurs) -> Q:
+        """(a, b, c) strictement après (va, vb, vc) dans l'ordre donné (sens par champ)."""
+        conditions = []
+        for i, champ in enumerate(ordering):
+            nom = champ.lstrip('-')
+            lookup = 'lt' if champ.startswith('-') else 'gt'
+            egalites = {ordering[j].lstrip('-'): valeurs[j] for j in range(i)}
+            conditions.append(Q(**egalites, **{f"{nom}__{lookup}": valeurs[i]}))
+        return reduce(operator.or_, conditions)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering_courant = self.get_ordering(view)
+        taille = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering_courant)
+        curseur = request.query_params.get(self.cursor_query_param)
+        if curseur:
+            valeurs = self.decode_curseur(curseur, len(self.ordering_courant))
+            queryset = queryset.filter(self.apres(self.ordering_courant, valeurs))
+
+        lignes = list(queryset[:taille + 1])
+        self.suivant = None
+        if len(lignes) > taille:
+            lignes = lignes[:taille]
+            dernier = lignes[-1]
+            self.suivant = self.encode_curseur([
+                getattr(dernier, champ.lstrip('-')) for champ in self.ordering_courant
+            ])
+        return lignes
+
+    def get_next_link(self):
+        if not self.suivant:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.suivant)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,92 @@
+"""
+Cache de la règle de congé en vigueur (la RegleConge la plus récente).
+
+- mémoire du process, associée à un numéro de version lu dans le cache Django (REGLE_VERSION_CLE) :
+  la règle est relue en base (une requête sur une petite table) dès que la version change
+- les signaux post_save / post_delete de RegleConge (personnel/signals.py) changent la version :
+  tous les workers qui partagent le backend de cache voient la nouvelle règle à l'appel suivant
+- avec le LocMemCache par défaut (un cache par process), seule la TTL REGLE_CONGE_CACHE_LOCAL_TTL
+  propage la règle aux autres workers : elle reste comme filet de sécurité
+Un appel servi par le cache ne fait aucune requête SQL (une lecture de la clé de version).
+"""
+from dataclasses import dataclass
+from datetime import datetime
+import threading
+import time
+from typing import Optional
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from staf_manag.utils.conges import categorie_grade, CATEGORIE_TECH
+
+# valeurs utilisées tant qu'aucune règle n'est définie (défauts du modèle RegleConge)
+INITIAL_TECH_DEFAUT = 72
+INITIAL_AUTRES_DEFAUT = 45
+
+@dataclass(frozen=True)
+class RegleCourante:
+    id: int
+    conge_initial_tech: int
+    conge_initial_autres: int
+    date_maj: datetime
+
+REGLE_VERSION_CLE = "conges:regle_courante:version"
+
+_local = {"regle": None, "version": None, "expire": 0.0}
+_verrou = threading.Lock()
+
+def _charger() -> Optional[RegleCourante]:
+    from conges.models import RegleConge
+
+    regle = (
+        RegleConge.objects
+        .order_by('-date_maj')
+        .values('id', 'conge_initial_tech', 'conge_initial_autres', 'date_maj')
+        .first()
+    )
+    return RegleCourante(**regle) if regle else None
+
+def _version_partagee() -> str:
+    version = cache.get(REGLE_VERSION_CLE)
+    if version is None:
+        # clé absente (cache vidé, premier démarrage) : add ne remplace pas la valeur d'un autre worker
+        cache.add(REGLE_VERSION_CLE, uuid.uuid4().hex, None)
+        version = cache.get(REGLE_VERSION_CLE)
+    return version
+
+def regle_courante() -> Optional[RegleCourante]:
+    """Règle en vigueur (None si aucune règle), sans requête SQL quand le cache est à jour."""
+    version = _version_partagee()
+    now = time.monotonic()
+    if version == _local["version"] and now < _local["expire"]:
+        return _local["regle"]
+
+    with _verrou:
+        if version == _local["version"] and now < _local["expire"]:
+            return _local["regle"]
+
+        _local["regle"] = _charger()
+        _local["version"] = version
+        _local["expire"] = now + getattr(settings, "REGLE_CONGE_CACHE_LOCAL_TTL", 5)
+        return _local["regle"]
+
+def invalider_regle_courante():
+    """Nouvelle version partagée : chaque process relit la règle à son prochain appel."""
+    with _verrou:
+        cache.set(REGLE_VERSION_CLE, uuid.uuid4().hex, None)
+        _local["regle"] = None
+        _local["version"] = None
+        _local["expire"] = 0.0
+
+def conge_initial_pour_categorie(categorie: str) -> int:
+    """conge_initial par défaut d'une catégorie de grade (Personnel.categorie_grade) selon la règle en vigueur."""
+    regle = regle_courante()
+    if categorie == CATEGORIE_TECH:
+        return regle.conge_initial_tech if regle else INITIAL_TECH_DEFAUT
+    return regle.conge_initial_autres if regle else INITIAL_AUTRES_DEFAUT
+
+def conge_initial_pour_grade(grade) -> int:
+    """conge_initial par défaut d'un grade (texte libre) selon la règle en vigueur."""
+    return conge_initial_pour_categorie(categorie_grade(grade))
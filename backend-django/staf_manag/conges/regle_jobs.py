@@ -0,0 +1,73 @@
+"""
+Application d'une nouvelle RegleConge aux conges, hors de la requête de l'admin.
+
+- le signal post_save de RegleConge passe la règle en "en_attente" et la soumet après commit
+- l'application tourne dans un thread dédié (un seul à la fois : les règles s'appliquent dans l'ordre)
+  ou via `python manage.py appliquer_regle_conge` si REGLE_CONGE_INLINE_WORKER = False
+- la progression (conges traités / à traiter / modifiés) est écrite sur la règle elle-même
+"""
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from conges.models import RegleConge
+from conges.bulk_helpers import appliquer_regle_en_masse
+
+# intervalle minimal entre deux écritures de la progression en base
+PROGRESS_INTERVAL = 0.5
+
+_executor = None
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="regle-conge")
+    return _executor
+
+def soumettre_application(regle_id: int):
+    """Lance l'application de la règle une fois la transaction courante validée."""
+    if not getattr(settings, "REGLE_CONGE_INLINE_WORKER", True):
+        # la règle sera appliquée par `manage.py appliquer_regle_conge`
+        return
+    transaction.on_commit(lambda: get_executor().submit(executer_application, regle_id))
+
+def _reporter_progression(regle_id: int):
+    dernier = {"t": 0.0}
+
+    def progress(traites, total, modifies):
+        now = time.monotonic()
+        if traites < total and now - dernier["t"] < PROGRESS_INTERVAL:
+            return
+        dernier["t"] = now
+        RegleConge.objects.filter(pk=regle_id).update(
+            conges_traites=traites, conges_a_traiter=total, conges_modifies=modifies,
+        )
+    return progress
+
+def executer_application(regle_id: int, batch_size: int = 500) -> bool:
+    """
+    Applique une règle en attente. Le passage en_attente -> en_cours est atomique (UPDATE conditionnel).
+    La progression est écrite par .update() : ni post_save ni auto_now (date_maj désigne la règle courante).
+    """
+    close_old_connections()
+    try:
+        pris = RegleConge.objects.filter(pk=regle_id, statut_application="en_attente").update(
+            statut_application="en_cours", conges_traites=0, conges_modifies=0,
+        )
+        if not pris:
+            return False
+
+        try:
+            # toujours la règle la plus récente : une règle remplacée entre-temps n'écrase pas la suivante
+            appliquer_regle_en_masse(batch_size=batch_size, progress=_reporter_progression(regle_id))
+        except Exception:
+            RegleConge.objects.filter(pk=regle_id).update(statut_application="echec", date_application=timezone.now())
+            raise
+
+        RegleConge.objects.filter(pk=regle_id).update(statut_application="termine", date_application=timezone.now())
+        return True
+    finally:
+        close_old_connections()
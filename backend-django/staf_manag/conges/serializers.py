@@ -1,16 +1,25 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
-from .models import Conge, DemandeConge, RegleConge
+from .models import Conge, DemandeConge, RegleConge, MouvementConge
+from .disponibilites import disponibilite
 from personnel.models import Personnel
 from django.core.exceptions import ValidationError as DjangoValidationError
-from personnel.serializers import PersonnelSerializer
+from personnel.serializers import PersonnelSerializer, PersonnelResumeSerializer, joindre_personnel
 from django.utils import timezone
-from staf_manag.utils.conges import to_decimal
+from staf_manag.utils.conges import to_decimal, CHAMPS_MENSUELS
+from staf_manag.utils.champs_dynamiques import ChampsDynamiquesMixin
 
 class RegleCongeSerializer(serializers.ModelSerializer):
     modifie_par = serializers.SerializerMethodField()
     class Meta:
         model = RegleConge
         fields = '__all__'
+        read_only_fields = ['statut_application', 'conges_a_traiter', 'conges_traites', 'conges_modifies', 'date_application']
+
+    @classmethod
+    def preparer_queryset(cls, qs):
+        # get_modifie_par lit modifie_par.personnel
+        return qs.select_related('modifie_par__personnel')
 
     def create(self, validated_data):
         validated_data['modifie_par'] = self.context['request'].user
@@ -30,14 +39,29 @@ class RegleCongeSerializer(serializers.ModelSerializer):
                 'matricule': personnel.matricule,
             }
         return None
-class DemandeCongeSerializer(serializers.ModelSerializer):
+class DemandeCongeSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     personnel = PersonnelSerializer(read_only=True)
     conge = serializers.PrimaryKeyRelatedField(read_only=True)
+
+    champs_resume = (
+        'id', 'personnel', 'annee', 'type_demande', 'conge_demande', 'debut_conge', 'periode',
+        'statut', 'motif', 'date_soumission', 'date_validation', 'annule',
+    )
+    relations_resumees = {'personnel': lambda: PersonnelResumeSerializer(read_only=True)}
     class Meta:
         model = DemandeConge
         fields = '__all__'
         read_only_fields = ['annee','statut', 'id','personnel', 'conge', 'date_validation', 'date_annulation',  'annule']
 
+    @classmethod
+    def preparer_queryset(cls, qs, request=None):
+        # personnel imbriqué (et son compte) joint ; conge sérialisé en pk, sans requête
+        garder, expand = cls.selection(request)
+        if garder is None:
+            return joindre_personnel(qs)
+        colonnes = cls.champs_modele(garder)
+        return joindre_personnel(qs, garder, expand, colonnes).only(*colonnes)
+
     def get_demandes(self, obj):
         last_demande = (
             DemandeConge.objects
@@ -77,30 +101,14 @@ class DemandeCongeSerializer(serializers.ModelSerializer):
         # on instancie la demande sans la sauvegarder
         instance = DemandeConge(**data)
 
-        #  valider le type de demande
+        #  valider le type de demande (disponible précalculé et mis en cache, voir conges/disponibilites.py)
         type_demande = data.get('type_demande', 'standard')
         conge_demande = data.get('conge_demande', 0)
-        conge_total_dispo = (
-            to_decimal(conge.conge_restant_annee_n_1)
-            + to_decimal(conge.conge_restant_annee_n_2)
-            + sum(
-                to_decimal(v) for v in conge.conge_mensuel_restant.values()
-                if isinstance(v, (int, float)) or 0
-            )
-        )
+        conge_dispo = disponibilite(conge).pour_type(type_demande, 12)
 
-        if type_demande == 'standard':
-            if to_decimal(conge_demande) > to_decimal(conge_total_dispo):
-                raise serializers.ValidationError({ "conge_demande_non_valide": f"Solde de congé insuffisant. Disponible: {conge_total_dispo} jours." })
-
-        elif type_demande == 'exceptionnel':
-            if to_decimal(conge_demande) > to_decimal(conge.conge_exceptionnel):
-                raise serializers.ValidationError({ "conge_demande_non_valide": f"Solde de congé exceptionnel insuffisant. Disponible: {conge.conge_exceptionnel} jours." })
-         
-        elif type_demande == 'compensatoire':
-            reste = to_decimal(conge.conge_compensatoire)
-            if to_decimal(conge_demande) > reste:
-                raise serializers.ValidationError({ "conge_demande_non_valide": f"Solde de congé compensatoire insuffisant. Disponible: {conge.conge_compensatoire} jours." })
+        if to_decimal(conge_demande) > conge_dispo:
+            libelle = {'exceptionnel': 'Solde de congé exceptionnel', 'compensatoire': 'Solde de congé compensatoire'}.get(type_demande, 'Solde de congé')
+            raise serializers.ValidationError({ "conge_demande_non_valide": f"{libelle} insuffisant. Disponible: {conge_dispo} jours." })
             
         try:
             instance.full_clean()
@@ -109,9 +117,22 @@ class DemandeCongeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(e.message_dict)
         return data
     
-class CongeSerializer(serializers.ModelSerializer):
+class CongeSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     personnel = PersonnelSerializer(read_only=True)
     demandes = DemandeCongeSerializer(many=True, read_only=True)
+    # format historique {"01": jours, ..., "12": jours} lu / écrit dans les colonnes mensuel_01..12
+    conge_mensuel_restant = serializers.DictField(child=serializers.FloatField(), required=False)
+
+    champs_resume = (
+        'id', 'personnel', 'annee', 'conge_initial', 'conge_restant_annee_n_2', 'conge_restant_annee_n_1',
+        'conge_restant_annee_courante', 'conge_total', 'conge_exceptionnel', 'conge_compensatoire',
+    )
+    # sans ?expand=demandes, les demandes sont réduites à leurs ids
+    relations_resumees = {
+        'personnel': lambda: PersonnelResumeSerializer(read_only=True),
+        'demandes': lambda: serializers.PrimaryKeyRelatedField(many=True, read_only=True),
+    }
+    sources_modele = {'conge_mensuel_restant': CHAMPS_MENSUELS}
     class Meta:
         model = Conge
         fields = '__all__'
@@ -119,6 +140,25 @@ class CongeSerializer(serializers.ModelSerializer):
             'annee', 
             'date_maj',
         ]
+
+    @classmethod
+    def preparer_queryset(cls, qs, request=None):
+        # personnel joint, toutes les demandes de la page chargées en une requête (personnel joint aussi)
+        garder, expand = cls.selection(request)
+        if garder is None:
+            return joindre_personnel(qs).prefetch_related(
+                Prefetch('demandes', queryset=DemandeCongeSerializer.preparer_queryset(DemandeConge.objects.all()))
+            )
+
+        colonnes = cls.champs_modele(garder)
+        qs = joindre_personnel(qs, garder, expand, colonnes)
+        if 'demandes' in expand:
+            qs = qs.prefetch_related(
+                Prefetch('demandes', queryset=DemandeCongeSerializer.preparer_queryset(DemandeConge.objects.all()))
+            )
+        elif 'demandes' in garder:
+            qs = qs.prefetch_related(Prefetch('demandes', queryset=DemandeConge.objects.only('id', 'conge')))
+        return qs.only(*colonnes)
     
     def validate(self, data):
         instance = Conge(**data)
@@ -134,4 +174,10 @@ class CongeSerializer(serializers.ModelSerializer):
         except DjangoValidationError as e:
             raise serializers.ValidationError(e.message_dict)
         return data
-    
\ No newline at end of file
+    
+
+class MouvementCongeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MouvementConge
+        fields = '__all__'
+        read_only_fields = [f.name for f in MouvementConge._meta.fields]
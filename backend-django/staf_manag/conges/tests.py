@@ -1,4 +1,34 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from importlib import import_module
+from decimal import Decimal
+from unittest import mock
+
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+import numpy as np
+import pandas as pd
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from conges.import_helpers import import_conges_df
+from conges import regle_cache, regle_jobs
+from conges.calendrier import occupation_par_jour
+from conges.disponibilites import disponibilite, disponibilites
+from conges.bulk_helpers import acquisition_mensuelle_en_masse, appliquer_regle_en_masse, calculer_parts_mensuelles
+from conges.models import _quant, Conge, DemandeConge, MouvementConge, RegleConge, SoldeCongeSnapshot
+from conges.serializers import CongeSerializer
+from conges.mouvements import COMPTEURS, enregistrer_mouvement, etat_compteurs, snapshot_soldes, solde_a_date
+from personnel.models import Personnel, Demande
+from staf_manag.utils.conges import CHAMPS_MENSUELS, en_centiemes
 
 # Create your tests here.
 # def test_personnel_recent_ne_peut_pas_demander(db, django_user_model, client):
@@ -11,3 +41,766 @@ from django.test import TestCase
 #     dem = DemandeConge(personnel=p, conge=conge, conge_demande=1, debut_conge=date.today())
 #     with pytest.raises(ValidationError):
 #         dem.clean()
+
+def creer_personnel(i, **champs):
+    # le signal post_save crée le compte et le conge de l'année
+    valeurs = dict(
+        nom=f"Nom{i}", prenoms=f"Prenom{i}", grade="Technicien", specialite="Info",
+        ecole_origine="ENIT", cin=f"C{i:05d}", matricule=f"M{i:05d}", telephone="0",
+        email=f"p{i}@exemple.tn", date_affectation=date(2020, 1, 1), date_passage_grade=date(2020, 1, 1),
+    )
+    valeurs.update(champs)
+    return Personnel.objects.create(**valeurs)
+
+class NombreRequetesListesTests(TestCase):
+    """Le nombre de requêtes d'une liste ne dépend pas du nombre de lignes (pas de N+1)."""
+
+    LISTES = [
+        "/api/conges/",
+        "/api/conges/demande-conge/",
+        "/api/conges/demande-conge/demandes/",
+        "/api/personnels/",
+        "/api/demandes/",
+    ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser(matricule="ADMIN", password="admin"))
+        self.nb_personnels = 0
+
+    def ajouter_personnels(self, nombre):
+        # le signal post_save crée le compte et le conge de l'année
+        for _ in range(nombre):
+            i = self.nb_personnels = self.nb_personnels + 1
+            personnel = Personnel.objects.create(
+                nom=f"Nom{i}", prenoms=f"Prenom{i}", grade="Technicien", specialite="Info",
+                ecole_origine="ENIT", cin=f"C{i:05d}", matricule=f"M{i:05d}", telephone="0",
+                email=f"p{i}@exemple.tn", date_affectation=date(2020, 1, 1), date_passage_grade=date(2020, 1, 1),
+            )
+            conge = personnel.conges.get()
+            for jour in (1, 5):
+                DemandeConge.objects.create(
+                    personnel=personnel, conge=conge, conge_demande=1,
+                    debut_conge=date(conge.annee, 3, jour),
+                )
+            Demande.objects.create(personnel=personnel, type_demande="attestation")
+
+    def compter_requetes(self, url):
+        with CaptureQueriesContext(connection) as requetes:
+            reponse = self.client.get(url)
+        self.assertEqual(reponse.status_code, 200, url)
+        # la liste doit réellement contenir des lignes, sinon le nombre de requêtes ne prouve rien
+        donnees = reponse.data
+        self.assertTrue(donnees.get("results") if isinstance(donnees, dict) else donnees, url)
+        return len(requetes)
+
+    def test_nombre_de_requetes_fixe(self):
+        self.ajouter_personnels(2)
+        avant = {url: self.compter_requetes(url) for url in self.LISTES}
+
+        self.ajouter_personnels(5)
+        for url in self.LISTES:
+            with self.subTest(url=url):
+                self.assertEqual(self.compter_requetes(url), avant[url])
+
+class KeysetPaginationTests(TestCase):
+    """Parcours page à page d'une liste paginée par clé : chaque ligne une fois, dans l'ordre."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser(matricule="ADMIN", password="admin"))
+        personnel = Personnel.objects.create(
+            nom="Nom", prenoms="Prenom", grade="Technicien", specialite="Info",
+            ecole_origine="ENIT", cin="C00001", matricule="M00001", telephone="0",
+            email="p1@exemple.tn", date_affectation=date(2020, 1, 1), date_passage_grade=date(2020, 1, 1),
+        )
+        conge = personnel.conges.get()
+        # soumissions dans la même milliseconde (écarts de quelques microsecondes) et ex aequo exacts
+        base = timezone.now().replace(microsecond=123000)
+        ecarts = [0, 0, 1, 250, 250, 999, 1000, 1000, 5000]
+        for jour, ecart in enumerate(ecarts, start=1):
+            demande = DemandeConge.objects.create(
+                personnel=personnel, conge=conge, conge_demande=1, debut_conge=date(conge.annee, 3, jour),
+            )
+            DemandeConge.objects.filter(pk=demande.pk).update(date_soumission=base + timedelta(microseconds=ecart))
+
+    def test_parcours_complet_sans_saut_ni_doublon(self):
+        attendu = list(DemandeConge.objects.order_by("-date_soumission", "-id").values_list("id", flat=True))
+
+        vus, url = [], "/api/conges/demande-conge/?page_size=2"
+        while url:
+            reponse = self.client.get(url)
+            self.assertEqual(reponse.status_code, 200)
+            vus.extend(ligne["id"] for ligne in reponse.data["results"])
+            url = reponse.data["next"]
+
+        self.assertEqual(vus, attendu)
+
+class ListeCongesConditionnelleTests(TestCase):
+    """Liste des conges : revalidation par ETag seul (pas de Last-Modified sur cet agrégat)."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser(matricule="ADMIN", password="admin"))
+        personnel = Personnel.objects.create(
+            nom="Nom", prenoms="Prenom", grade="Technicien", specialite="Info",
+            ecole_origine="ENIT", cin="C00001", matricule="M00001", telephone="0",
+            email="p1@exemple.tn", date_affectation=date(2020, 1, 1), date_passage_grade=date(2020, 1, 1),
+        )
+        conge = personnel.conges.get()
+        self.demandes = [
+            DemandeConge.objects.create(
+                personnel=personnel, conge=conge, conge_demande=1, debut_conge=date(conge.annee, 3, jour),
+            )
+            for jour in (1, 5)
+        ]
+
+    def test_suppression_dans_la_meme_seconde_non_masquee(self):
+        reponse = self.client.get("/api/conges/")
+        self.assertEqual(reponse.status_code, 200)
+        self.assertNotIn("Last-Modified", reponse)
+        etag = reponse["ETag"]
+        self.assertEqual(self.client.get("/api/conges/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # max(date_maj) inchangé : seul l'ETag voit la suppression
+        DemandeConge.objects.filter(pk=self.demandes[0].pk).delete()
+        plus_tard = http_date((timezone.now() + timedelta(days=1)).timestamp())
+        reponse = self.client.get("/api/conges/", HTTP_IF_NONE_MATCH=etag, HTTP_IF_MODIFIED_SINCE=plus_tard)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual(self.client.get("/api/conges/", HTTP_IF_MODIFIED_SINCE=plus_tard).status_code, 200)
+
+    def test_mes_demandes_suppression_non_masquee(self):
+        url = "/api/conges/demande-conge/mes_demandes/"
+        self.client.force_authenticate(self.demandes[0].personnel.user)
+        reponse = self.client.get(url)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertNotIn("Last-Modified", reponse)
+        self.assertEqual(len(reponse.data["results"]), 2)
+        etag = reponse["ETag"]
+
+        DemandeConge.objects.filter(pk=self.demandes[1].pk).delete()
+        plus_tard = http_date((timezone.now() + timedelta(days=1)).timestamp())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=plus_tard).status_code, 200)
+
+class ImportCongesTests(TestCase):
+    """Import des soldes : nombre de requêtes fixe, logs des matricules trouvés et introuvables."""
+
+    def setUp(self):
+        self.annee = timezone.now().year
+        self.personnels = [creer_personnel(i) for i in range(1, 7)]
+
+    def feuille(self, matricules):
+        return pd.DataFrame({
+            "matricule": matricules,
+            f"reste de congée {self.annee}": ["12,5"] * len(matricules),
+            "solde les heur.sup": [2] * len(matricules),
+        })
+
+    def importer(self, matricules):
+        with CaptureQueriesContext(connection) as requetes:
+            logs = import_conges_df(self.feuille(matricules), annee=self.annee)
+        return logs, len(requetes)
+
+    def test_requetes_fixes_et_logs(self):
+        # conge manquant pour le premier personnel de chaque import : créé par bulk_create
+        Conge.objects.filter(personnel__in=[self.personnels[0], self.personnels[3]]).delete()
+
+        logs, nb = self.importer(["M00001", "M00002", "INCONNU"])
+        self.assertEqual(logs, [
+            f"Congé de M00001 pour l'annee {self.annee} mis à jour avec success.",
+            f"Congé de M00002 pour l'annee {self.annee} mis à jour avec success.",
+            "Matricule INCONNU introuvable.",
+        ])
+        conge = Conge.objects.get(personnel=self.personnels[0], annee=self.annee)
+        self.assertEqual((conge.conge_restant_annee_courante, conge.conge_compensatoire), (Decimal("12.5"), Decimal("2")))
+
+        _, nb_plus = self.importer(["M00004", "M00005", "M00006", "INCONNU", "AUTRE"])
+        self.assertEqual(nb_plus, nb)
+
+    def test_conge_cree_par_un_import_concurrent(self):
+        personnel = self.personnels[0]
+        Conge.objects.filter(personnel=personnel).delete()
+        bulk_create = Conge.objects.bulk_create
+
+        def creation_concurrente(objs, **kwargs):
+            # l'autre import crée (et ouvre) le conge entre la lecture et l'insertion
+            Conge.objects.create(personnel=personnel, annee=self.annee)
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(Conge.objects, "bulk_create", side_effect=creation_concurrente):
+            logs = import_conges_df(self.feuille(["M00001"]), annee=self.annee)
+
+        self.assertEqual(len(logs), 1)
+        conge = Conge.objects.get(personnel=personnel, annee=self.annee)
+        self.assertEqual(conge.conge_restant_annee_courante, Decimal("12.5"))
+        self.assertEqual(MouvementConge.objects.filter(conge=conge, type_mouvement="ouverture").count(), 1)
+
+class DeltaCongesTests(TestCase):
+    """Export incrémental : pagination par (date_maj, id) et watermark renvoyé tel quel au sync suivant."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser(matricule="ADMIN", password="admin"))
+        self.personnels = [creer_personnel(i) for i in range(1, 6)]
+        # même date_maj pour tous : seul l'id départage
+        Conge.objects.update(date_maj=timezone.now() - timedelta(hours=1))
+
+    def synchroniser(self, depuis=None):
+        params = {"limite": 2}
+        if depuis:
+            params["depuis"] = depuis
+        ids, watermarks = [], set()
+        while True:
+            reponse = self.client.get("/api/conges/delta/", params)
+            self.assertEqual(reponse.status_code, 200)
+            ids.extend(ligne["id"] for ligne in reponse.data["results"])
+            watermarks.add(reponse.data["watermark"])
+            if reponse.data["complet"]:
+                break
+            params = {"limite": 2, "curseur": reponse.data["curseur_suivant"]}
+        self.assertEqual(len(watermarks), 1)
+        return ids, watermarks.pop()
+
+    def test_pagination_sur_date_maj_egales(self):
+        ids, _ = self.synchroniser()
+        self.assertEqual(ids, sorted(Conge.objects.values_list("id", flat=True)))
+
+    def test_watermark_renvoye_au_sync_suivant(self):
+        _, watermark = self.synchroniser()
+        borne = parse_datetime(watermark)
+        conges = list(Conge.objects.order_by("id"))
+        # à la borne exacte : déjà couvert par le premier sync ; une microseconde après : nouveau
+        Conge.objects.filter(pk=conges[0].pk).update(date_maj=borne)
+        Conge.objects.filter(pk=conges[1].pk).update(date_maj=borne + timedelta(microseconds=1))
+
+        ids, suivant = self.synchroniser(depuis=watermark)
+        self.assertEqual(ids, [conges[1].pk])
+        self.assertGreater(parse_datetime(suivant), borne)
+
+class JournalCongesTests(TestCase):
+    """Solde à date = somme des mouvements, avec ou sans snapshot ; snapshots invalidés puis refigés."""
+
+    def setUp(self):
+        self.conges = [creer_personnel(i).conges.get() for i in (1, 2)]
+        # ouvertures datées du 1er janvier 2025 pour un historique stable
+        MouvementConge.objects.update(date_effet=date(2025, 1, 1))
+        self.ajuster(self.conges[0], date(2025, 2, 10), conge_restant_annee_courante=Decimal("1.5"))
+        self.ajuster(self.conges[0], date(2025, 3, 5), conge_restant_annee_courante=Decimal("-2"), conge_compensatoire=Decimal("1"))
+        self.ajuster(self.conges[1], date(2025, 4, 20), conge_restant_annee_n_1=Decimal("3"))
+
+    def ajuster(self, conge, jour, **deltas):
+        avant = etat_compteurs(conge)
+        for champ, delta in deltas.items():
+            setattr(conge, champ, getattr(conge, champ) + delta)
+        enregistrer_mouvement(conge, avant, "ajustement", date_effet=jour)
+
+    def somme_mouvements(self, conge, jour):
+        sommes = MouvementConge.objects.filter(conge=conge, date_effet__lte=jour).aggregate(
+            **{delta: Sum(delta) for delta in COMPTEURS}
+        )
+        return {champ: Decimal(sommes[delta] or 0) for delta, champ in COMPTEURS.items()}
+
+    def verifier_soldes(self):
+        for conge in self.conges:
+            for jour in (date(2025, 1, 31), date(2025, 2, 15), date(2025, 2, 28), date(2025, 3, 31), date(2025, 12, 31)):
+                with self.subTest(conge=conge.pk, jour=jour):
+                    solde = solde_a_date(conge.pk, jour)
+                    self.assertEqual({champ: solde[champ] for champ in COMPTEURS.values()}, self.somme_mouvements(conge, jour))
+
+    def test_solde_a_date_egal_somme_des_mouvements(self):
+        self.verifier_soldes()
+        # fin d'historique : les compteurs du conge lui-même
+        solde = solde_a_date(self.conges[0].pk, date(2025, 12, 31))
+        self.assertEqual(solde["conge_restant_annee_courante"], self.conges[0].conge_restant_annee_courante)
+
+        for jour in (date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31)):
+            self.assertEqual(snapshot_soldes(jour), 2)
+        self.assertEqual(solde_a_date(self.conges[0].pk, date(2025, 3, 15))["date_snapshot"], date(2025, 2, 28))
+        self.verifier_soldes()
+
+    def test_snapshots_invalides_puis_refiges(self):
+        for jour in (date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31)):
+            snapshot_soldes(jour)
+
+        # mouvement rétroactif : les snapshots du conge à partir du 15/02 ne le reflètent pas
+        self.ajuster(self.conges[0], date(2025, 2, 15), conge_exceptionnel=2)
+        self.assertEqual(
+            list(SoldeCongeSnapshot.objects.filter(conge=self.conges[0]).values_list("date_snapshot", flat=True)),
+            [date(2025, 1, 31)],
+        )
+        self.assertEqual(SoldeCongeSnapshot.objects.filter(conge=self.conges[1]).count(), 3)
+        self.verifier_soldes()
+
+        # snapshots refigés dans l'ordre : chacun repart du précédent
+        snapshot_soldes(date(2025, 2, 28))
+        snapshot_soldes(date(2025, 3, 31))
+        snapshot = SoldeCongeSnapshot.objects.get(conge=self.conges[0], date_snapshot=date(2025, 3, 31))
+        self.assertEqual(snapshot.conge_exceptionnel, self.somme_mouvements(self.conges[0], date(2025, 3, 31))["conge_exceptionnel"])
+        self.verifier_soldes()
+
+@override_settings(EMAIL_HOST_USER="rh@exemple.tn", EMAIL_OUTBOX_INLINE_WORKER=False, DJANGO_API_URL="http://test/")
+class DecisionsEnMasseTests(TestCase):
+    """POST /api/conges/demande-conge/decisions/ : résultat par id, verrous ordonnés, débits enchaînés."""
+
+    URL = "/api/conges/demande-conge/decisions/"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser(matricule="ADMIN", password="admin"))
+        self.personnel = creer_personnel(1)
+        self.conge = self.personnel.conges.get()
+        Conge.objects.filter(pk=self.conge.pk).update(conge_compensatoire=10)
+
+    def demande(self, mois, jour, jours=4):
+        return DemandeConge.objects.create(
+            personnel=self.personnel, conge=self.conge, type_demande="compensatoire",
+            conge_demande=jours, debut_conge=date(self.conge.annee, mois, jour),
+        )
+
+    def decider(self, ids, decision="valider"):
+        reponse = self.client.post(self.URL, {"ids": ids, "decision": decision}, format="json")
+        self.assertEqual(reponse.status_code, 200)
+        return reponse.data
+
+    def test_resultats_dans_l_ordre_des_ids(self):
+        d1, d2 = self.demande(3, 1), self.demande(4, 1)
+        data = self.decider([d2.pk, 999999, d1.pk], decision="refuser")
+
+        self.assertEqual([r["id"] for r in data["results"]], [d2.pk, 999999, d1.pk])
+        self.assertEqual([r["statut"] for r in data["results"]], ["refuse", "erreur", "refuse"])
+        self.assertEqual(data["results"][1]["detail"], "Demande introuvable.")
+        self.assertEqual((data["traites"], data["erreurs"]), (2, 1))
+
+    def test_verrous_par_ordre_de_pk(self):
+        autre = creer_personnel(2)
+        demandes = [self.demande(3, 1), self.demande(4, 1)]
+        demandes.append(DemandeConge.objects.create(
+            personnel=autre, conge=autre.conges.get(), conge_demande=1, debut_conge=date(self.conge.annee, 3, 1),
+        ))
+
+        with CaptureQueriesContext(connection) as requetes:
+            self.decider([d.pk for d in reversed(demandes)], decision="refuser")
+        verrous = [q["sql"] for q in requetes.captured_queries if "FOR UPDATE" in q["sql"]]
+
+        self.assertEqual(len(verrous), 2)
+        self.assertIn('FROM "conges_demandeconge"', verrous[0])
+        self.assertIn('ORDER BY "conges_demandeconge"."id" ASC', verrous[0])
+        self.assertIn('FROM "conges_conge"', verrous[1])
+        self.assertIn('ORDER BY "conges_conge"."id" ASC', verrous[1])
+
+    def test_debits_enchaines_pour_un_meme_personnel(self):
+        d1, d2, d3 = self.demande(3, 1), self.demande(4, 1), self.demande(5, 1)
+        data = self.decider([d3.pk, d2.pk, d1.pk])
+
+        # traitées par ordre de soumission : 10 - 4 - 4, la troisième n'a plus de solde
+        statuts = {r["id"]: r["statut"] for r in data["results"]}
+        self.assertEqual((statuts[d1.pk], statuts[d2.pk], statuts[d3.pk]), ("valide", "valide", "erreur"))
+        self.assertIn("insuffisant", data["results"][0]["detail"])
+        self.conge.refresh_from_db()
+        self.assertEqual(self.conge.conge_compensatoire, Decimal("2"))
+        self.assertEqual(MouvementConge.objects.filter(conge=self.conge, type_mouvement="validation").count(), 2)
+
+    def test_chevauchement_dans_le_lot_en_erreur_pour_la_seule_demande(self):
+        d1 = self.demande(3, 1)           # 01/03 - 04/03
+        d2 = self.demande(3, 3, jours=2)  # 03/03 - 04/03 : chevauche d1 validée dans le même lot
+        d3 = self.demande(5, 1, jours=1)
+        data = self.decider([d1.pk, d2.pk, d3.pk])
+
+        self.assertEqual([r["statut"] for r in data["results"]], ["valide", "erreur", "valide"])
+        self.assertIn("chevauche", data["results"][1]["detail"])
+        self.assertIn(d1.periode, data["results"][1]["detail"])
+        d2.refresh_from_db()
+        self.assertEqual(d2.statut, "en_attente")
+        self.conge.refresh_from_db()
+        self.assertEqual(self.conge.conge_compensatoire, Decimal("5"))
+
+
+class ChevauchementDemandeTests(TestCase):
+    """fin_conge, DemandeCongeQuerySet.chevauchant et messages de DemandeConge.clean."""
+
+    def setUp(self):
+        self.personnel = creer_personnel(1)
+        self.conge = self.personnel.conges.get()
+        self.annee = self.conge.annee
+
+    def demande(self, mois, jour, jours, statut="en_attente"):
+        return DemandeConge.objects.create(
+            personnel=self.personnel, conge=self.conge, conge_demande=jours,
+            debut_conge=date(self.annee, mois, jour), statut=statut,
+        )
+
+    def erreurs_clean(self, mois, jour, jours):
+        demande = DemandeConge(
+            personnel=self.personnel, conge=self.conge, annee=self.annee,
+            conge_demande=jours, debut_conge=date(self.annee, mois, jour),
+        )
+        with self.assertRaises(ValidationError) as ctx:
+            demande.clean()
+        return ctx.exception.message_dict
+
+    def test_chevauchant_bornes_incluses(self):
+        valide = self.demande(3, 10, 5)  # 10/03 - 14/03
+        self.assertEqual(valide.fin_conge, date(self.annee, 3, 14))
+
+        def chevauche(debut, fin):
+            return DemandeConge.objects.chevauchant(date(self.annee, *debut), date(self.annee, *fin)).exists()
+
+        self.assertTrue(chevauche((3, 14), (3, 20)))
+        self.assertTrue(chevauche((3, 1), (3, 10)))
+        self.assertTrue(chevauche((3, 11), (3, 12)))
+        self.assertTrue(chevauche((3, 1), (3, 31)))
+        self.assertFalse(chevauche((3, 15), (3, 20)))
+        self.assertFalse(chevauche((3, 1), (3, 9)))
+
+    def test_clean_meme_debut(self):
+        self.demande(3, 10, 5, statut="valide")
+        self.assertIn("conflits", self.erreurs_clean(3, 10, 2))
+
+    def test_clean_conge_valide_anterieur(self):
+        self.demande(3, 10, 5, statut="valide")
+        erreurs = self.erreurs_clean(3, 12, 5)
+        self.assertEqual(list(erreurs), ["demande interdite"])
+
+    def test_clean_chevauchement_vers_l_avant(self):
+        valide = self.demande(3, 10, 5, statut="valide")
+        erreurs = self.erreurs_clean(3, 8, 4)  # 08/03 - 11/03 déborde sur le congé du 10/03
+        self.assertEqual(list(erreurs), ["chevauchement"])
+        self.assertIn(valide.periode, erreurs["chevauchement"][0])
+
+    def test_clean_sans_chevauchement(self):
+        self.demande(3, 10, 5, statut="valide")
+        self.demande(3, 20, 5)  # en attente : ignorée
+        DemandeConge(
+            personnel=self.personnel, conge=self.conge, annee=self.annee,
+            conge_demande=5, debut_conge=date(self.annee, 3, 20),
+        ).clean()
+
+    def test_migration_remplir_fin_conge(self):
+        migration = import_module("conges.migrations.0015_demandeconge_fin_conge")
+        complete = self.demande(3, 10, 5)
+        sans_jours = self.demande(4, 1, 0)
+        DemandeConge.objects.update(fin_conge=None)
+
+        migration.remplir_fin_conge(apps, None)
+
+        complete.refresh_from_db()
+        sans_jours.refresh_from_db()
+        self.assertEqual(complete.fin_conge, date(self.annee, 3, 14))
+        self.assertIsNone(sans_jours.fin_conge)
+
+
+class RegleCacheTests(TestCase):
+    """conges/regle_cache.py : copie par process invalidée par la version partagée dans le cache Django."""
+
+    def setUp(self):
+        self.regle = RegleConge.objects.create(conge_initial_tech=72, conge_initial_autres=45)
+        regle_cache.invalider_regle_courante()
+
+    def test_sans_requete_quand_a_jour(self):
+        regle_cache.regle_courante()
+        with self.assertNumQueries(0):
+            self.assertEqual(regle_cache.regle_courante().conge_initial_tech, 72)
+
+    def test_nouvelle_valeur_des_le_save(self):
+        self.assertEqual(regle_cache.conge_initial_pour_categorie("autres"), 45)
+
+        self.regle.conge_initial_autres = 50
+        self.regle.save()
+
+        self.assertEqual(regle_cache.conge_initial_pour_categorie("autres"), 50)
+
+    def test_version_changee_par_un_autre_worker(self):
+        self.assertEqual(regle_cache.regle_courante().conge_initial_tech, 72)
+
+        # autre process : la règle change en base et la version partagée avec elle,
+        # la copie locale de ce process n'est pas touchée
+        RegleConge.objects.filter(pk=self.regle.pk).update(conge_initial_tech=80)
+        cache.set(regle_cache.REGLE_VERSION_CLE, "autre worker", None)
+
+        self.assertEqual(regle_cache.regle_courante().conge_initial_tech, 80)
+
+
+class AcquisitionMensuelleTests(TestCase):
+    """update_monthly_acquisition : calcul numpy en centièmes identique au calcul Decimal par ligne."""
+
+    def test_part_entiere_egale_arrondi_decimal(self):
+        initiaux = np.arange(0, 1000, dtype=np.int64)
+        parts, _ = calculer_parts_mensuelles(initiaux, np.zeros_like(initiaux), np.zeros_like(initiaux), 2026, 12)
+
+        attendu = [en_centiemes(_quant(Decimal(int(c)) / Decimal(12))) for c in initiaux]
+        self.assertEqual(parts.tolist(), attendu)
+
+    def test_en_masse_egal_unitaire(self):
+        annee = timezone.now().year
+        as_of = date(annee, 7, 15)
+        cas = [
+            (72, date(2020, 1, 1)),
+            (45, date(annee, 3, 10)),   # affecté dans l'année
+            (31, date(annee, 9, 1)),    # affecté après as_of
+            (17, date(annee + 1, 1, 1)),
+            (0, date(2020, 1, 1)),
+        ]
+        for i, (initial, date_aff) in enumerate(cas):
+            creer_personnel(i, date_affectation=date_aff)
+        for personnel, (initial, _) in zip(Personnel.objects.order_by('pk'), cas):
+            Conge.objects.filter(personnel=personnel).update(conge_initial=initial)
+        zeros = dict.fromkeys(CHAMPS_MENSUELS, 0)
+        qs = Conge.objects.filter(annee=annee).order_by('personnel_id')
+
+        Conge.objects.update(**zeros)
+        acquisition_mensuelle_en_masse(as_of=as_of)
+        en_masse = list(qs.values_list(*CHAMPS_MENSUELS))
+
+        Conge.objects.update(**zeros)
+        for conge in qs.select_related('personnel'):
+            conge.recalculer_acquisition_mensuelle(as_of=as_of, save=True)
+        unitaire = list(qs.values_list(*CHAMPS_MENSUELS))
+
+        self.assertEqual(en_masse, unitaire)
+        self.assertEqual(en_masse[0], (600,) * 7 + (0,) * 5)
+        self.assertEqual(en_masse[1], (0, 0) + (375,) * 5 + (0,) * 5)
+
+
+class RolloverCongesTests(TestCase):
+    """rollover_conges : le mode par lots (défaut) donne le même état que --unitaire."""
+
+    CHAMPS = [
+        'annee', 'conge_initial', 'conge_exceptionnel', 'conge_compensatoire', 'conge_restant_annee_n_2',
+        'conge_restant_annee_n_1', 'conge_restant_annee_courante', 'conge_total', *CHAMPS_MENSUELS,
+    ]
+    DELTAS = ['conge_id', 'annee', 'delta_n_2', 'delta_n_1', 'delta_courante']
+
+    def setUp(self):
+        self.annee = timezone.now().year
+        cas = [
+            ("Technicien", date(2020, 1, 1), 72, "10.50", "3.00", "1.00"),
+            ("Administrateur", date(self.annee, 1, 1), 45, "0.00", "12.25", "0.00"),
+            ("Technicien", date(2020, 1, 1), 0, "5.00", "0.00", "2.50"),  # conge_initial repris de la règle
+        ]
+        for i, (grade, date_aff, initial, courante, n_1, compensatoire) in enumerate(cas):
+            personnel = creer_personnel(i, grade=grade, date_affectation=date_aff)
+            Conge.objects.filter(personnel=personnel).update(
+                annee=self.annee - 1, conge_initial=initial, conge_restant_annee_courante=Decimal(courante),
+                conge_restant_annee_n_1=Decimal(n_1), conge_compensatoire=Decimal(compensatoire),
+            )
+        self.initial = list(Conge.objects.order_by('pk').values('pk', *self.CHAMPS))
+
+    def executer(self, *options):
+        with mock.patch("conges.management.commands.rollover_conges.time.sleep"):
+            call_command("rollover_conges", "--annee", str(self.annee), *options, stdout=mock.MagicMock())
+        etat = list(Conge.objects.order_by('pk').values_list(*self.CHAMPS))
+        mouvements = list(
+            MouvementConge.objects.filter(type_mouvement='rollover').order_by('conge_id').values_list(*self.DELTAS)
+        )
+        return etat, mouvements
+
+    def restaurer(self):
+        MouvementConge.objects.filter(type_mouvement='rollover').delete()
+        for ligne in self.initial:
+            Conge.objects.filter(pk=ligne.pop('pk')).update(**ligne)
+
+    def test_par_lots_egal_unitaire(self):
+        par_lots = self.executer("--batch-size", "2")
+        self.restaurer()
+        unitaire = self.executer("--unitaire")
+
+        self.assertEqual(par_lots, unitaire)
+        self.assertEqual(len(par_lots[1]), 3)
+        self.assertTrue(all(ligne[0] == self.annee for ligne in par_lots[0]))
+
+
+class DisponibilitesCacheTests(TestCase):
+    """conges/disponibilites.py : entrée de cache versionnée par Conge.date_maj."""
+
+    def setUp(self):
+        cache.clear()
+        self.conge = creer_personnel(1).conges.get()
+        Conge.objects.filter(pk=self.conge.pk).update(conge_compensatoire=Decimal("3.00"))
+
+    def test_cle_change_avec_date_maj(self):
+        qs = Conge.objects.filter(pk=self.conge.pk)
+        self.assertEqual(disponibilites(qs)[0].compensatoire, Decimal("3.00"))
+        with self.assertNumQueries(1):  # (id, date_maj) seulement, calcul servi par le cache
+            self.assertEqual(disponibilites(qs)[0].compensatoire, Decimal("3.00"))
+
+        # écriture sans save (bulk_update, import, règle) : date_maj est écrit explicitement
+        qs.update(conge_compensatoire=Decimal("5.00"), date_maj=timezone.now() + timedelta(seconds=1))
+
+        with self.assertNumQueries(2):
+            self.assertEqual(disponibilites(qs)[0].compensatoire, Decimal("5.00"))
+        self.assertEqual(disponibilite(qs.get()).compensatoire, Decimal("5.00"))
+
+    def test_meme_date_maj_sert_le_cache(self):
+        qs = Conge.objects.filter(pk=self.conge.pk)
+        disponibilites(qs)
+        qs.update(conge_compensatoire=Decimal("5.00"))  # date_maj inchangé : entrée toujours valide
+
+        self.assertEqual(disponibilites(qs)[0].compensatoire, Decimal("3.00"))
+
+
+class OccupationParJourTests(SimpleTestCase):
+    """conges/calendrier.py : les congés qui débordent de la plage sont coupés aux deux bornes."""
+
+    def test_coupure_aux_bornes(self):
+        debut, fin = date(2026, 3, 10), date(2026, 3, 14)
+        periodes = [
+            (date(2026, 3, 1), date(2026, 3, 11)),   # commence avant la plage
+            (date(2026, 3, 13), date(2026, 3, 20)),  # finit après la plage
+            (date(2026, 2, 1), date(2026, 4, 30)),   # couvre toute la plage
+            (date(2026, 3, 10), date(2026, 3, 10)),  # premier jour seulement
+            (date(2026, 3, 14), date(2026, 3, 14)),  # dernier jour seulement
+            (date(2026, 3, 12), date(2026, 3, 12)),
+        ]
+        lignes = [{"debut_conge": d, "fin_conge": f} for d, f in periodes]
+
+        occupation = occupation_par_jour(lignes, debut, fin)
+
+        attendu = []
+        for k in range(5):
+            jour = debut + timedelta(days=k)
+            attendu.append({"date": jour.isoformat(), "absents": sum(d <= jour <= f for d, f in periodes)})
+        self.assertEqual(occupation, attendu)
+        self.assertEqual([j["absents"] for j in occupation], [3, 2, 2, 2, 3])
+
+    def test_plage_d_un_jour(self):
+        jour = date(2026, 3, 10)
+        lignes = [{"debut_conge": date(2026, 3, 1), "fin_conge": date(2026, 3, 31)}]
+        self.assertEqual(occupation_par_jour(lignes, jour, jour), [{"date": "2026-03-10", "absents": 1}])
+
+
+class ChampsDynamiquesTests(TestCase):
+    """?fields= / ?vue=resume / ?expand= : forme des lignes et requêtes SQL réduites en conséquence."""
+
+    PERSONNEL_RESUME = {"id", "matricule", "nom", "prenoms", "grade"}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser(matricule="ADMIN", password="admin"))
+        self.nb_personnels = 0
+        self.ajouter_personnels(2)
+
+    def ajouter_personnels(self, nombre):
+        for _ in range(nombre):
+            self.nb_personnels += 1
+            conge = creer_personnel(self.nb_personnels).conges.get()
+            for jour in (1, 5):
+                DemandeConge.objects.create(
+                    personnel=conge.personnel, conge=conge, conge_demande=1, debut_conge=date(conge.annee, 3, jour),
+                )
+            Demande.objects.create(personnel=conge.personnel, type_demande="attestation")
+
+    def lister(self, url):
+        with CaptureQueriesContext(connection) as requetes:
+            reponse = self.client.get(url)
+        self.assertEqual(reponse.status_code, 200, url)
+        lignes = reponse.data["results"] if isinstance(reponse.data, dict) else reponse.data
+        self.assertTrue(lignes, url)
+        # hors requêtes de l'ETag (agrégat) et du hook de démarrage
+        sql = [q["sql"] for q in requetes.captured_queries if not q["sql"].startswith(('SELECT COUNT', 'UPDATE'))]
+        return lignes, sql
+
+    def requete(self, sql, table):
+        return [q for q in sql if q.startswith(f'SELECT "{table}".')]
+
+    def test_fields(self):
+        lignes, sql = self.lister("/api/conges/?fields=id,annee,conge_total")
+
+        self.assertEqual({frozenset(ligne) for ligne in lignes}, {frozenset({"id", "annee", "conge_total"})})
+        liste, = self.requete(sql, "conges_conge")
+        self.assertNotIn("mensuel_01", liste)
+        self.assertNotIn('"personnel_personnel"', liste)
+        self.assertFalse(self.requete(sql, "conges_demandeconge"))
+
+    def test_vue_resume(self):
+        lignes, sql = self.lister("/api/conges/?vue=resume")
+        self.assertEqual(set(lignes[0]), set(CongeSerializer.champs_resume))
+        self.assertEqual(set(lignes[0]["personnel"]), self.PERSONNEL_RESUME)
+        # personnel résumé joint, sans son compte ; pas de demandes
+        liste, = self.requete(sql, "conges_conge")
+        self.assertIn('"personnel_personnel"."matricule"', liste)
+        self.assertNotIn('"accounts_customuser"', liste)
+        self.assertNotIn('"personnel_personnel"."cv"', liste)
+        self.assertFalse(self.requete(sql, "conges_demandeconge"))
+
+    def test_expand(self):
+        lignes, _ = self.lister("/api/conges/?fields=id,demandes")
+        self.assertTrue(all(isinstance(pk, int) for pk in lignes[0]["demandes"]))
+
+        lignes, _ = self.lister("/api/conges/?vue=resume&expand=demandes,personnel")
+        self.assertEqual(len(lignes[0]["demandes"]), 2)
+        self.assertIn("periode", lignes[0]["demandes"][0])
+        self.assertIn("role", lignes[0]["personnel"])
+
+    def test_sans_parametre_inchange(self):
+        lignes, _ = self.lister("/api/conges/")
+        self.assertIn("conge_mensuel_restant", lignes[0])
+        self.assertIn("role", lignes[0]["personnel"])
+        self.assertIn("periode", lignes[0]["demandes"][0])
+
+    def test_nombre_de_requetes_fixe(self):
+        urls = [
+            "/api/conges/?fields=id,annee,demandes",
+            "/api/conges/?vue=resume",
+            "/api/conges/?vue=resume&expand=demandes,personnel",
+            "/api/conges/demande-conge/?vue=resume",
+            "/api/personnels/?fields=id,nom,role",
+            "/api/demandes/?vue=resume&expand=personnel",
+        ]
+        self.lister(urls[0])  # première requête du process : hook de reprise des imports
+        avant = {url: len(self.lister(url)[1]) for url in urls}
+
+        self.ajouter_personnels(4)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(len(self.lister(url)[1]), avant[url])
+
+
+class ApplicationRegleTests(TestCase):
+    """Nouvelle RegleConge : soumise après commit, appliquée par lots aux seuls conges concernés."""
+
+    def setUp(self):
+        self.annee = timezone.now().year
+        self.as_of = date(self.annee, 7, 15)
+        cas = [
+            ("Technicien", 72, "72.00"),
+            ("Administrateur", 45, "3.00"),  # solde courant presque épuisé : jamais négatif
+            ("Administrateur", 40, "40.00"),  # déjà aligné sur la nouvelle règle
+        ]
+        self.conges = []
+        for i, (grade, initial, courante) in enumerate(cas):
+            conge = creer_personnel(i, grade=grade).conges.get()
+            Conge.objects.filter(pk=conge.pk).update(conge_initial=initial, conge_restant_annee_courante=Decimal(courante))
+            self.conges.append(conge)
+
+    def test_soumise_apres_commit(self):
+        executor = mock.MagicMock()
+        with mock.patch.object(regle_jobs, "get_executor", return_value=executor), \
+                self.captureOnCommitCallbacks(execute=True):
+            regle = RegleConge.objects.create(conge_initial_tech=80, conge_initial_autres=40)
+            executor.submit.assert_not_called()
+
+        executor.submit.assert_called_once_with(regle_jobs.executer_application, regle.pk)
+        regle.refresh_from_db()
+        self.assertEqual(regle.statut_application, "en_attente")
+
+    def test_application_par_lots(self):
+        regle = RegleConge(conge_initial_tech=80, conge_initial_autres=40)
+        progression = []
+
+        stats = appliquer_regle_en_masse(
+            regle, batch_size=1, as_of=self.as_of, progress=lambda *etat: progression.append(etat),
+        )
+
+        self.assertEqual(stats, {"lus": 2, "modifies": 2, "total": 2})
+        self.assertEqual(progression, [(1, 2, 1), (2, 2, 2)])
+        tech, autre, aligne = (Conge.objects.get(pk=c.pk) for c in self.conges)
+        self.assertEqual((tech.conge_initial, tech.conge_restant_annee_courante), (80, Decimal("80.00")))
+        self.assertEqual((autre.conge_initial, autre.conge_restant_annee_courante), (40, Decimal("0.00")))
+        self.assertEqual(aligne.conge_restant_annee_courante, Decimal("40.00"))
+        # acquisitions recalculées comme recalculer_acquisition_mensuelle
+        self.assertEqual([getattr(tech, champ) for champ in CHAMPS_MENSUELS], [667] * 7 + [0] * 5)
+        self.assertEqual(
+            sorted(MouvementConge.objects.filter(type_mouvement="regle").values_list("conge_id", flat=True)),
+            sorted([tech.pk, autre.pk]),
+        )
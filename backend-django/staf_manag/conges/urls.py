@@ -3,9 +3,10 @@ from rest_framework.routers import DefaultRouter
 from conges.views import RegleCongeViewSet, CongeViewSet, DemandeCongeViewSet
 
 router = DefaultRouter()
-router.register(r'', CongeViewSet, basename='conges')
+# préfixes nommés d'abord : la route détail de CongeViewSet (^<pk>/$) capterait /demande-conge/ et /regle-conge/
 router.register(r'demande-conge', DemandeCongeViewSet, basename='demande-conge')
 router.register(r'regle-conge', RegleCongeViewSet, basename='regle-conge')
+router.register(r'', CongeViewSet, basename='conges')
 urlpatterns = [
     path('', include(router.urls)),
 ]
\ No newline at end of file
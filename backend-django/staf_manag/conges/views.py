@@ -4,30 +4,36 @@ from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import permissions, viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from conges.serializers import CongeSerializer, DemandeCongeSerializer, RegleCongeSerializer
+from conges.serializers import CongeSerializer, DemandeCongeSerializer, RegleCongeSerializer, MouvementCongeSerializer
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import Count, Max, Sum
 from datetime import datetime
 # from personnel.views import IsAdminUser
 
 from django.conf import settings
 from django.core.mail import send_mail
 
-from staf_manag.utils.email_utils import send_html_email
-from staf_manag.utils.conges import to_decimal, COL_MAP, detect_header_row, safe_value, normalize, get_col
+from staf_manag.utils.email_utils import mettre_en_file
+from accounts.digest_admin import admin_notifications, planifier_digest
+from staf_manag.utils.conditionnel import conditionnel
+from staf_manag.utils.conges import to_decimal
 
 
-# from .pagination import StandardReesultatsSetPagination
+from conges.pagination import KeysetPagination
 # from django_filters.rest_framework import DjangoFilterBackend
 
 from conges.models import Conge, DemandeConge, RegleConge
+from conges.import_helpers import lire_feuille_conges, import_conges_df
+from conges.delta_helpers import page_delta, parse_watermark
+from conges.decisions import decider_en_masse
+from conges.disponibilites import disponibilites
+from conges.calendrier import absences, occupation_par_jour, valider_plage, FILTRES_PERSONNEL
+from conges.mouvements import etat_compteurs, enregistrer_mouvement, solde_a_date
 from personnel.models import Personnel
-from accounts.models import CustomUser
 from staf_manag.forms import UploadFileForm
 from staf_manag.pandas_import import lire_docx, parse_date
 
-import pandas as pd
-
 class IsAdminUser(permissions.BasePermission):
     """
     Permission personnalisée: s'assurer que l'utilisateur est admin
@@ -49,14 +55,37 @@ class IsAdminOrOwner(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user and request.user.is_authenticated
 
+def reponse_delta(request, source):
+    """
+    Réponse commune des endpoints d'export incrémental (?depuis=, ?curseur=, ?limite=).
+
+    Limites (cf. conges/delta_helpers.py) :
+    - date_maj est fixée en Python avant le commit : une transaction d'écriture plus longue que
+      CONGE_DELTA_MARGE_SECONDES peut valider des lignes sous un watermark déjà enregistré par le client,
+      qui ne les verra pas ; les écritures en masse (rollover, règle, acquisition) doivent rester en deçà
+    - les suppressions ne sont pas signalées : le client refait un export complet (sans ?depuis=)
+      pour retirer les lignes disparues
+    """
+    try:
+        depuis = request.query_params.get("depuis")
+        page = page_delta(
+            source,
+            depuis=parse_watermark(depuis) if depuis else None,
+            curseur=request.query_params.get("curseur"),
+            limite=int(request.query_params.get("limite", 500)),
+        )
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(page, status=status.HTTP_200_OK)
+
 class RegleCongeViewSet(viewsets.ModelViewSet):
-    queryset = RegleConge.objects.all().order_by('-date_maj')
+    queryset = RegleCongeSerializer.preparer_queryset(RegleConge.objects.all()).order_by('-date_maj')
     serializer_class = RegleCongeSerializer
     permission_classes = [permissions.IsAuthenticated,permissions.IsAdminUser]
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser, permissions.IsAuthenticated])
     def get_regle_courante(self, request):
-        regles = RegleConge.objects.order_by('-date_maj')[:2]
+        regles = RegleCongeSerializer.preparer_queryset(RegleConge.objects.order_by('-date_maj'))[:2]
         if not regles.exists():
             return Response({"error": "Aucune règle définie."}, status=status.HTTP_404_NOT_FOUND)
         
@@ -64,7 +93,7 @@ class RegleCongeViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser, permissions.IsAuthenticated])
     def get_all_regles(self, request):
-        regles = RegleConge.objects.order_by('-date_maj')
+        regles = RegleCongeSerializer.preparer_queryset(RegleConge.objects.order_by('-date_maj'))
         if not regles.exists():
             return Response({"error": "Aucune règle définie."}, status=status.HTTP_404_NOT_FOUND)
         
@@ -83,14 +112,43 @@ class RegleCongeViewSet(viewsets.ModelViewSet):
             )
         return Response(RegleCongeSerializer(regle).data, status=status.HTTP_200_OK)
         
+def validateurs_liste_conges(view, request, *args, **kwargs):
+    # une requête agrégée : conges, leurs demandes imbriquées et la version des comptes des personnels affichés
+    agregat = (
+        view.filter_queryset(view.get_queryset()).prefetch_related(None).order_by()
+        .aggregate(
+            nb=Count('id', distinct=True),
+            derniere=Max('date_maj'),
+            nb_demandes=Count('demandes', distinct=True),
+            derniere_demande=Max('demandes__date_maj'),
+            versions=Sum('personnel__user__version_donnees'),
+        )
+    )
+    # pas de Last-Modified : max(date_maj) tronqué à la seconde ne voit ni deux modifications dans la même
+    # seconde ni les suppressions ; l'ETag (nombres, dates complètes, versions) suffit
+    return tuple(agregat.values()), None
+
+def validateurs_mes_demandes(view, request, *args, **kwargs):
+    annee = timezone.now().year
+    agregat = (
+        DemandeConge.objects.filter(personnel_id=request.user.personnel_id, annee=annee)
+        .order_by()
+        .aggregate(nb=Count('id'), derniere=Max('date_maj'))
+    )
+    # même raison que pour la liste des conges : ETag seul, pas de Last-Modified
+    return (annee, agregat['nb'], agregat['derniere']), None
+
 class CongeViewSet(viewsets.ModelViewSet):
     queryset = Conge.objects.all()
     serializer_class = CongeSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrOwner]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-annee', '-id')
 
     def get_queryset(self):
         user = self.request.user        
-        qs = Conge.objects.select_related('personnel').order_by('-annee')
+        # relations lues par CongeSerializer chargées d'avance : nombre de requêtes fixe par page
+        qs = CongeSerializer.preparer_queryset(Conge.objects.all(), self.request).order_by('-annee')
 
         # si admin et un filtre personnel_id est passé -> filtrer par ce personnel
         if user.is_staff:
@@ -112,6 +170,10 @@ class CongeViewSet(viewsets.ModelViewSet):
         if hasattr(user, 'personnel'):
             return qs.filter(personnel__user=user)
         return Conge.objects.none()
+
+    @conditionnel(validateurs_liste_conges)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
     @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
     def import_conges(self, request):
@@ -122,53 +184,16 @@ class CongeViewSet(viewsets.ModelViewSet):
         # choisi un format de fichier excel "xlsx", "xls"
         extensions = fichier.name.split('.')[-1].lower()
         if extensions in ['xlsx', 'xls']:
-            # df = pd.read_excel(fichier)
-            df_row = pd.read_excel(fichier, header=None)
-            header_now = detect_header_row(df_row)
-
-            df = pd.read_excel(fichier, header=header_now)
-            df.columns = [normalize(col) for col in df.columns] 
+            # lecture unique du classeur (détection de l'en-tête comprise)
+            try:
+                df = lire_feuille_conges(fichier)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         else:
             return Response({"error": "Veuillez fournir un fichier Excel."}, status=status.HTTP_400_BAD_REQUEST)
 
-        logs = []
-        annee = timezone.now().year
-        for _, row in df.iterrows():
-            matricule = get_col(row, COL_MAP["matricule"])
-            if not matricule or pd.isna(matricule):
-                continue
-            matricule = str(matricule).strip()
-
-            reste_n_2 = get_col(row, COL_MAP["reste_n_2"])
-            reste_n_1 = get_col(row, COL_MAP["reste_n_1"])
-            reste_n = get_col(row, COL_MAP["reste_n"])
-            compensation = get_col(row, COL_MAP["compensation"])
-            exceptionnel = get_col(row, COL_MAP["exceptionnel"])
-
-            try:
-                personnel = Personnel.objects.get(matricule=matricule)
-                conge, created = Conge.objects.get_or_create(personnel=personnel, annee=annee)
-
-                reste_n_2 = safe_value(reste_n_2, conge.conge_restant_annee_n_2)
-                reste_n_1 = safe_value(reste_n_1, conge.conge_restant_annee_n_1)
-                reste_n = safe_value(reste_n, conge.conge_restant_annee_courante)
-                compensation = safe_value(compensation, conge.conge_compensatoire)
-                exceptionnel = safe_value(exceptionnel, conge.conge_exceptionnel)
-
-                conge.conge_restant_annee_n_2 = to_decimal(reste_n_2)
-                conge.conge_restant_annee_n_1 = to_decimal(reste_n_1)
-                conge.conge_restant_annee_courante = to_decimal(reste_n)
-                conge.conge_compensatoire = to_decimal(compensation)
-                conge.conge_exceptionnel = (exceptionnel)
-
-                conge.recalculer_total_conges(save=False)
-
-                conge.save()
-                logs.append(f"Congé de {matricule} pour l'annee {conge.annee} mis à jour avec success.")
-            except Personnel.DoesNotExist:
-                logs.append(f"Matricule {matricule} introuvable.")
-            except Conge.DoesNotExist:
-                logs.append(f"Congé de {matricule} pour l'annee {conge.annee} introuvable.")
+        # import en lot : résolution des matricules, bulk_create / bulk_update en une transaction
+        logs = import_conges_df(df, annee=timezone.now().year)
 
         return Response({"logs": logs}, status=status.HTTP_200_OK)
         
@@ -194,13 +219,16 @@ class CongeViewSet(viewsets.ModelViewSet):
                 "conge_compensatoire",
             ]
 
+            avant = etat_compteurs(conge)
             for field in fields:
                 if field in request.data and request.data[field] not in ["", None]:
                     setattr(conge, field, to_decimal(request.data[field]))
 
-            conge.recalculer_total_conges()
+            conge.recalculer_total_conges(save=False)
             conge.full_clean()
-            conge.save()
+            with transaction.atomic():
+                conge.save()
+                enregistrer_mouvement(conge, avant, 'ajustement', cree_par=request.user, motif=(request.data.get('motif') or '')[:255])
 
             return Response({"message": f"Congé de {matricule} pour l'annee {conge.annee} mis à jour avec success."}, status=status.HTTP_200_OK)
         except Personnel.DoesNotExist:
@@ -231,19 +259,79 @@ class CongeViewSet(viewsets.ModelViewSet):
         except Personnel.DoesNotExist:
             return Response({"error": "Introuvable"}, status=404)
 
-message_list = []       
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def delta(self, request):
+        # conges modifiés depuis le watermark (synchronisation paie) ; limites : cf. reponse_delta
+        return reponse_delta(request, "conges")
+
+    @action(detail=True, methods=['get'])
+    def solde(self, request, pk=None):
+        # solde à une date (?date=YYYY-MM-DD, défaut aujourd'hui) : dernier snapshot + mouvements suivants
+        conge = self.get_object()
+        try:
+            jour = parse_date(request.query_params.get('date')) or timezone.localdate()
+        except ValueError:
+            return Response({"error": "Date invalide"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(solde_a_date(conge.pk, jour), status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'])
+    def mouvements(self, request, pk=None):
+        # historique des mouvements du conge (?depuis= / ?jusqu_a= sur la date d'effet)
+        conge = self.get_object()
+        qs = conge.mouvements.select_related('cree_par').order_by('date_effet', 'id')
+        try:
+            depuis = parse_date(request.query_params.get('depuis'))
+            jusqu_a = parse_date(request.query_params.get('jusqu_a'))
+        except ValueError:
+            return Response({"error": "Date invalide"}, status=status.HTTP_400_BAD_REQUEST)
+        if depuis:
+            qs = qs.filter(date_effet__gte=depuis)
+        if jusqu_a:
+            qs = qs.filter(date_effet__lte=jusqu_a)
+        return Response(MouvementCongeSerializer(qs, many=True).data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def disponibilites(self, request):
+        # jours disponibles par mois et par type (?personnels=1,2,3 pour l'admin, ?annee=, ?mois=)
+        qs = self.get_queryset().prefetch_related(None)
+        try:
+            annee = int(request.query_params.get('annee') or timezone.now().year)
+            mois = request.query_params.get('mois')
+            mois = int(mois) if mois else None
+            personnels = request.query_params.get('personnels')
+            if personnels:
+                qs = qs.filter(personnel_id__in=[int(p) for p in personnels.split(',') if p.strip()])
+        except ValueError:
+            return Response({"error": "Paramètre invalide"}, status=status.HTTP_400_BAD_REQUEST)
+        if mois is not None and not 1 <= mois <= 12:
+            return Response({"error": "Mois invalide"}, status=status.HTTP_400_BAD_REQUEST)
+
+        resultats = []
+        for dispo in disponibilites(qs.filter(annee=annee)):
+            data = dispo.as_dict()
+            if mois:
+                data["au_mois"] = {
+                    type_demande: float(dispo.pour_type(type_demande, mois))
+                    for type_demande, _ in DemandeConge.TYPE_DEMANDE
+                }
+            resultats.append(data)
+        return Response(resultats, status=status.HTTP_200_OK)
+
+message_list = []    
 class DemandeCongeViewSet(viewsets.ModelViewSet):
     queryset = DemandeConge.objects.all()
     serializer_class = DemandeCongeSerializer
     permission_classes = [permissions.IsAuthenticated,IsAdminOrOwner]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date_soumission', '-id')
 
     
     def get_queryset(self):
         user = self.request.user
         if user.is_staff:
-            return DemandeConge.objects.select_related('personnel').all().order_by('-date_soumission')
+            return DemandeCongeSerializer.preparer_queryset(DemandeConge.objects.all(), self.request).order_by('-date_soumission')
         if getattr(user, 'personnel', None):
-            return DemandeConge.objects.select_related('personnel').filter(personnel__user=user).order_by('-date_soumission')
+            return DemandeCongeSerializer.preparer_queryset(DemandeConge.objects.filter(personnel__user=user), self.request).order_by('-date_soumission')
         return DemandeConge.objects.none()
     
     def perform_create(self, serializer):
@@ -271,16 +359,20 @@ class DemandeCongeViewSet(viewsets.ModelViewSet):
             if demande.is_locked():
                 return  Response({"detail": "Délai de modification expiré."}, status=status.HTTP_403_FORBIDDEN)
             
-            fin_actuelle = datetime.strptime(demande.periode.split(" - ")[1].strip(), "%d/%m/%Y").date()
+            fin_actuelle = demande.fin_conge
+            if not fin_actuelle:
+                return Response({"detail": "Période de congé incomplète."}, status=status.HTTP_400_BAD_REQUEST)
 
-            # verifier les demandes de congés de=éjà validés
-            demande_valides = DemandeConge.objects.filter(personnel=demande.personnel, statut='valide', annee=demande.annee).exclude(pk=demande.pk)
+            # verifier les demandes de congés déjà validés (requêtes indexées sur les bornes de période)
+            demande_valides = DemandeConge.objects.valides().filter(personnel=demande.personnel).exclude(pk=demande.pk)
 
-            for d in demande_valides:
-                fin_last_valide = datetime.strptime(d.periode.split(" - ")[1].strip(), "%d/%m/%Y").date()
+            d = demande_valides.filter(annee=demande.annee, fin_conge__gt=fin_actuelle).order_by('-fin_conge').first()
+            if d:
+                return Response({"detail": f"Impossible de valider cette demande de congé car une demande plus récente {d.periode} a déjà été validée."}, status=status.HTTP_400_BAD_REQUEST)
 
-                if fin_last_valide and fin_actuelle < fin_last_valide:
-                    return Response({"detail": f"Impossible de valider cette demande de congé car une demande plus récente {d.periode} a déjà été validée."}, status=status.HTTP_400_BAD_REQUEST)
+            d = demande_valides.chevauchant(demande.debut_conge, fin_actuelle).first()
+            if d:
+                return Response({"detail": f"Impossible de valider cette demande de congé car elle chevauche le congé validé {d.periode}."}, status=status.HTTP_400_BAD_REQUEST)
             
                
             try:
@@ -304,26 +396,27 @@ class DemandeCongeViewSet(viewsets.ModelViewSet):
                 return Response({"errors": e.message_dict, "detail": message_list}, status=status.HTTP_400_BAD_REQUEST)
             except Exception as e:
                 return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        # envoie une notificatons à l'utilisateur par email de validation de sa demande de conge
-        to_mail = demande.personnel.email or None
-        if to_mail:
-            date_debut = demande.periode.split(" - ")[0]
-            date_retour = demande.periode.split(" - ")[1]
-            lien = settings.DJANGO_API_URL + "login"
-
-            send_html_email(
-                subject="Demande de conge validée",
-                template="conge_valide.html",
-                context={
-                    "conge": demande,
-                    "user": demande,
-                    "year": timezone.now().year,
-                    "lien_espace": lien,
-                    "date_retour": date_retour,
-                    "date_debut": date_debut
-                },
-                recipient_list=to_mail
-            )
+            # envoie une notificatons à l'utilisateur par email de validation de sa demande de conge
+            # (mis en file dans la transaction de la validation)
+            to_mail = demande.personnel.email or None
+            if to_mail:
+                date_debut = demande.periode.split(" - ")[0]
+                date_retour = demande.periode.split(" - ")[1]
+                lien = settings.DJANGO_API_URL + "login"
+
+                mettre_en_file(
+                    subject="Demande de conge validée",
+                    template="conge_valide.html",
+                    context={
+                        "conge": demande,
+                        "user": demande,
+                        "year": timezone.now().year,
+                        "lien_espace": lien,
+                        "date_retour": date_retour,
+                        "date_debut": date_debut
+                    },
+                    recipient_list=to_mail
+                )
         return Response({"message": "Congé validé."}, status=status.HTTP_200_OK)
             
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated, IsAdminUser])
@@ -350,32 +443,55 @@ class DemandeCongeViewSet(viewsets.ModelViewSet):
             
             date_debut = demande.periode.split(" - ")[0]
             date_retour = demande.periode.split(" - ")[1]
-        # envoie une notificatons à l'utilisateur par email de refus de sa demande de conge
-        to_mail = demande.personnel.email or None
-        if to_mail:
-            if message_list:
-                motif = ' | '.join(message_list)
-            else:
-                motif = "Raisons techniques."
+            # envoie une notificatons à l'utilisateur par email de refus de sa demande de conge
+            to_mail = demande.personnel.email or None
+            if to_mail:
+                if message_list:
+                    motif = ' | '.join(message_list)
+                else:
+                    motif = "Raisons techniques."
                 
-            lien = settings.DJANGO_API_URL + "login"
-            send_html_email(
-                subject="Demande de congé refusée",
-                template="conge_refuse.html",
-
-                context={
-                    "conge": demande,
-                    "user": demande,
-                    "year": timezone.now().year,
-                    "lien_espace": lien,
-                    "date_retour": date_retour,
-                    "date_debut": date_debut,
-                    "motif": motif
-                },
-                recipient_list=to_mail
-            )
+                lien = settings.DJANGO_API_URL + "login"
+                mettre_en_file(
+                    subject="Demande de congé refusée",
+                    template="conge_refuse.html",
+
+                    context={
+                        "conge": demande,
+                        "user": demande,
+                        "year": timezone.now().year,
+                        "lien_espace": lien,
+                        "date_retour": date_retour,
+                        "date_debut": date_debut,
+                        "motif": motif
+                    },
+                    recipient_list=to_mail
+                )
         return Response({"message": "Congé refusé."}, status=status.HTTP_200_OK)
-        
+
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated, IsAdminUser])
+    def decisions(self, request):
+        # validation / refus en lot : {"ids": [...], "decision": "valider"|"refuser", "motif": "..."}
+        ids = request.data.get("ids")
+        decision = request.data.get("decision")
+        if not isinstance(ids, list) or not ids:
+            return Response({"detail": "Liste 'ids' requise."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in ids))
+        except (TypeError, ValueError):
+            return Response({"detail": "Identifiants invalides."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            resultats = decider_en_masse(ids, decision, motif=request.data.get("motif") or "", user=request.user)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "traites": sum(1 for r in resultats if r["statut"] != "erreur"),
+            "erreurs": sum(1 for r in resultats if r["statut"] == "erreur"),
+            "results": resultats,
+        }, status=status.HTTP_200_OK)
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def annuler(self, request, pk=None):
         demande = self.get_object()
@@ -389,35 +505,36 @@ class DemandeCongeViewSet(viewsets.ModelViewSet):
         if demande.annule:
             return Response({"message": "Congé deja annulé."}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            demande.annule = True
-            demande.save()
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            try:
+                demande.annule = True
+                demande.save()
+            except Exception as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        date_debut = demande.periode.split(" - ")[0]
-        date_retour = demande.periode.split(" - ")[1]
-        lien = settings.DJANGO_API_URL
+            date_debut = demande.periode.split(" - ")[0]
+            date_retour = demande.periode.split(" - ")[1]
+            lien = settings.DJANGO_API_URL
 
-        # envoie une notificatons à l'admin par email
-        admin_email = settings.EMAIL_HOST_USER
-        if request.user.is_authenticated:
-            lien_espace = lien + "dashboard/admin"
-        else:
-            lien_espace = lien + "login"
-        send_html_email(
-            subject="Demande de congé annulée",
-            template="conge_annule.html",
-            context={
-                "conge": demande,
-                "user": request.user,
-                "year": timezone.now().year,
-                "lien_espace": lien_espace,
-                "date_retour": date_retour,
-                "date_debut": date_debut
-            },
-            recipient_list=admin_email
-        )
+            # envoie une notificatons à l'admin par email
+            admin_email = settings.EMAIL_HOST_USER
+            if request.user.is_authenticated:
+                lien_espace = lien + "dashboard/admin"
+            else:
+                lien_espace = lien + "login"
+            mettre_en_file(
+                subject="Demande de congé annulée",
+                template="conge_annule.html",
+                context={
+                    "conge": demande,
+                    "user": request.user,
+                    "year": timezone.now().year,
+                    "lien_espace": lien_espace,
+                    "date_retour": date_retour,
+                    "date_debut": date_debut
+                },
+                recipient_list=admin_email
+            )
         return Response({"detail": "Demande annulée"}, status=status.HTTP_200_OK)
     
     # Formulaire de demande
@@ -431,55 +548,65 @@ class DemandeCongeViewSet(viewsets.ModelViewSet):
         if not conge:
             return Response({"detail": "Aucun conge associé à cet utilisateur."}, status=status.HTTP_400_BAD_REQUEST)
        
-        serializer = self.get_serializer(data=request.data, context={'request': request})
-        serializer.is_valid(raise_exception=True)
-        demande = serializer.save()
-        # envoie une notificatons à l'admin par email
-        date_debut = demande.periode.split(" - ")[0]
-        date_retour = demande.periode.split(" - ")[1]
-        lien = settings.DJANGO_API_URL
-
-        # recuperons le premier user admin qui a le même email que celui configurer dans settings settings.EMAIL_HOST_USER
-        # envoie une notificatons à l'admin par email
-        admin_email = str(settings.EMAIL_HOST_USER).strip()
-        if admin_email:
-            personnel = Personnel.objects.filter(email=admin_email).first()
-            admin_user = CustomUser.objects.filter(personnel=personnel).first() if personnel else request.user
-
-        if admin_user.is_authenticated:
-            lien_espace = lien + "dashboard/admin"
-        else:
-            lien_espace = lien + "login"
-        send_html_email(
-            subject="Nouvelle demande de congés",
-            template="demande_conge.html",
-            context={
-                "conge": demande,
-                "user": admin_user,
-                "year": timezone.now().year,
-                "lien_espace": lien_espace,
-                "date_retour": date_retour,
-                "date_debut": date_debut
-            },
-            recipient_list=admin_email
-        )
+        with transaction.atomic():
+            serializer = self.get_serializer(data=request.data, context={'request': request})
+            serializer.is_valid(raise_exception=True)
+            demande = serializer.save()
+            # envoie une notificatons à l'admin par email
+            date_debut = demande.periode.split(" - ")[0]
+            date_retour = demande.periode.split(" - ")[1]
+            lien = settings.DJANGO_API_URL
+
+            # admin destinataire (EMAIL_HOST_USER), son compte et son mode de notification en une requête
+            admin_email, admin_user, mode = admin_notifications()
+            if mode == "digest":
+                # pas d'email par demande : résumé périodique (accounts/digest_admin.py)
+                planifier_digest()
+                return Response(serializer.data, status=status.HTTP_201_CREATED)
+            admin_user = admin_user or request.user
+
+            if admin_user.is_authenticated:
+                lien_espace = lien + "dashboard/admin"
+            else:
+                lien_espace = lien + "login"
+            mettre_en_file(
+                subject="Nouvelle demande de congés",
+                template="demande_conge.html",
+                context={
+                    "conge": demande,
+                    "user": admin_user,
+                    "year": timezone.now().year,
+                    "lien_espace": lien_espace,
+                    "date_retour": date_retour,
+                    "date_debut": date_debut
+                },
+                recipient_list=admin_email
+            )
             
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    @conditionnel(validateurs_mes_demandes)
     def mes_demandes(self, request):
         # liste des demandes de congés au cours de l'année ordonnées de la plus recente
         user = request.user
         if not getattr(user, 'personnel', None):
             return Response([], status=status.HTTP_200_OK)
         annee= timezone.now().year
-        qs = DemandeConge.objects.filter(personnel=user.personnel, annee=annee).order_by('-date_soumission')
+        qs = DemandeCongeSerializer.preparer_queryset(
+            DemandeConge.objects.filter(personnel=user.personnel, annee=annee), request
+        ).order_by('-date_soumission')
+
+        page = self.paginate_queryset(qs)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(qs, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
     def demandes(self, request):
-        qs = DemandeConge.objects.select_related('personnel').all().order_by('-date_soumission')
+        qs = DemandeCongeSerializer.preparer_queryset(DemandeConge.objects.all(), request).order_by('-date_soumission')
         
         page = self.paginate_queryset(qs)
         if page is not None:
@@ -487,3 +614,26 @@ class DemandeCongeViewSet(viewsets.ModelViewSet):
             return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(qs, many=True)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def delta(self, request):
+        # demandes modifiées depuis le watermark (synchronisation paie) ; limites : cf. reponse_delta
+        return reponse_delta(request, "demandes")
+
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated, IsAdminUser])
+    def calendrier(self, request):
+        # absences validées sur ?debut=&fin= (filtres ?grade=, ?specialite=, ?ecole_origine=) + occupation par jour
+        try:
+            debut = parse_date(request.query_params.get('debut'))
+            fin = parse_date(request.query_params.get('fin'))
+            valider_plage(debut, fin)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        lignes = absences(debut, fin, **{champ: request.query_params.get(champ) for champ in FILTRES_PERSONNEL})
+        return Response({
+            "debut": debut,
+            "fin": fin,
+            "absences": lignes,
+            "occupation": occupation_par_jour(lignes, debut, fin),
+        }, status=status.HTTP_200_OK)
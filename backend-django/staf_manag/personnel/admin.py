@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Personnel
+from .models import Personnel, ImportJob
 from accounts.models import CustomUser, PasswordResetCode, UserPreferences
 from conges.models import Conge, DemandeConge, RegleConge
 
@@ -10,4 +10,5 @@ admin.site.register(PasswordResetCode)
 admin.site.register(Conge)
 admin.site.register(DemandeConge)
 admin.site.register(RegleConge)
-admin.site.register(UserPreferences)
\ No newline at end of file
+admin.site.register(UserPreferences)
+admin.site.register(ImportJob)
\ No newline at end of file
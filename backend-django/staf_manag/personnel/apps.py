@@ -7,3 +7,8 @@ class PersonnelConfig(AppConfig):
 
     def ready(self):
         import personnel.signals # cela permet de déclencher les signaux
+
+        # jobs d'import laissés par le process précédent : repris à la première requête (pas de requête SQL dans ready)
+        from django.core.signals import request_started
+        from personnel.import_jobs import REPRISE_UID, reprendre_au_demarrage
+        request_started.connect(reprendre_au_demarrage, dispatch_uid=REPRISE_UID)
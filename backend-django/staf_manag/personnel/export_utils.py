@@ -2,6 +2,15 @@ import openpyxl
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import Font
 from io import BytesIO
+from openpyxl.cell import WriteOnlyCell
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models.fields.files import FieldFile
+import tempfile
+import csv, json
+from decimal import Decimal
+from typing import Callable, NamedTuple
+from django.db.models import OuterRef, Subquery
 
 COLUMN_LABELS = {
     "nom": {"fr": "Nom", "ar": "الاسم"},
@@ -23,6 +32,19 @@ COLUMN_LABELS = {
     "fiche_module_en": {"fr": "Fiche Module (EN)", "ar": "بطاقة الوحدة (إن)"},
 }
 
+# colonnes du solde de congés (Conge de l'année exportée), jointes aux personnels
+CONGE_COLUMN_LABELS = {
+    "annee": {"fr": "Année", "ar": "السنة"},
+    "conge_restant_annee_n_2": {"fr": "Reste N-2", "ar": "الباقي ن-2"},
+    "conge_restant_annee_n_1": {"fr": "Reste N-1", "ar": "الباقي ن-1"},
+    "conge_restant_annee_courante": {"fr": "Reste année courante", "ar": "الباقي السنة الحالية"},
+    "conge_initial": {"fr": "Congé initial", "ar": "العطلة الأولية"},
+    "conge_total": {"fr": "Total congés", "ar": "مجموع العطل"},
+    "conge_exceptionnel": {"fr": "Congé exceptionnel", "ar": "العطلة الاستثنائية"},
+    "conge_compensatoire": {"fr": "Congé compensatoire", "ar": "العطلة التعويضية"},
+}
+COLUMN_LABELS.update(CONGE_COLUMN_LABELS)
+
 def generate_excel(personnels, columns, lang='fr', base_url='http://127.0.0.1:8000'):
     """
     Génère un Excel en mémoire contenant les colonnes demandées.
@@ -101,3 +123,204 @@ def generate_excel(personnels, columns, lang='fr', base_url='http://127.0.0.1:80
     wb.save(buffer)
     buffer.seek(0)
     return buffer
+
+FILE_LINK_LABEL = "Ouvrir le fichier"
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# largeur maximale estimée d'une colonne texte (les CharField longs ne sont pas élargis au-delà)
+LARGEUR_TEXTE_MAX = 40
+
+def column_widths(model, columns, headers):
+    """
+    Largeur de chaque colonne déduite du type de champ (pas de requête) : en mode write-only les largeurs
+    doivent être fixées avant la première ligne, et l'export ne fait qu'un seul parcours des personnels.
+    Les colonnes de congés sont lues sur le modèle Conge.
+    """
+    from conges.models import Conge
+
+    widths = []
+    for col, header in zip(columns, headers):
+        try:
+            field = (Conge if col in CONGE_COLUMN_LABELS else model)._meta.get_field(col)
+        except FieldDoesNotExist:
+            field = None
+        if isinstance(field, models.FileField):
+            width = len(FILE_LINK_LABEL)
+        elif isinstance(field, (models.DateField, models.DateTimeField)):
+            width = len("dd/mm/YYYY")
+        elif isinstance(field, models.DecimalField):
+            width = field.max_digits + 1
+        elif isinstance(field, (models.IntegerField, models.AutoField)):
+            width = 10
+        elif isinstance(field, models.CharField) and field.max_length:
+            width = min(field.max_length, LARGEUR_TEXTE_MAX)
+        elif isinstance(field, models.TextField):
+            width = LARGEUR_TEXTE_MAX
+        else:
+            width = 0
+        widths.append(max(len(header or "") or 10, width) + 4)
+    return widths
+
+def generate_excel_stream(queryset, columns, lang='fr', base_url='http://127.0.0.1:8000', chunk_size=2000):
+    """
+    Variante streaming de generate_excel pour les gros volumes :
+    - workbook openpyxl en mode write-only (les lignes ne restent pas en mémoire)
+    - personnels lus par lots avec queryset.iterator(chunk_size=...)
+    - largeurs de colonnes déduites des champs avant l'écriture (cf. column_widths), un seul parcours
+    Retourne un fichier temporaire positionné au début, à renvoyer avec un FileResponse
+    (il est supprimé à sa fermeture).
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Personnels")
+
+    headers = [COLUMN_LABELS.get(col, {}).get(lang, col) for col in columns]
+    for i, width in enumerate(column_widths(queryset.model, columns, headers), 1):
+        ws.column_dimensions[get_column_letter(i)].width = width
+    ws.append(headers)
+
+    link_font = Font(color="0000FF", underline="single")
+    for p in queryset.iterator(chunk_size=chunk_size):
+        row = []
+        for col in columns:
+            val = getattr(p, col, "")
+            # FileField renseigné -> hyperlien
+            if isinstance(val, FieldFile):
+                if not val.name:
+                    row.append("")
+                    continue
+                try:
+                    full_url = f"{base_url}{val.url}"
+                except Exception:
+                    row.append("")
+                    continue
+                cell = WriteOnlyCell(ws, value=FILE_LINK_LABEL)
+                cell.hyperlink = full_url
+                cell.font = link_font
+                row.append(cell)
+            elif hasattr(val, "strftime"):
+                row.append(val.strftime("%d/%m/%Y"))
+            else:
+                row.append(str(val) if val is not None else "")
+        ws.append(row)
+
+    output = tempfile.TemporaryFile(suffix=".xlsx")
+    wb.save(output)
+    output.seek(0)
+    return output
+
+# --------------------------------------------------------------------------
+# Formats d'export "machine" (BI) : csv, ndjson, parquet
+# --------------------------------------------------------------------------
+
+def with_conge_columns(queryset, columns, annee):
+    """Annote le queryset de personnels avec les colonnes Conge demandées (une sous-requête par colonne)."""
+    from conges.models import Conge
+
+    annotations = {}
+    for col in columns:
+        if col in CONGE_COLUMN_LABELS:
+            annotations[col] = Subquery(
+                Conge.objects.filter(personnel=OuterRef('pk'), annee=annee).values(col)[:1]
+            )
+    return queryset.annotate(**annotations) if annotations else queryset
+
+def export_rows(queryset, columns, base_url, chunk_size=2000):
+    """
+    Parcourt le queryset par lots et produit une liste de valeurs simples par personnel :
+    dates en ISO 8601, Decimal en float, FileField en URL complète (ou None).
+    """
+    for p in queryset.iterator(chunk_size=chunk_size):
+        row = []
+        for col in columns:
+            val = getattr(p, col, None)
+            if isinstance(val, FieldFile):
+                try:
+                    val = f"{base_url}{val.url}" if val.name else None
+                except Exception:
+                    val = None
+            elif isinstance(val, Decimal):
+                val = float(val)
+            elif hasattr(val, "isoformat"):
+                val = val.isoformat()
+            row.append(val)
+        yield row
+
+class _Echo:
+    """Pseudo-buffer pour csv.writer : write() renvoie la ligne au lieu de la stocker."""
+    def write(self, value):
+        return value
+
+def stream_csv(rows, columns, headers):
+    writer = csv.writer(_Echo())
+    # BOM pour qu'Excel reconnaisse l'UTF-8 (en-têtes arabes)
+    yield "\ufeff" + writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(["" if v is None else v for v in row])
+
+def stream_ndjson(rows, columns, headers):
+    for row in rows:
+        yield json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n"
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def write_parquet(rows, columns, headers, batch_rows=5000):
+    """
+    Ecrit un fichier parquet par groupes de lignes (ParquetWriter) pour garder la mémoire bornée.
+    Colonnes de solde en float64, année en int64, le reste en texte.
+    Retourne un fichier temporaire positionné au début.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    def arrow_type(col):
+        if col == "annee":
+            return pa.int64()
+        if col in CONGE_COLUMN_LABELS:
+            return pa.float64()
+        return pa.string()
+
+    schema = pa.schema([(col, arrow_type(col)) for col in columns])
+    output = tempfile.TemporaryFile(suffix=".parquet")
+    writer = pq.ParquetWriter(output, schema)
+    try:
+        lot = []
+        for row in rows:
+            lot.append(row)
+            if len(lot) >= batch_rows:
+                writer.write_table(_parquet_table(lot, columns, schema))
+                lot = []
+        if lot:
+            writer.write_table(_parquet_table(lot, columns, schema))
+    finally:
+        writer.close()
+    output.seek(0)
+    return output
+
+def _parquet_table(lot, columns, schema):
+    import pyarrow as pa
+
+    data = {}
+    for i, col in enumerate(columns):
+        values = [row[i] for row in lot]
+        if schema.field(col).type == pa.string():
+            values = [None if v is None else str(v) for v in values]
+        data[col] = values
+    return pa.Table.from_pydict(data, schema=schema)
+
+class ExportFormat(NamedTuple):
+    content_type: str
+    extension: str
+    streaming: bool  # True: générateur de str -> StreamingHttpResponse ; False: fichier -> FileResponse
+    render: Callable
+
+EXPORT_FORMATS = {
+    "csv": ExportFormat("text/csv; charset=utf-8", "csv", True, stream_csv),
+    "ndjson": ExportFormat("application/x-ndjson; charset=utf-8", "ndjson", True, stream_ndjson),
+    "parquet": ExportFormat("application/vnd.apache.parquet", "parquet", False, write_parquet),
+}
@@ -1,13 +1,16 @@
 from pathlib import Path
-from django.core.files.base import ContentFile
+from io import BytesIO
+from django.core.files.base import ContentFile, File
 from .models import Personnel
 from django.db.models import Q
 from staf_manag.pandas_import import parse_date
 import pandas as pd
 import mimetypes, os, urllib.parse, urllib.request, requests
+import zipfile, shutil, tempfile, re, unicodedata
+from .remote_fetch import RemoteFetcher
 
 # import spécial pour safe_resolve_local_path
-from typing import Optional, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 FILE_COLUMNS_MAP = {
     "cv": ["cv", "cv_url", "lien_cv"],
@@ -18,6 +21,43 @@ FILE_COLUMNS_MAP = {
     "fiche_module_en": ["fiche_module_en", "fiche_module_en_url", "lien_fiche_module_en", "module_en"],
 }
 
+# extraction ZIP sécurisée (empêcher path transversal)
+def safe_extract_zip(zip_path:Path, dest_dir: Path, overwrite: bool=True) -> tuple:
+    """
+    Extraire zip_path dans dest_dir en verifiant les chemins.
+    Retourne (succes True/False, message list)
+    """
+    message=[]
+    try:
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            # verification anti path transversal
+            for member in zip_ref.namelist():
+                member_path = dest_dir.joinpath(member)
+                if not str(member_path.resolve()).startswith(str(dest_dir.resolve())):
+                    return False, [f"Chemin non autorisé dans l'archive: {member}"]
+            
+            # extraction
+            for member in zip_ref.infolist():
+                target_path = dest_dir.joinpath(member.filename)
+                # si dossier -> le créer
+                if member.is_dir():
+                    target_path.mkdir(parents=True, exist_ok=True)
+                    continue
+                # assurer les parents
+                target_path.parent.mkdir(parents=True, exist_ok=True)
+                # ecraser ou non selon flag
+                if target_path.exists() and not overwrite:
+                    message.append(f"Fichier existant: {member.filename}")
+                    continue
+                with zip_ref.open(member) as source_f, open(target_path, 'wb') as target_f:
+                    shutil.copyfileobj(source_f, target_f)
+            message.append(f"Extraction effectuée")
+        return True, message
+    except zipfile.BadZipFile as e:
+        return False, [f"Le fichier n'est pas un zip: {e}"]
+    except Exception as e:
+        return False, [f"Une erreur s'est produite lors de l'extraction ZIP: {e}"]
+
 def is_remote_url(value: str) -> bool:
     v = value.strip().lower()
     return v.startswith("http://") or v.startswith("https://")
@@ -37,7 +77,128 @@ def dowload_remote_file(url: str):
     except Exception as e:
         return None, None, str(e)
     
-def safe_resolve_local_path(value: str, base_dir: Path, allow_name_search: bool = True) -> Tuple[Optional[Path], Optional[str]]:
+def normalize_filename(name: str) -> str:
+    """Clé de recherche tolérante : minuscules, sans accents, espaces/tirets unifiés."""
+    decomposed = unicodedata.normalize("NFKD", str(name))
+    sans_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return re.sub(r"[\s_\-]+", "_", sans_accents.strip().lower())
+
+class IndexEntry(NamedTuple):
+    path: Path
+    size: int
+    mtime: float
+
+class DocIndex:
+    """
+    Index des fichiers de doc_excel_personnel construit en un seul parcours du dossier
+    (après safe_extract_zip), pour résoudre un nom de fichier en O(1) au lieu d'un rglob par cellule.
+    - by_name : nom exact -> entrées
+    - by_key : nom normalisé (casse/accents) -> entrées
+    En cas de doublons, le fichier le plus récent (mtime) est retenu.
+    """
+    # dossiers de travail des jobs d'import, jamais référencés par l'excel
+    EXCLUDED_DIRS = {"tmp_import"}
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = base_dir
+        self.by_name: Dict[str, List[IndexEntry]] = {}
+        self.by_key: Dict[str, List[IndexEntry]] = {}
+
+    @classmethod
+    def build(cls, base_dir: Path) -> "DocIndex":
+        index = cls(Path(base_dir).resolve())
+        for root, dirs, files in os.walk(index.base_dir):
+            dirs[:] = [d for d in dirs if d not in cls.EXCLUDED_DIRS]
+            for name in files:
+                path = Path(root) / name
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                index.add(IndexEntry(path, st.st_size, st.st_mtime))
+        return index
+
+    def add(self, entry: IndexEntry):
+        self.by_name.setdefault(entry.path.name, []).append(entry)
+        self.by_key.setdefault(normalize_filename(entry.path.name), []).append(entry)
+
+    def __len__(self):
+        return sum(len(v) for v in self.by_name.values())
+
+    def lookup(self, name: str) -> Optional[Path]:
+        entries = self.by_name.get(name) or self.by_key.get(normalize_filename(name))
+        if not entries:
+            return None
+        return max(entries, key=lambda e: e.mtime).path
+
+class ZipDocIndex:
+    """
+    Index des membres d'une archive ZIP ouverte, pour lire les documents directement depuis le zip
+    (sans extraction sur disque) au moment où une ligne de l'excel les référence.
+    Recherche par chemin relatif, puis par nom exact, puis par nom normalisé (casse/accents).
+    Les membres dangereux (chemin absolu, "..") ne sont jamais indexés.
+    """
+    MARKER = "doc_excel_personnel"
+
+    def __init__(self, zf: zipfile.ZipFile):
+        self.zf = zf
+        self.by_path: Dict[str, zipfile.ZipInfo] = {}
+        self.by_name: Dict[str, List[zipfile.ZipInfo]] = {}
+        self.by_key: Dict[str, List[zipfile.ZipInfo]] = {}
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            member = info.filename.replace("\\", "/")
+            if member.startswith("/") or ".." in member.split("/"):
+                continue
+            name = member.rsplit("/", 1)[-1]
+            # chaque suffixe du chemin est indexé : "racine/cv/x.pdf", "cv/x.pdf", "x.pdf"
+            parts = member.lower().split("/")
+            for i in range(len(parts)):
+                self.by_path.setdefault("/".join(parts[i:]), info)
+            self.by_name.setdefault(name, []).append(info)
+            self.by_key.setdefault(normalize_filename(name), []).append(info)
+
+    def _relative(self, value: str) -> str:
+        raw = str(value or "").strip().replace("\\", "/")
+        if raw.lower().startswith("file:"):
+            raw = urllib.parse.unquote(urllib.parse.urlparse(raw).path)
+        pos = raw.lower().find(self.MARKER)
+        if pos != -1:
+            raw = raw[pos + len(self.MARKER):]
+        return raw.lstrip("./").lower()
+
+    def lookup(self, value: str) -> Optional[zipfile.ZipInfo]:
+        relative = self._relative(value)
+        if not relative:
+            return None
+        if relative in self.by_path:
+            return self.by_path[relative]
+        name = relative.rsplit("/", 1)[-1]
+        original_name = str(value).replace("\\", "/").rsplit("/", 1)[-1].strip()
+        entries = self.by_name.get(original_name) or self.by_key.get(normalize_filename(name))
+        if not entries:
+            return None
+        return max(entries, key=lambda i: i.date_time)
+
+    def excel_members(self) -> List[zipfile.ZipInfo]:
+        """Classeurs excel présents dans l'archive, du plus récent au plus ancien."""
+        infos = [i for i in self.zf.infolist() if not i.is_dir() and i.filename.lower().endswith((".xlsx", ".xls"))]
+        return sorted(infos, key=lambda i: i.date_time, reverse=True)
+
+    def read_excel(self, info: zipfile.ZipInfo) -> pd.DataFrame:
+        with self.zf.open(info) as f:
+            return pd.read_excel(BytesIO(f.read()))
+
+    def attach(self, info: zipfile.ZipInfo, filefield):
+        """Copie le membre en streaming vers le storage Django du FileField (sans fichier intermédiaire)."""
+        name = info.filename.replace("\\", "/").rsplit("/", 1)[-1]
+        with self.zf.open(info) as f:
+            content = File(f, name=name)
+            content.size = info.file_size
+            filefield.save(name, content, save=False)
+
+def safe_resolve_local_path(value: str, base_dir: Path, allow_name_search: bool = True, index: Optional[DocIndex] = None) -> Tuple[Optional[Path], Optional[str]]:
     """
     Résout une valeur vers un path autorisé sous base_dir.
     - value peut contenir un chemin relatif (exp: "../mon_cv.pdf") ou absolu (exp: "/mon_cv.pdf") ou "file:///C:/.../mon_cv.pdf"
@@ -46,6 +207,7 @@ def safe_resolve_local_path(value: str, base_dir: Path, allow_name_search: bool
     - allow_name_search indique si on autorise la recherche par nom de fichier.
         si false : Retourne (None, error_message)
         si true : Retourne (path, None)
+    - index (DocIndex) : si fourni, la recherche par nom se fait dans l'index au lieu d'un rglob.
     """
     raw = str(value or "").strip()
     if not raw:
@@ -108,7 +270,11 @@ def safe_resolve_local_path(value: str, base_dir: Path, allow_name_search: bool
         # si échoue, on peut tenter une heuristique permissive : chercher par nom de fichier dans base_dir
         if allow_name_search:
             name = Path(candidate).name
-            matches = list(base_resolved.rglob(name))
+            if index is not None:
+                match = index.lookup(name)
+                matches = [match] if match else []
+            else:
+                matches = list(base_resolved.rglob(name))
             if matches:
                 # prend le premier qui correspond
                 candidate = matches[0]
@@ -132,7 +298,54 @@ def read_local_file(path: Path):
     except Exception as e:
         return None, None, str(e)
     
-def import_df_and_attach_files(df: pd.DataFrame, base_docs_dir: Path):
+def attach_remote_files(telechargements: list) -> list:
+    """
+    Télécharge en parallèle (RemoteFetcher) les URLs de telechargements [(personnel, champ, url, idx)]
+    et les enregistre dans les FileField correspondants. Chaque URL n'est téléchargée qu'une fois.
+    Retourne les messages d'erreur par ligne.
+    """
+    erreurs = []
+    with tempfile.TemporaryDirectory(prefix="import_fetch_") as tmp:
+        fetcher = RemoteFetcher(Path(tmp))
+        try:
+            resultats = fetcher.fetch_all(url for _, _, url, _ in telechargements)
+        finally:
+            fetcher.close()
+
+        # regrouper par personnel pour un seul save() par personnel
+        par_personnel = {}
+        for personnel, model_field, url, idx in telechargements:
+            par_personnel.setdefault(personnel.pk, (personnel, idx, []))[2].append((model_field, url))
+
+        for personnel, idx, champs in par_personnel.values():
+            file_errors = []
+            modifies = []
+            for model_field, url in champs:
+                res = resultats[url]
+                if res.error:
+                    file_errors.append(f"{model_field}: {res.error}")
+                    continue
+                try:
+                    with open(res.path, "rb") as f:
+                        getattr(personnel, model_field).save(res.filename, File(f), save=False)
+                    modifies.append(model_field)
+                except Exception as e:
+                    file_errors.append(f"{model_field}: erreur de sauvegarde ({e})")
+
+            if modifies:
+                personnel.save(update_fields=modifies)
+            if file_errors:
+                erreurs.append(f"Ligne {idx+2}: erreurs fichoers - "+"; ".join(file_errors))
+    return erreurs
+
+def import_df_and_attach_files(df: pd.DataFrame, base_docs_dir: Path, progress=None, index: Optional[DocIndex] = None, zip_index: Optional[ZipDocIndex] = None):
+    """
+    Importe les personnels du DataFrame et attache les fichiers (zip extrait ou URL).
+    progress(lignes_traitees, total, nb_erreurs) est appelé après chaque ligne si fourni (jobs d'import).
+    index : DocIndex de base_docs_dir (construit une seule fois ici s'il n'est pas fourni).
+    zip_index : ZipDocIndex de l'archive uploadée (mode sans extraction) ; les documents y sont lus
+    en priorité, puis dans doc_excel_personnel (fichiers d'imports précédents).
+    """
     df.columns = [str(c).strip().lower() for c in df.columns]
     # detecter les colonnes fichiers
     file_columns_found = {}
@@ -154,12 +367,19 @@ def import_df_and_attach_files(df: pd.DataFrame, base_docs_dir: Path):
     # ignorer les colonnes non désirées
     extra_colunms = [col for col in df.columns if col not in expected_cols]
 
+    # index des fichiers extraits, partagé par toutes les lignes de l'import
+    if index is None and file_columns_found and base_docs_dir.exists():
+        index = DocIndex.build(base_docs_dir)
+
     nb_inserts = 0
     doub = 0
     nb_total = len(df)
     personnels_ignores = []
+    telechargements = []  # (personnel, champ, url, idx) des documents distants
 
-    for idx, row in df.iterrows():
+    for pos, (idx, row) in enumerate(df.iterrows(), start=1):
+        if progress:
+            progress(pos - 1, nb_total, len(personnels_ignores))
         try:
             # nettoyage des champs
             cin = str(row.get('cin', '')).strip() if pd.notna(row.get('cin')) else ''
@@ -213,12 +433,20 @@ def import_df_and_attach_files(df: pd.DataFrame, base_docs_dir: Path):
                 if pd.isna(raw_val) or not src:
                     continue
                 if is_remote_url(src):
-                    content_file, file_name, err = dowload_remote_file(src)
-                    if err:
-                        file_errors.append(f"{model_field}: {err}")
-                        continue
+                    # téléchargé plus tard, en parallèle avec les autres URLs de l'import
+                    telechargements.append((personnel, model_field, src, idx))
+                    continue
                 else:
-                    resolved_path, err = safe_resolve_local_path(src, base_docs_dir)
+                    # mode streaming : lire le membre directement depuis le zip
+                    info = zip_index.lookup(src) if zip_index is not None else None
+                    if info is not None:
+                        try:
+                            zip_index.attach(info, getattr(personnel, model_field))
+                        except Exception as e:
+                            file_errors.append(f"{model_field}: erreur de sauvegarde ({e})")
+                        continue
+
+                    resolved_path, err = safe_resolve_local_path(src, base_docs_dir, index=index)
                     if err:
                         file_errors.append(f"{model_field}: {err}")
                         continue
@@ -239,7 +467,14 @@ def import_df_and_attach_files(df: pd.DataFrame, base_docs_dir: Path):
                 personnels_ignores.append(f"Ligne {idx+2}: erreurs fichoers - "+"; ".join(file_errors))
 
         except Exception as e:
-            personnels_ignores(f"Ligne {idx+2}: erreur import ({e})")
+            personnels_ignores.append(f"Ligne {idx+2}: erreur import ({e})")
+
+    # téléchargement concurrent de tous les documents distants puis rattachement aux personnels
+    if telechargements:
+        personnels_ignores.extend(attach_remote_files(telechargements))
+
+    if progress:
+        progress(nb_total, nb_total, len(personnels_ignores))
 
     return {
         "message": f"{nb_inserts} personnels importés avec succès sur {nb_total} ignorés ( {doub} doublons)",
@@ -247,3 +482,81 @@ def import_df_and_attach_files(df: pd.DataFrame, base_docs_dir: Path):
         "colonnes_ignorees": extra_colunms if extra_colunms else None,
         "colonnes_detectees_fichiers": file_columns_found
     }
+
+def import_personnel_df(df: pd.DataFrame, progress=None):
+    """
+    Import simple (sans fichiers) utilisé par import_personnel_from_excel.
+    progress(lignes_traitees, total, nb_erreurs) est appelé après chaque ligne si fourni.
+    """
+    df.columns = [str(col).strip().lower() for col in df.columns]
+
+    # ignorer les colonnes non desirées
+    expected_columns = [
+        'nom et prénom', 'grade', 'spécialité', "etablissement d'origine",
+        'cin', 'matricule', 'telephone', 'n° téléphone', 'adresse e-mail', "date d'affectation", 'date de passage de grade'
+    ]
+
+    extra_colunms = [col for col in df.columns if col not in expected_columns]
+
+    nb_inserts = 0
+    doub = 0
+    nb_total = len(df)
+    personnels_ignores = []
+
+    for pos, (_, row) in enumerate(df.iterrows(), start=1):
+        if progress:
+            progress(pos - 1, nb_total, len(personnels_ignores))
+        try:
+            # nettoyage des champs
+            cin = str(row.get('cin', '')).strip() if pd.notna(row.get('cin')) else ''
+            matricule = str(row.get('matricule', '')).strip() if pd.notna(row.get('matricule')) else ''
+
+            if not cin or not matricule:
+                personnels_ignores.append("cin ou matricule vide")
+                continue
+
+            # Ignorer les doublons
+            if not Personnel.objects.filter(Q(cin=cin) | Q(matricule=matricule)).exists():
+                nomComplet = str(row['nom et prénom']).strip().split(' ', 1)
+                nom = nomComplet[0]
+                prenoms = nomComplet[1] if len(nomComplet) > 1 else ""
+                grade = str(row.get('grade')).strip()
+                email=str(row.get('adresse e-mail')).strip()
+
+                Personnel.objects.create(
+                    nom=nom,
+                    prenoms=prenoms,
+                    grade=grade,
+                    specialite=row.get('spécialité', ''),
+                    ecole_origine=row.get("etablissement d'origine", 'FSG'),
+                    cin=cin,
+                    matricule=matricule,
+                    telephone=row.get('n° téléphone', ''), #or row.get('telephone', ''),
+                    email=email,
+                    date_passage_grade=parse_date(row.get('date de passage de grade')),
+                    date_affectation=parse_date(row.get("date d'affectation")),
+                )
+                nb_inserts += 1
+
+                # verifier les doublons
+            elif matricule and Personnel.objects.filter(matricule=matricule).exists():
+                personnels_ignores.append(f"Matricule: {row['matricule']}")
+                doub += 1
+                continue
+            elif cin and Personnel.objects.filter(cin=cin).exists():
+                personnels_ignores.append(f"CIN: {row['cin']}")
+                doub += 1
+                continue
+            else:
+                continue
+        except Exception as e:
+            personnels_ignores.append(f"Ligne ignorée (erreur: {e})")
+
+    if progress:
+        progress(nb_total, nb_total, len(personnels_ignores))
+
+    return {
+        "message": f"{nb_inserts} personnels importés avec succès sur {nb_total} ignorés ( {doub} doublons)",
+        "personnels_ignores": personnels_ignores,
+        "colonnes_ignorees": extra_colunms if extra_colunms else None,
+    }
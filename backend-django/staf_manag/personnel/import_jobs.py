@@ -0,0 +1,278 @@
+"""
+Jobs d'import de personnels exécutés hors de la requête HTTP.
+
+- la vue enregistre les fichiers uploadés dans un dossier propre au job, crée l'ImportJob
+  et renvoie son id immédiatement (202)
+- le job est exécuté par un pool de threads du process (IMPORT_JOBS_INLINE_WORKER = True, défaut)
+  ou par la commande `python manage.py run_import_jobs` (worker séparé)
+- la progression (lignes traitées, erreurs, débit) est écrite en base et lue par l'endpoint d'état
+- par défaut le zip n'est pas extrait : les documents sont lus dans l'archive à la demande
+  (option "extraire" pour l'ancien comportement d'extraction dans doc_excel_personnel)
+- les dossiers de travail laissés par un arrêt brutal sont supprimés par `run_import_jobs`
+  (à chaque passage, ou seuls avec --nettoyage), jamais pendant une requête
+- date_debut sert de bail : un job "en_cours" depuis plus de IMPORT_JOB_BAIL_MINUTES (process arrêté
+  pendant l'import) passe en "echec" au début de `run_import_jobs` et à la première requête du process web ;
+  en mode inline, les jobs "en_attente" dont la soumission a été perdue sont alors soumis à nouveau
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+import logging
+import shutil
+import time
+import zipfile
+
+import pandas as pd
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ImportJob
+from . import import_helpers
+
+# intervalle minimal entre deux écritures de la progression en base
+PROGRESS_INTERVAL = 0.5
+REPRISE_UID = "personnel.import_jobs.reprendre_au_demarrage"
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, "IMPORT_JOB_WORKERS", 2),
+            thread_name_prefix="import-job",
+        )
+    return _executor
+
+def jobs_base_dir() -> Path:
+    return Path(settings.BASE_DIR) / "doc_excel_personnel" / "tmp_import"
+
+def debut_bail_expire():
+    """Un job en_cours commencé avant cette date est considéré comme interrompu."""
+    return timezone.now() - timedelta(minutes=getattr(settings, "IMPORT_JOB_BAIL_MINUTES", 120))
+
+def recuperer_jobs_interrompus(resoumettre: bool = False) -> int:
+    """
+    Jobs laissés par un process arrêté : "en_cours" au bail expiré -> "echec" (pas de reprise automatique,
+    une partie des lignes a pu être importée). resoumettre=True : les jobs "en_attente" sont soumis au pool
+    (executer_job ne prend un job qu'une fois, une double soumission est sans effet).
+    Retourne le nombre de jobs passés en échec.
+    """
+    interrompus = ImportJob.objects.filter(statut="en_cours", date_debut__lt=debut_bail_expire()).update(
+        statut="echec",
+        message="Import interrompu (arrêt du serveur pendant l'exécution), à relancer.",
+        date_fin=timezone.now(),
+    )
+    if resoumettre:
+        for job_id in ImportJob.objects.filter(statut="en_attente").values_list("pk", flat=True):
+            get_executor().submit(executer_job, job_id)
+    return interrompus
+
+def reprendre_au_demarrage(**kwargs):
+    """Receiver request_started (personnel/apps.py) : une seule fois par process, en mode inline."""
+    request_started.disconnect(dispatch_uid=REPRISE_UID)
+    if not getattr(settings, "IMPORT_JOBS_INLINE_WORKER", True):
+        # `manage.py run_import_jobs` s'en charge
+        return
+    try:
+        recuperer_jobs_interrompus(resoumettre=True)
+    except Exception:
+        # ne fait pas échouer la requête qui a déclenché la reprise
+        logger.exception("Echec de la reprise des jobs d'import")
+
+def nettoyer_dossiers_orphelins() -> int:
+    """
+    Supprime les dossiers de travail (tmp_import/job_<id>) des jobs qui ne sont plus actifs
+    (terminés, en échec, supprimés, en cours au bail expiré) - ex: après un arrêt brutal du serveur pendant un import.
+    Les dossiers modifiés depuis moins de IMPORT_ORPHELINS_DELAI_MINUTES sont conservés : un job en cours
+    de création (ligne pas encore validée, fichiers en cours de copie) n'est pas encore visible ici.
+    Retourne le nombre d'entrées supprimées.
+    """
+    base = jobs_base_dir()
+    if not base.exists():
+        return 0
+    limite = time.time() - 60 * getattr(settings, "IMPORT_ORPHELINS_DELAI_MINUTES", 60)
+    actifs = {
+        f"job_{pk}" for pk in
+        ImportJob.objects.filter(
+            Q(statut="en_attente") | Q(statut="en_cours", date_debut__gte=debut_bail_expire())
+        ).values_list("pk", flat=True)
+    }
+    supprimes = 0
+    for dossier in base.iterdir():
+        if dossier.name in actifs:
+            continue
+        try:
+            if dossier.stat().st_mtime > limite:
+                continue
+        except FileNotFoundError:
+            continue
+        if dossier.is_dir():
+            shutil.rmtree(dossier, ignore_errors=True)
+        else:
+            dossier.unlink(missing_ok=True)
+        supprimes += 1
+    return supprimes
+
+def creer_job(type_import: str, user=None, fichiers: dict = None, options: dict = None) -> ImportJob:
+    """
+    Crée le job et copie les fichiers uploadés (clé -> UploadedFile) dans son dossier de travail.
+    Les chemins enregistrés sont stockés dans job.options["fichiers"].
+    """
+    job = ImportJob.objects.create(type_import=type_import, cree_par=user, options=dict(options or {}))
+    dossier = jobs_base_dir() / f"job_{job.pk}"
+    dossier.mkdir(parents=True, exist_ok=True)
+
+    chemins = {}
+    for cle, upload in (fichiers or {}).items():
+        if not upload:
+            continue
+        cible = dossier / Path(upload.name).name
+        with open(cible, "wb") as f:
+            for chunk in upload.chunks():
+                f.write(chunk)
+        chemins[cle] = str(cible)
+
+    job.dossier = str(dossier)
+    job.options["fichiers"] = chemins
+    job.save(update_fields=["dossier", "options"])
+    return job
+
+def soumettre_job(job: ImportJob):
+    """Lance le job dans le pool de threads une fois la transaction courante validée."""
+    if not getattr(settings, "IMPORT_JOBS_INLINE_WORKER", True):
+        # le job sera pris par `manage.py run_import_jobs`
+        return
+    transaction.on_commit(lambda: get_executor().submit(executer_job, job.pk))
+
+def _reporter_progression(job_id: int):
+    """Callback progress(lignes_traitees, total, nb_erreurs) limité à une écriture toutes les PROGRESS_INTERVAL s."""
+    dernier = {"t": 0.0}
+
+    def progress(lignes_traitees, total, nb_erreurs):
+        now = time.monotonic()
+        if lignes_traitees < total and now - dernier["t"] < PROGRESS_INTERVAL:
+            return
+        dernier["t"] = now
+        ImportJob.objects.filter(pk=job_id).update(
+            lignes_traitees=lignes_traitees,
+            total_lignes=total,
+            nb_erreurs=nb_erreurs,
+        )
+    return progress
+
+def _excel_le_plus_recent(base_docs_dir: Path):
+    candidates = list(base_docs_dir.glob("*.xls*"))
+    if candidates:
+        return sorted(candidates, key=lambda p: p.stat().st_mtime, reverse=True)[0]
+    return None
+
+def _import_zip_excel(job: ImportJob, progress):
+    fichiers = job.options.get("fichiers", {})
+    base_docs_dir = Path(settings.BASE_DIR) / "doc_excel_personnel"
+    base_docs_dir.mkdir(parents=True, exist_ok=True)
+
+    if fichiers.get("zip") and not job.options.get("extraire", False):
+        return _import_zip_streaming(job, Path(fichiers["zip"]), base_docs_dir, progress)
+
+    # 1) si zip fourni -> extraire dans doc_excel_personnel
+    if fichiers.get("zip"):
+        ok, messages = import_helpers.safe_extract_zip(
+            Path(fichiers["zip"]), base_docs_dir, overwrite=job.options.get("overwrite", True)
+        )
+        if not ok:
+            raise ValueError("Extraction échouée: " + "; ".join(messages))
+
+    # 2) l'excel uploadé est prioritaire, sinon le plus récent à la racine de doc_excel_personnel
+    excel_path = Path(fichiers["fichier"]) if fichiers.get("fichier") else _excel_le_plus_recent(base_docs_dir)
+
+    if not excel_path or not excel_path.exists():
+        raise ValueError("Aucun fichier Excel trouvé (uploadez 'fichier' ou incluez l'excel dans le zip).")
+
+    df = pd.read_excel(excel_path)
+    df.columns = [str(c).strip().lower() for c in df.columns]
+
+    # index des fichiers construit une fois après extraction, réutilisé pour tout le job
+    index = import_helpers.DocIndex.build(base_docs_dir)
+    return import_helpers.import_df_and_attach_files(df, base_docs_dir, progress=progress, index=index)
+
+def _import_zip_streaming(job: ImportJob, zip_path: Path, base_docs_dir: Path, progress):
+    """
+    Mode sans extraction : les documents sont lus dans le zip (ZipDocIndex) uniquement
+    quand une ligne les référence, et copiés directement dans le storage des FileField.
+    """
+    fichiers = job.options.get("fichiers", {})
+    try:
+        zf = zipfile.ZipFile(zip_path, "r")
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Le fichier n'est pas un zip: {e}")
+
+    with zf:
+        zip_index = import_helpers.ZipDocIndex(zf)
+
+        # l'excel uploadé est prioritaire, sinon le plus récent du zip, sinon celui de doc_excel_personnel
+        if fichiers.get("fichier"):
+            df = pd.read_excel(fichiers["fichier"])
+        elif zip_index.excel_members():
+            df = zip_index.read_excel(zip_index.excel_members()[0])
+        else:
+            excel_path = _excel_le_plus_recent(base_docs_dir)
+            if not excel_path:
+                raise ValueError("Aucun fichier Excel trouvé (uploadez 'fichier' ou incluez l'excel dans le zip).")
+            df = pd.read_excel(excel_path)
+
+        df.columns = [str(c).strip().lower() for c in df.columns]
+        return import_helpers.import_df_and_attach_files(df, base_docs_dir, progress=progress, zip_index=zip_index)
+
+def _import_excel(job: ImportJob, progress):
+    df = pd.read_excel(job.options["fichiers"]["fichier"])
+    return import_helpers.import_personnel_df(df, progress=progress)
+
+RUNNERS = {
+    "zip_excel": _import_zip_excel,
+    "excel": _import_excel,
+}
+
+def executer_job(job_id: int) -> bool:
+    """
+    Exécute un job en attente. Le passage en_attente -> en_cours est atomique (UPDATE conditionnel),
+    un job n'est donc jamais exécuté deux fois même si le pool et la commande tournent ensemble.
+    """
+    close_old_connections()
+    try:
+        pris = ImportJob.objects.filter(pk=job_id, statut="en_attente").update(
+            statut="en_cours", date_debut=timezone.now()
+        )
+        if not pris:
+            return False
+
+        job = ImportJob.objects.get(pk=job_id)
+        try:
+            resultat = RUNNERS[job.type_import](job, _reporter_progression(job_id))
+        except Exception as e:
+            ImportJob.objects.filter(pk=job_id).update(
+                statut="echec", message=str(e), date_fin=timezone.now()
+            )
+            return True
+        finally:
+            # nettoyage du dossier de travail du job
+            if job.dossier and Path(job.dossier).exists():
+                shutil.rmtree(job.dossier, ignore_errors=True)
+
+        erreurs = resultat.get("personnels_ignores") or []
+        ImportJob.objects.filter(pk=job_id).update(
+            statut="termine",
+            message=resultat.get("message", ""),
+            resultat=resultat,
+            erreurs=erreurs,
+            nb_erreurs=len(erreurs),
+            date_fin=timezone.now(),
+        )
+        return True
+    finally:
+        close_old_connections()
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from personnel.models import Personnel
+from accounts.models import CustomUser
+from staf_manag.utils.conditionnel import incrementer_versions
+from staf_manag.utils.conges import GRADE_TECH_PATTERN, CATEGORIE_TECH, CATEGORIE_AUTRES
+
+class Command(BaseCommand):
+    help = "Recalcule Personnel.categorie_grade en SQL (après un import en masse ou un changement du classement des grades)"
+
+    def handle(self, *args, **options):
+        # deux UPDATE ensemblistes, seules les lignes dont la catégorie change sont écrites
+        with transaction.atomic():
+            tech = (
+                Personnel.objects
+                .filter(grade__iregex=GRADE_TECH_PATTERN)
+                .exclude(categorie_grade=CATEGORIE_TECH)
+                .update(categorie_grade=CATEGORIE_TECH)
+            )
+            autres = (
+                Personnel.objects
+                .exclude(grade__iregex=GRADE_TECH_PATTERN)
+                .exclude(categorie_grade=CATEGORIE_AUTRES)
+                .update(categorie_grade=CATEGORIE_AUTRES)
+            )
+            # pas de signal sur un UPDATE : les ETag des comptes liés sont invalidés explicitement
+            if tech or autres:
+                incrementer_versions(CustomUser.objects.filter(personnel__isnull=False))
+        self.stdout.write(self.style.SUCCESS(
+            f"{tech} personnel(s) passé(s) en '{CATEGORIE_TECH}', {autres} en '{CATEGORIE_AUTRES}'"
+        ))
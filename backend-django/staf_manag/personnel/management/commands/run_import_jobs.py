@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+import time
+from personnel.models import ImportJob
+from personnel.import_jobs import executer_job, nettoyer_dossiers_orphelins, recuperer_jobs_interrompus
+
+class Command(BaseCommand):
+    help = "Exécute les jobs d'import de personnels en attente (worker hors process web)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boucle', action='store_true', help="Tourne en continu et interroge la file toutes les --intervalle secondes")
+        parser.add_argument('--intervalle', type=float, default=2.0)
+        parser.add_argument('--nettoyage', action='store_true', help="Seulement les jobs interrompus et les dossiers de travail orphelins (cron, avec IMPORT_JOBS_INLINE_WORKER = True)")
+
+    def handle(self, *args, **options):
+        while True:
+            interrompus = recuperer_jobs_interrompus()
+            if interrompus:
+                self.stdout.write(f"{interrompus} job(s) interrompu(s) passé(s) en échec")
+            supprimes = nettoyer_dossiers_orphelins()
+            if supprimes:
+                self.stdout.write(f"{supprimes} dossier(s) de travail orphelin(s) supprimé(s)")
+            if options['nettoyage']:
+                break
+
+            ids = list(ImportJob.objects.filter(statut='en_attente').order_by('date_creation').values_list('id', flat=True))
+            for job_id in ids:
+                if executer_job(job_id):
+                    job = ImportJob.objects.get(pk=job_id)
+                    self.stdout.write(
+                        f"Job #{job.pk} {job.statut}: {job.lignes_traitees}/{job.total_lignes} ligne(s), "
+                        f"{job.nb_erreurs} erreur(s), {job.debit()} lignes/s"
+                    )
+
+            if not options['boucle']:
+                break
+            time.sleep(options['intervalle'])
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-18 09:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("personnel", "0008_alter_personnel_email"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportJob",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("type_import", models.CharField(choices=[("zip_excel", "Import ZIP + Excel"), ("excel", "Import Excel")], max_length=20)),
+                ("statut", models.CharField(choices=[("en_attente", "En attente"), ("en_cours", "En cours"), ("termine", "Terminé"), ("echec", "Echec")], db_index=True, default="en_attente", max_length=20)),
+                ("dossier", models.CharField(blank=True, default="", max_length=500)),
+                ("options", models.JSONField(blank=True, default=dict)),
+                ("total_lignes", models.PositiveIntegerField(default=0)),
+                ("lignes_traitees", models.PositiveIntegerField(default=0)),
+                ("nb_erreurs", models.PositiveIntegerField(default=0)),
+                ("erreurs", models.JSONField(blank=True, default=list)),
+                ("resultat", models.JSONField(blank=True, default=dict)),
+                ("message", models.TextField(blank=True, default="")),
+                ("date_creation", models.DateTimeField(auto_now_add=True)),
+                ("date_debut", models.DateTimeField(blank=True, null=True)),
+                ("date_fin", models.DateTimeField(blank=True, null=True)),
+                ("cree_par", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="import_jobs", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "ordering": ["-date_creation"],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+# copie figée de staf_manag.utils.conges.GRADE_TECH_PATTERN au moment de la migration
+GRADE_TECH_PATTERN = r"technicien(ne)?|assistant(e)?"
+
+
+def remplir_categorie_grade(apps, schema_editor):
+    Personnel = apps.get_model("personnel", "Personnel")
+    Personnel.objects.filter(grade__iregex=GRADE_TECH_PATTERN).update(categorie_grade="tech")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("personnel", "0009_importjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="personnel",
+            name="categorie_grade",
+            field=models.CharField(
+                choices=[("tech", "Technicien / assistant"), ("autres", "Autres")],
+                db_index=True,
+                default="autres",
+                editable=False,
+                max_length=20,
+            ),
+        ),
+        migrations.RunPython(remplir_categorie_grade, migrations.RunPython.noop),
+    ]
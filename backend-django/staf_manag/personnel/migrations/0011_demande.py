@@ -0,0 +1,94 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def creer_table_si_absente(apps, schema_editor):
+    # les bases existantes ont déjà la table (modèle créé sans migration) : seul l'état Django est ajouté
+    Demande = apps.get_model("personnel", "Demande")
+    if Demande._meta.db_table not in schema_editor.connection.introspection.table_names():
+        schema_editor.create_model(Demande)
+
+
+class Migration(migrations.Migration):
+    """
+    Rattrapage d'une dérive antérieure (modèle Demande sans migration), indépendant des index keyset (0012).
+    """
+
+    dependencies = [
+        ("personnel", "0010_personnel_categorie_grade"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[migrations.CreateModel(
+            name="Demande",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "type_demande",
+                    models.CharField(
+                        choices=[
+                            ("sortie", "Demande de sortie"),
+                            ("attestation", "Demande d'attestation de travail"),
+                        ],
+                        max_length=50,
+                    ),
+                ),
+                ("date_soumission", models.DateTimeField(auto_now_add=True)),
+                (
+                    "date_validation",
+                    models.DateTimeField(blank=True, editable=False, null=True),
+                ),
+                ("motif", models.TextField(blank=True, null=True)),
+                (
+                    "statut",
+                    models.CharField(
+                        choices=[
+                            ("en_attente", "En attente"),
+                            ("approuve", "Approuvée"),
+                            ("refuse", "Refusée"),
+                        ],
+                        default="en_attente",
+                        max_length=20,
+                    ),
+                ),
+                ("date_sortie", models.DateField(blank=True, null=True)),
+                ("heure_sortie", models.TimeField(blank=True, null=True)),
+                ("heure_retour", models.TimeField(blank=True, null=True)),
+                (
+                    "nombre_copies",
+                    models.PositiveIntegerField(blank=True, default=1, null=True),
+                ),
+                (
+                    "langue",
+                    models.CharField(
+                        choices=[("fr", "Français"), ("en", "Anglais"), ("ar", "Arabe")],
+                        default="ar",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "personnel",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="demandes",
+                        to="personnel.personnel",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-date_soumission"],
+            },
+        )]),
+        # table conservée au retour arrière : elle a pu exister avant cette migration
+        migrations.RunPython(creer_table_si_absente, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 15:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("personnel", "0011_demande"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="personnel",
+            index=models.Index(fields=["nom", "id"], name="personnel_nom_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="demande",
+            index=models.Index(fields=["date_soumission", "id"], name="demande_rh_soumission_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="demande",
+            index=models.Index(fields=["personnel", "date_soumission", "id"], name="demande_rh_pers_soumis_idx"),
+        ),
+    ]
@@ -1,4 +1,8 @@
 from django.db import models
+from django.conf import settings
+from django.utils import timezone
+
+from staf_manag.utils.conges import categorie_grade, CATEGORIE_TECH, CATEGORIE_AUTRES
 
 class Personnel(models.Model):
     # GRADE_CHOICES = [
@@ -10,6 +14,14 @@ class Personnel(models.Model):
     nom = models.CharField(max_length=150)
     prenoms = models.CharField(max_length=150)
     grade = models.CharField(max_length=255)
+    # catégorie déduite du grade à chaque save (droit au congé "tech" ou "autres" de RegleConge)
+    categorie_grade = models.CharField(
+        max_length=20,
+        choices=[(CATEGORIE_TECH, 'Technicien / assistant'), (CATEGORIE_AUTRES, 'Autres')],
+        default=CATEGORIE_AUTRES,
+        editable=False,
+        db_index=True,
+    )
     rang = models.CharField(max_length=255, blank=True, null=True)
     specialite = models.CharField(max_length=150)
     ecole_origine = models.CharField(max_length=150)
@@ -28,9 +40,22 @@ class Personnel(models.Model):
 
     # profil
     photo = models.ImageField(upload_to='profiles/', blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # liste paginée par clé : ORDER BY nom, id
+            models.Index(fields=['nom', 'id'], name='personnel_nom_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.nom} {self.prenoms} - {self.grade}"
+
+    def save(self, *args, **kwargs):
+        self.categorie_grade = categorie_grade(self.grade)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'grade' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'categorie_grade'}
+        super().save(*args, **kwargs)
     
 class Demande(models.Model):
     TYPE_DEMANDE = [
@@ -67,5 +92,65 @@ class Demande(models.Model):
 
     class Meta:
         ordering = ["-date_soumission"]
+        indexes = [
+            # listes paginées par clé : ORDER BY date_soumission DESC, id DESC (toutes / par personnel)
+            models.Index(fields=['date_soumission', 'id'], name='demande_rh_soumission_id_idx'),
+            models.Index(fields=['personnel', 'date_soumission', 'id'], name='demande_rh_pers_soumis_idx'),
+        ]
+    def __str__(self):
+        return f"{self.personnel} - {self.type_demande} ({self.statut})"
+
+class ImportJob(models.Model):
+    """
+    Import de personnels exécuté hors requête HTTP (cf. personnel/import_jobs.py).
+    Le POST crée le job et renvoie son id ; le frontend interroge ensuite l'état.
+    """
+    TYPE_IMPORT = [
+        ("zip_excel", "Import ZIP + Excel"),
+        ("excel", "Import Excel"),
+    ]
+
+    STATUT = [
+        ("en_attente", "En attente"),
+        ("en_cours", "En cours"),
+        ("termine", "Terminé"),
+        ("echec", "Echec"),
+    ]
+
+    type_import = models.CharField(max_length=20, choices=TYPE_IMPORT)
+    statut = models.CharField(max_length=20, choices=STATUT, default='en_attente', db_index=True)
+    cree_par = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs')
+
+    # dossier de travail propre au job (fichiers uploadés) et options de l'import
+    dossier = models.CharField(max_length=500, blank=True, default='')
+    options = models.JSONField(default=dict, blank=True)
+
+    # progression
+    total_lignes = models.PositiveIntegerField(default=0)
+    lignes_traitees = models.PositiveIntegerField(default=0)
+    nb_erreurs = models.PositiveIntegerField(default=0)
+    erreurs = models.JSONField(default=list, blank=True)
+    resultat = models.JSONField(default=dict, blank=True)
+    message = models.TextField(blank=True, default='')
+
+    date_creation = models.DateTimeField(auto_now_add=True, editable=False)
+    date_debut = models.DateTimeField(null=True, blank=True)
+    date_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-date_creation"]
+
     def __str__(self):
-        return f"{self.personnel} - {self.type_demande} ({self.statut})"
\ No newline at end of file
+        return f"Import {self.type_import} #{self.pk} ({self.statut})"
+
+    def duree(self) -> float:
+        """Durée écoulée en secondes (jusqu'à maintenant si le job tourne encore)."""
+        if not self.date_debut:
+            return 0.0
+        fin = self.date_fin or timezone.now()
+        return max(0.0, (fin - self.date_debut).total_seconds())
+
+    def debit(self) -> float:
+        """Lignes traitées par seconde."""
+        duree = self.duree()
+        return round(self.lignes_traitees / duree, 2) if duree > 0 else 0.0
@@ -0,0 +1,117 @@
+"""
+Téléchargement concurrent des documents distants référencés dans les imports de personnels.
+
+- pool de threads borné + une requests.Session partagée (connexions HTTP réutilisées)
+- limite de requêtes simultanées par hôte (pour ne pas saturer un même serveur)
+- nouvelles tentatives avec backoff exponentiel (erreurs réseau, 429, 5xx)
+- écriture en streaming sur disque (pas de resp.content en mémoire)
+
+Le fetcher ne dépend que d'URLs : il se teste contre n'importe quel serveur HTTP local
+(ex: http.server dans un thread) en lui passant éventuellement sa propre session.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+import mimetypes, os, threading, time, urllib.parse, uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+CHUNK_SIZE = 64 * 1024
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+@dataclass
+class FetchResult:
+    url: str
+    path: Optional[Path] = None
+    filename: Optional[str] = None
+    error: Optional[str] = None
+    tentatives: int = 0
+
+def remote_filename(url: str, content_type: Optional[str]) -> str:
+    """Nom de fichier déduit de l'URL, complété par l'extension du content-type si besoin."""
+    parsed = urllib.parse.urlparse(url)
+    filename = os.path.basename(parsed.path) or "document"
+    if not os.path.splitext(filename)[1] and content_type:
+        ext = mimetypes.guess_extension(content_type.split(';')[0].strip())
+        if ext:
+            filename += ext
+    return filename
+
+class RemoteFetcher:
+    def __init__(self, dest_dir: Path, max_workers: int = None, per_host: int = None,
+                 retries: int = None, backoff: float = 0.5, timeout: float = None,
+                 session: requests.Session = None):
+        self.dest_dir = Path(dest_dir)
+        self.max_workers = max_workers or getattr(settings, "IMPORT_FETCH_WORKERS", 8)
+        self.per_host = per_host or getattr(settings, "IMPORT_FETCH_PER_HOST", 4)
+        self.retries = getattr(settings, "IMPORT_FETCH_RETRIES", 3) if retries is None else retries
+        self.backoff = backoff
+        self.timeout = timeout or getattr(settings, "IMPORT_FETCH_TIMEOUT", 20)
+        self.session = session or self._build_session()
+
+        self._host_locks: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_locks_guard = threading.Lock()
+
+    def _build_session(self) -> requests.Session:
+        session = requests.Session()
+        # pool de connexions dimensionné sur le nombre de threads
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _host_semaphore(self, url: str) -> threading.BoundedSemaphore:
+        host = urllib.parse.urlparse(url).netloc.lower()
+        with self._host_locks_guard:
+            if host not in self._host_locks:
+                self._host_locks[host] = threading.BoundedSemaphore(self.per_host)
+            return self._host_locks[host]
+
+    def fetch_one(self, url: str) -> FetchResult:
+        result = FetchResult(url=url)
+        for tentative in range(1, self.retries + 2):
+            result.tentatives = tentative
+            try:
+                with self._host_semaphore(url):
+                    with self.session.get(url, timeout=self.timeout, stream=True) as resp:
+                        if resp.status_code in RETRY_STATUS:
+                            raise requests.HTTPError(f"{resp.status_code} pour {url}", response=resp)
+                        resp.raise_for_status()
+
+                        filename = remote_filename(url, resp.headers.get('content-type'))
+                        target = self.dest_dir / f"{uuid.uuid4().hex}_{filename}"
+                        with open(target, "wb") as f:
+                            for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                                if chunk:
+                                    f.write(chunk)
+
+                result.path, result.filename, result.error = target, filename, None
+                return result
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                result.error = str(e)
+                status_code = getattr(getattr(e, "response", None), "status_code", None)
+                # erreur client définitive (404, 403...) -> inutile de réessayer
+                if status_code is not None and status_code not in RETRY_STATUS:
+                    return result
+            except Exception as e:
+                result.error = str(e)
+                return result
+
+            if tentative <= self.retries:
+                time.sleep(self.backoff * (2 ** (tentative - 1)))
+        return result
+
+    def fetch_all(self, urls: Iterable[str]) -> Dict[str, FetchResult]:
+        """Télécharge chaque URL distincte une seule fois ; retourne {url: FetchResult}."""
+        uniques = list(dict.fromkeys(u for u in urls if u))
+        if not uniques:
+            return {}
+        self.dest_dir.mkdir(parents=True, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(uniques)), thread_name_prefix="fetch") as pool:
+            return dict(zip(uniques, pool.map(self.fetch_one, uniques)))
+
+    def close(self):
+        self.session.close()
@@ -1,7 +1,17 @@
 from rest_framework import serializers
-from .models import Personnel, Demande
+from .models import Personnel, Demande, ImportJob
+from staf_manag.utils.champs_dynamiques import ChampsDynamiquesMixin
+
+class PersonnelResumeSerializer(serializers.ModelSerializer):
+    """Personnel imbriqué dans les listes compactes (?fields= / ?vue=resume sans ?expand=personnel)."""
+    class Meta:
+        model = Personnel
+        fields = ['id', 'matricule', 'nom', 'prenoms', 'grade']
+
+class PersonnelSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
+    champs_resume = ('id', 'matricule', 'nom', 'prenoms', 'grade', 'specialite', 'ecole_origine', 'email', 'telephone')
+    sources_modele = {'is_owner': ()}
 
-class PersonnelSerializer(serializers.ModelSerializer):
     is_owner = serializers.SerializerMethodField()
 
     role = serializers.CharField(source='user.role', default='utilisateur')
@@ -37,6 +47,19 @@ class PersonnelSerializer(serializers.ModelSerializer):
     class Meta:
         model = Personnel
         fields = '__all__'
+
+    @classmethod
+    def champs_compte(cls) -> set:
+        return {nom for nom, champ in cls._declared_fields.items() if (champ.source or '').startswith('user.')}
+
+    @classmethod
+    def preparer_queryset(cls, qs, prefixe='', request=None):
+        # champs source='user.*' : le compte est joint dans la même requête
+        garder, _ = cls.selection(request) if not prefixe else (None, set())
+        if garder is None or garder & cls.champs_compte():
+            return qs.select_related(f'{prefixe}user')
+        # sélection sans champ du compte : ni jointure, ni colonnes inutiles (fichiers, etc.)
+        return qs.only(*cls.champs_modele(garder))
         
     def create(self, validated_data):
         user_data = validated_data.pop('user', {})
@@ -103,10 +126,25 @@ class PersonnelSerializer(serializers.ModelSerializer):
 
         return instance
 
+def joindre_personnel(qs, garder=None, expand=(), colonnes=None):
+    """
+    Personnel imbriqué : complet avec son compte (pas de sélection ou ?expand=personnel),
+    sinon résumé, ses colonnes ajoutées à `colonnes` (liste passée ensuite à .only()).
+    """
+    if garder is None or 'personnel' in expand:
+        return PersonnelSerializer.preparer_queryset(qs, prefixe='personnel__')
+    if 'personnel' in garder:
+        qs = qs.select_related('personnel')
+        colonnes.extend(f'personnel__{c}' for c in PersonnelResumeSerializer.Meta.fields)
+    return qs
+
 # demandes/serializers.py
-class DemandeSerializer(serializers.ModelSerializer):
+class DemandeSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     personnel = PersonnelSerializer(read_only=True)
 
+    champs_resume = ('id', 'personnel', 'type_demande', 'statut', 'date_soumission', 'date_validation')
+    relations_resumees = {'personnel': lambda: PersonnelResumeSerializer(read_only=True)}
+
     class Meta:
         model = Demande
         fields = "__all__"
@@ -117,6 +155,14 @@ class DemandeSerializer(serializers.ModelSerializer):
             "personnel",
         ]
 
+    @classmethod
+    def preparer_queryset(cls, qs, request=None):
+        garder, expand = cls.selection(request)
+        if garder is None:
+            return joindre_personnel(qs)
+        colonnes = cls.champs_modele(garder)
+        return joindre_personnel(qs, garder, expand, colonnes).only(*colonnes)
+
     def validate(self, data):
         type_demande = data.get("type_demande")
 
@@ -153,4 +199,25 @@ class PersonnelPhotoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Personnel
         fields = ['photo']
-        
\ No newline at end of file
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    duree = serializers.SerializerMethodField()
+    debit = serializers.SerializerMethodField()
+    progression = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        exclude = ['dossier', 'options']
+        read_only_fields = [f.name for f in ImportJob._meta.fields]
+
+    def get_duree(self, obj):
+        return round(obj.duree(), 2)
+
+    def get_debit(self, obj):
+        return obj.debit()
+
+    def get_progression(self, obj):
+        # pourcentage de lignes traitées
+        if not obj.total_lignes:
+            return 100 if obj.statut == 'termine' else 0
+        return round(100 * obj.lignes_traitees / obj.total_lignes)
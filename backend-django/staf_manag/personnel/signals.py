@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
 from django.db import transaction
 
@@ -10,22 +10,15 @@ import re
 from django.contrib.auth import get_user_model
 from decimal import Decimal, ROUND_HALF_UP
 from staf_manag.utils.conges import to_decimal
+from conges.regle_jobs import soumettre_application
+from conges.regle_cache import conge_initial_pour_grade, invalider_regle_courante
+from conges.mouvements import ETAT_VIDE, etat_compteurs, enregistrer_mouvement
+from staf_manag.utils.conditionnel import incrementer_versions
 
 
 User = get_user_model()
 def compute_initial_by_grade(grade: str) -> int:
-    regle = RegleConge.objects.order_by('-date_maj').first()
-    
-    g= grade.lower()
-    if not regle:
-        # on utilise les valeurs par défaut définies dans le modèle
-        if g and (re.search(r'technicien(ne)?', g, re.IGNORECASE) or re.search(r'assistant(e)?', g, re.IGNORECASE)):
-            return 72
-        return 45
-    
-    if grade and re.search(r'technicien(ne)?', grade, re.IGNORECASE) or re.search(r'assistant(e)?', grade, re.IGNORECASE):
-        return regle.conge_initial_tech
-    return regle.conge_initial_autres
+    return conge_initial_pour_grade(grade)
         
 @receiver(post_save, sender=Personnel)
 def create_user_for_staff(sender, instance, created, **kwargs):
@@ -53,8 +46,10 @@ def create_conge_for_staff(sender, instance, created, **kwargs):
             )
             # conge.conge_initial=conge.get_default_conge_initial()
             
+            avant = etat_compteurs(conge)
             conge.initialiser()
             conge.save()
+            enregistrer_mouvement(conge, avant, 'acquisition', motif="Droits de l'année")
 
 # recuperer le grade actuel du personnel en base (s'il existe) et
 # l'attache temporairement à l'instance pour comparaison dans post_save
@@ -100,6 +95,7 @@ def _update_conge_after_grade_change(sender, instance: Personnel, created, **kwa
     with transaction.atomic():
         annee = timezone.now().year
         conge, created_conge = Conge.objects.get_or_create(personnel=instance, annee=annee)
+        avant = etat_compteurs(conge)
         conge.conge_initial = new_initial
         
         # calculer les conges validés
@@ -122,33 +118,44 @@ def _update_conge_after_grade_change(sender, instance: Personnel, created, **kwa
             total = 0
         conge.conge_total = total
         conge.save()
+        enregistrer_mouvement(conge, avant, 'grade', motif=f"{old_grade or ''} -> {new_grade or ''}"[:255])
 
     # Conge.objects.filter(personnel=instance).update(conge_initial=Conge(personnel=instance).get_default_conge_initial())
 
+# journal des congés : tout conge créé par save() commence par un mouvement d'ouverture
+# (les créations par bulk_create enregistrent le leur explicitement)
+@receiver(post_save, sender=Conge)
+def ouvrir_journal_conge(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        enregistrer_mouvement(instance, ETAT_VIDE, 'ouverture')
+
+# la règle en vigueur est mise en cache : on l'invalide tout de suite
+# puis au commit (une lecture pendant la transaction a pu remettre l'ancienne)
+@receiver(post_save, sender=RegleConge)
+@receiver(post_delete, sender=RegleConge)
+def invalider_cache_regle(sender, instance, **kwargs):
+    invalider_regle_courante()
+    transaction.on_commit(invalider_regle_courante)
+
 # code pour appliquer la novelle regle de conge
+# (en lot, après commit, hors de la requête : voir conges/regle_jobs.py)
 @receiver(post_save, sender=RegleConge)
 def update_conge_after_regle(sender, instance, created, **kwargs):
-    conges = Conge.objects.select_related('personnel').all()
-    updates = []
-    for conge in conges:
-        nouveau = conge.get_default_conge_initial()
-        ancien = conge.conge_initial
-        if ancien != nouveau:
-            conge.conge_initial = nouveau
-
-            preleve= nouveau + conge.conge_restant_annee_courante - ancien
-            if preleve > 0:
-                conge.conge_restant_annee_courante = preleve
-            else:
-                conge.conge_restant_annee_courante = 0
-
-            conge.recalculer_acquisition_mensuelle(save=False)
-            
-            updates.append(conge)
-            conge.save()
-    if updates:
-        Conge.objects.bulk_update(updates, ['conge_initial', 'conge_restant_annee_courante', 'conge_total', 'conge_restant_annee_n_1', 'conge_restant_annee_n_2'])
-    # bulk_update pour mettre à jour plusieurs instances de conge en une seule requête
+    instance.statut_application = 'en_attente'
+    RegleConge.objects.filter(pk=instance.pk).update(statut_application='en_attente')
+    soumettre_application(instance.pk)
+
+# ETag des endpoints par utilisateur (staf_manag/utils/conditionnel.py) : la version du compte
+# suit aussi son personnel et ses préférences (le compte lui-même l'incrémente dans save())
+@receiver(post_save, sender=Personnel)
+def incrementer_version_personnel(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        incrementer_versions(CustomUser.objects.filter(personnel=instance))
+
+@receiver(post_save, sender=UserPreferences)
+def incrementer_version_preferences(sender, instance, raw=False, **kwargs):
+    if not raw:
+        incrementer_versions(CustomUser.objects.filter(pk=instance.user_id))
 
 @receiver(post_save, sender=CustomUser)
 def create_user_preferences(sender, instance, created, **kwargs):
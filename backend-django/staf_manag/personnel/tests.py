@@ -1,3 +1,380 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from pathlib import Path
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+import openpyxl
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.signals import request_started
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import CustomUser
+from personnel.models import ImportJob, Personnel
+from personnel.remote_fetch import RemoteFetcher
+from personnel.import_helpers import attach_remote_files
+from personnel import import_jobs
+from personnel.import_jobs import (
+    REPRISE_UID, creer_job, executer_job, jobs_base_dir, nettoyer_dossiers_orphelins,
+    recuperer_jobs_interrompus, reprendre_au_demarrage,
+)
 
 # Create your tests here.
+
+class ServeurDocuments(BaseHTTPRequestHandler):
+    """
+    Serveur HTTP local de test :
+    /ok/<nom>       200
+    /instable/<nom> 503 aux deux premiers appels, puis 200
+    /lent/<nom>     répond après 1 s au premier appel (délai dépassé), puis 200 immédiatement
+    /absent/<nom>   404
+    /attente/<nom>  200 après 0.2 s (mesure des requêtes simultanées)
+    """
+    appels = {}
+    en_cours = 0
+    max_en_cours = 0
+    verrou = threading.Lock()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.verrou:
+            cls.appels[self.path] = n = cls.appels.get(self.path, 0) + 1
+            cls.en_cours += 1
+            cls.max_en_cours = max(cls.max_en_cours, cls.en_cours)
+        try:
+            if self.path.startswith("/instable/") and n <= 2:
+                return self.repondre(503)
+            if self.path.startswith("/absent/"):
+                return self.repondre(404)
+            if self.path.startswith("/lent/") and n == 1:
+                time.sleep(1)
+            if self.path.startswith("/attente/"):
+                time.sleep(0.2)
+            self.repondre(200, f"contenu de {self.path}".encode())
+        finally:
+            with cls.verrou:
+                cls.en_cours -= 1
+
+    def repondre(self, status, corps=b""):
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+        except (BrokenPipeError, ConnectionResetError):
+            # client parti après son délai d'attente
+            pass
+
+    def log_message(self, *args):
+        pass
+
+class ServeurLocalMixin:
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.serveur = ThreadingHTTPServer(("127.0.0.1", 0), ServeurDocuments)
+        cls.serveur.daemon_threads = True
+        threading.Thread(target=cls.serveur.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.serveur.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.serveur.shutdown()
+        cls.serveur.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        ServeurDocuments.appels = {}
+        ServeurDocuments.en_cours = ServeurDocuments.max_en_cours = 0
+        self.dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dossier.cleanup)
+
+    def fetcher(self, **kwargs):
+        options = dict(retries=3, backoff=0.01, timeout=0.5)
+        options.update(kwargs)
+        fetcher = RemoteFetcher(Path(self.dossier.name), **options)
+        self.addCleanup(fetcher.close)
+        return fetcher
+
+class RemoteFetcherTests(ServeurLocalMixin, SimpleTestCase):
+
+    def test_nouvel_essai_sur_5xx(self):
+        res = self.fetcher().fetch_one(f"{self.base}/instable/cv.pdf")
+        self.assertIsNone(res.error)
+        self.assertEqual(res.tentatives, 3)
+        self.assertEqual(res.path.read_bytes(), b"contenu de /instable/cv.pdf")
+
+    def test_nouvel_essai_sur_delai_depasse(self):
+        res = self.fetcher().fetch_one(f"{self.base}/lent/cv.pdf")
+        self.assertIsNone(res.error)
+        self.assertEqual(res.tentatives, 2)
+
+    def test_pas_de_nouvel_essai_sur_404(self):
+        res = self.fetcher().fetch_one(f"{self.base}/absent/cv.pdf")
+        self.assertIn("404", res.error)
+        self.assertEqual(res.tentatives, 1)
+        self.assertEqual(ServeurDocuments.appels["/absent/cv.pdf"], 1)
+
+    def test_limite_par_hote(self):
+        urls = [f"{self.base}/attente/doc{i}.pdf" for i in range(8)]
+        resultats = self.fetcher(max_workers=8, per_host=2, timeout=5).fetch_all(urls + urls[:2])
+
+        self.assertEqual(set(resultats), set(urls))
+        self.assertTrue(all(r.error is None for r in resultats.values()))
+        # chaque URL une seule fois, jamais plus de 2 requêtes simultanées sur l'hôte
+        self.assertEqual(sum(ServeurDocuments.appels.values()), 8)
+        self.assertEqual(ServeurDocuments.max_en_cours, 2)
+
+class AttachRemoteFilesTests(ServeurLocalMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        medias = tempfile.TemporaryDirectory()
+        self.addCleanup(medias.cleanup)
+        reglages = override_settings(MEDIA_ROOT=medias.name, IMPORT_FETCH_RETRIES=0, IMPORT_FETCH_TIMEOUT=2)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+        self.personnel = Personnel.objects.create(
+            nom="Nom", prenoms="Prenom", grade="Technicien", specialite="Info",
+            ecole_origine="ENIT", cin="C00001", matricule="M00001", telephone="0",
+            email="p1@exemple.tn", date_affectation=date(2020, 1, 1), date_passage_grade=date(2020, 1, 1),
+        )
+
+    def test_fichiers_attaches_au_personnel(self):
+        erreurs = attach_remote_files([
+            (self.personnel, "cv", f"{self.base}/ok/cv.pdf", 0),
+            (self.personnel, "pv_affectation", f"{self.base}/absent/pv.pdf", 0),
+        ])
+
+        self.personnel.refresh_from_db()
+        with self.personnel.cv.open("rb") as f:
+            self.assertEqual(f.read(), b"contenu de /ok/cv.pdf")
+        self.assertTrue(self.personnel.cv.name.endswith("cv.pdf"))
+        self.assertFalse(self.personnel.pv_affectation)
+        self.assertEqual(len(erreurs), 1)
+        self.assertIn("pv_affectation", erreurs[0])
+
+class DossiersOrphelinsTests(TestCase):
+
+    def setUp(self):
+        base = tempfile.TemporaryDirectory()
+        self.addCleanup(base.cleanup)
+        reglages = override_settings(BASE_DIR=base.name, IMPORT_ORPHELINS_DELAI_MINUTES=60)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+    def dossier(self, nom, age_minutes=0):
+        dossier = jobs_base_dir() / nom
+        dossier.mkdir(parents=True)
+        (dossier / "personnels.xlsx").write_bytes(b"x")
+        date = time.time() - 60 * age_minutes
+        os.utime(dossier, (date, date))
+        return dossier
+
+    def test_seuls_les_anciens_dossiers_inactifs_sont_supprimes(self):
+        actif = ImportJob.objects.create(type_import="excel")
+        termine = ImportJob.objects.create(type_import="excel", statut="termine")
+
+        dossier_actif = self.dossier(f"job_{actif.pk}", age_minutes=120)
+        dossier_termine = self.dossier(f"job_{termine.pk}", age_minutes=120)
+        # job en cours de création dans une autre requête : ligne pas encore visible
+        dossier_recent = self.dossier(f"job_{termine.pk + 1}")
+
+        self.assertEqual(nettoyer_dossiers_orphelins(), 1)
+        self.assertTrue(dossier_actif.exists())
+        self.assertFalse(dossier_termine.exists())
+        self.assertTrue(dossier_recent.exists())
+
+def fichier_excel(*matricules):
+    lignes = [
+        {
+            "nom et prénom": f"Nom{i} Prenom{i}", "grade": "Technicien", "spécialité": "Info",
+            "etablissement d'origine": "ENIT", "cin": f"C{i:07d}", "matricule": matricule,
+            "n° téléphone": "0", "adresse e-mail": f"p{i}@exemple.tn",
+            "date d'affectation": "01/01/2020", "date de passage de grade": "01/01/2020",
+        }
+        for i, matricule in enumerate(matricules, start=1)
+    ]
+    tampon = BytesIO()
+    pd.DataFrame(lignes).to_excel(tampon, index=False)
+    return SimpleUploadedFile("personnels.xlsx", tampon.getvalue())
+
+class ImportJobsTests(TransactionTestCase):
+    """Cycle de vie d'un job d'import (executer_job ferme les connexions : transactions réelles)."""
+
+    def setUp(self):
+        base = tempfile.TemporaryDirectory()
+        self.addCleanup(base.cleanup)
+        reglages = override_settings(BASE_DIR=base.name, IMPORT_JOBS_INLINE_WORKER=False, IMPORT_JOB_BAIL_MINUTES=120)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser(matricule="ADMIN", password="admin"))
+
+    def test_import_202_puis_termine(self):
+        reponse = self.client.post(
+            "/api/personnels/import_personnel_from_excel/",
+            {"fichier": fichier_excel("M0000001", "M0000002")}, format="multipart",
+        )
+        self.assertEqual(reponse.status_code, 202)
+        job_id = reponse.json()["job_id"]
+        self.assertEqual(reponse.json()["statut"], "en_attente")
+        dossier = Path(ImportJob.objects.get(pk=job_id).dossier)
+        self.assertTrue(dossier.exists())
+
+        self.assertTrue(executer_job(job_id))
+        # un job n'est exécuté qu'une fois
+        self.assertFalse(executer_job(job_id))
+
+        etat = self.client.get(f"/api/import-jobs/{job_id}/").json()
+        self.assertEqual(etat["statut"], "termine")
+        self.assertEqual((etat["lignes_traitees"], etat["total_lignes"], etat["progression"]), (2, 2, 100))
+        self.assertEqual(Personnel.objects.filter(matricule__in=["M0000001", "M0000002"]).count(), 2)
+        self.assertFalse(dossier.exists())
+
+    def test_exception_du_runner_passe_en_echec(self):
+        def runner_en_erreur(job, progress):
+            raise ValueError("fichier illisible")
+
+        job = creer_job("excel", fichiers={"fichier": fichier_excel("M0000001")})
+        with mock.patch.dict(import_jobs.RUNNERS, {"excel": runner_en_erreur}):
+            self.assertTrue(executer_job(job.pk))
+
+        job.refresh_from_db()
+        self.assertEqual((job.statut, job.message), ("echec", "fichier illisible"))
+        self.assertIsNotNone(job.date_fin)
+        self.assertFalse(Path(job.dossier).exists())
+
+    def test_job_interrompu_passe_en_echec_et_son_dossier_est_supprime(self):
+        maintenant = timezone.now()
+        interrompu = ImportJob.objects.create(type_import="excel", statut="en_cours", date_debut=maintenant - timedelta(hours=3))
+        en_cours = ImportJob.objects.create(type_import="excel", statut="en_cours", date_debut=maintenant - timedelta(minutes=10))
+        for job in (interrompu, en_cours):
+            dossier = jobs_base_dir() / f"job_{job.pk}"
+            dossier.mkdir(parents=True)
+            date_modif = time.time() - 3 * 3600
+            os.utime(dossier, (date_modif, date_modif))
+
+        self.assertEqual(recuperer_jobs_interrompus(), 1)
+        interrompu.refresh_from_db()
+        en_cours.refresh_from_db()
+        self.assertEqual(interrompu.statut, "echec")
+        self.assertIn("interrompu", interrompu.message)
+        self.assertEqual(en_cours.statut, "en_cours")
+
+        self.assertEqual(nettoyer_dossiers_orphelins(), 1)
+        self.assertFalse((jobs_base_dir() / f"job_{interrompu.pk}").exists())
+        self.assertTrue((jobs_base_dir() / f"job_{en_cours.pk}").exists())
+
+    def test_reprise_au_demarrage_resoumet_les_jobs_en_attente(self):
+        self.addCleanup(request_started.connect, reprendre_au_demarrage, dispatch_uid=REPRISE_UID)
+        en_attente = ImportJob.objects.create(type_import="excel")
+        ImportJob.objects.create(type_import="excel", statut="termine")
+
+        pool = mock.Mock()
+        with override_settings(IMPORT_JOBS_INLINE_WORKER=True), \
+                mock.patch.object(import_jobs, "get_executor", return_value=pool):
+            reprendre_au_demarrage()
+            # une seule fois par process
+            request_started.send(sender=None)
+
+        pool.submit.assert_called_once_with(executer_job, en_attente.pk)
+
+class ExportPersonnelTests(TestCase):
+    """Export XLSX en streaming : un seul parcours des personnels, colonnes de tous types."""
+
+    URL = "/api/personnels/export_personnel/?columns=id,nom,email,date_affectation,cv,annee,conge_total,inconnue"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_superuser(matricule="ADMIN", password="admin"))
+        for i in (1, 2, 3):
+            Personnel.objects.create(
+                nom=f"Nom{i}", prenoms=f"Prenom{i}", grade="Technicien", specialite="Info",
+                ecole_origine="ENIT", cin=f"C{i:05d}", matricule=f"M{i:05d}", telephone="0",
+                email=f"p{i}@exemple.tn", date_affectation=date(2020, 1, i), date_passage_grade=date(2020, 1, 1),
+            )
+
+    def exporter(self):
+        with CaptureQueriesContext(connection) as requetes:
+            reponse = self.client.get(self.URL)
+            contenu = b"".join(reponse.streaming_content)
+        self.assertEqual(reponse.status_code, 200)
+        lectures = [q["sql"] for q in requetes.captured_queries if 'FROM "personnel_personnel"' in q["sql"]]
+        return openpyxl.load_workbook(BytesIO(contenu)).active, lectures
+
+    def test_export_xlsx(self):
+        feuille, lectures = self.exporter()
+        lignes = list(feuille.iter_rows(values_only=True))
+
+        self.assertEqual(lignes[0], ("id", "Nom", "Adresse e-mail", "Date d’affectation", "CV", "Année", "Total congés", "inconnue"))
+        premier = Personnel.objects.order_by("id").first()
+        conge = premier.conges.get()
+        self.assertEqual(
+            lignes[1],
+            (str(premier.pk), "Nom1", "p1@exemple.tn", "01/01/2020", None, str(conge.annee), str(conge.conge_total), None),
+        )
+        self.assertEqual(len(lignes), 4)
+
+        # largeurs fixées d'après les champs, y compris les colonnes de congés jointes
+        largeurs = {lettre: dim.width for lettre, dim in feuille.column_dimensions.items()}
+        self.assertEqual(largeurs["B"], 40 + 4)
+        self.assertEqual(largeurs["G"], len("Total congés") + 4)
+        self.assertGreater(largeurs["F"], len("Année") + 4)
+
+        # un seul parcours des personnels (pas d'agrégat de largeurs avant l'écriture)
+        self.assertEqual(len(lectures), 1)
+        Personnel.objects.create(
+            nom="Nom4", prenoms="Prenom4", grade="Technicien", specialite="Info",
+            ecole_origine="ENIT", cin="C00004", matricule="M00004", telephone="0",
+            email="p4@exemple.tn", date_affectation=date(2020, 1, 4), date_passage_grade=date(2020, 1, 1),
+        )
+        feuille, lectures = self.exporter()
+        self.assertEqual(feuille.max_row, 5)
+        self.assertEqual(len(lectures), 1)
+
+
+class CategorieGradeTests(TestCase):
+    """Personnel.categorie_grade suit le grade à chaque save, y compris avec update_fields."""
+
+    def creer(self, grade, i=1):
+        return Personnel.objects.create(
+            nom=f"Nom{i}", prenoms=f"Prenom{i}", grade=grade, specialite="Info", ecole_origine="ENIT",
+            cin=f"C{i:05d}", matricule=f"M{i:05d}", telephone="0", email=f"p{i}@exemple.tn",
+            date_affectation=date(2020, 1, 1), date_passage_grade=date(2020, 1, 1),
+        )
+
+    def categorie_en_base(self, personnel):
+        return Personnel.objects.values_list("categorie_grade", flat=True).get(pk=personnel.pk)
+
+    def test_categorie_a_la_creation(self):
+        self.assertEqual(self.categorie_en_base(self.creer("Technicienne principale")), "tech")
+        self.assertEqual(self.categorie_en_base(self.creer("Ingénieur", i=2)), "autres")
+
+    def test_categorie_avec_update_fields(self):
+        personnel = self.creer("Ingénieur")
+        personnel.grade = "Assistant technique"
+        personnel.save(update_fields=["grade"])
+        self.assertEqual(self.categorie_en_base(personnel), "tech")
+
+    def test_commande_recalcul_apres_update(self):
+        personnel = self.creer("Ingénieur")
+        Personnel.objects.filter(pk=personnel.pk).update(grade="Technicien")  # sans save : catégorie périmée
+        self.assertEqual(self.categorie_en_base(personnel), "autres")
+
+        call_command("recalculer_categories_grade", stdout=mock.MagicMock())
+        self.assertEqual(self.categorie_en_base(personnel), "tech")
@@ -5,6 +5,7 @@ from . import views
 router = routers.DefaultRouter()
 router.register(r'personnels', views.PersonnelViewSet)
 router.register(r'demandes', views.DemandeViewSet)
+router.register(r'import-jobs', views.ImportJobViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -9,21 +9,26 @@ from rest_framework.decorators import action, parser_classes
 from rest_framework.parsers import MultiPartParser, FormParser
 import pandas as pd
 from django.http import JsonResponse 
+from django.db import transaction
 from django.db.models import Q
 from staf_manag.pandas_import import parse_date
 
 from django.utils import timezone
 # from datetime import timedelta
 
-from .serializers import PersonnelSerializer, DemandeSerializer
-from .models import Personnel, Demande
-from accounts.models import CustomUser
-from staf_manag.utils.email_utils import send_html_email
+from .serializers import PersonnelSerializer, DemandeSerializer, ImportJobSerializer
+from .models import Personnel, Demande, ImportJob
+from staf_manag.utils.email_utils import mettre_en_file
+from accounts.digest_admin import admin_notifications, planifier_digest
+from staf_manag.utils.conditionnel import conditionnel, validateurs_compte
 from django.conf import settings
 
 # les imports pour exporter les personnels
-from django.http import HttpResponse
-from .export_utils import generate_excel
+from django.http import HttpResponse, FileResponse, StreamingHttpResponse
+from .export_utils import (
+    generate_excel, generate_excel_stream, XLSX_CONTENT_TYPE,
+    COLUMN_LABELS, EXPORT_FORMATS, export_rows, parquet_available, with_conge_columns,
+)
 from django.http import JsonResponse
 
 # les imports pour importer les personnels
@@ -32,6 +37,9 @@ import shutil
 from pathlib import Path
 from django.conf import settings
 from . import import_helpers # module hypothétique pour fonctions réutilisables
+from .import_helpers import safe_extract_zip
+from .import_jobs import creer_job, soumettre_job
+from conges.pagination import KeysetPagination
 
 from rest_framework.permissions import BasePermission
 
@@ -51,43 +59,6 @@ class IsAdminOrPersonnelOwner(BasePermission):
 
         return False
 
-# extraction ZIP sécurisée (empêcher path transversal)
-def safe_extract_zip(zip_path:Path, dest_dir: Path, overwrite: bool=True) -> tuple:
-    """
-    Extraire zip_path dans dest_dir en verifiant les chemins.
-    Retourne (succes True/False, message list)
-    """
-    message=[]
-    try:
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            # verification anti path transversal
-            for member in zip_ref.namelist():
-                member_path = dest_dir.joinpath(member)
-                if not str(member_path.resolve()).startswith(str(dest_dir.resolve())):
-                    return False, [f"Chemin non autorisé dans l'archive: {member}"]
-            
-            # extraction
-            for member in zip_ref.infolist():
-                target_path = dest_dir.joinpath(member.filename)
-                # si dossier -> le créer
-                if member.is_dir():
-                    target_path.mkdir(parents=True, exist_ok=True)
-                    continue
-                # assurer les parents
-                target_path.parent.mkdir(parents=True, exist_ok=True)
-                # ecraser ou non selon flag
-                if target_path.exists() and not overwrite:
-                    message.append(f"Fichier existant: {member.filename}")
-                    continue
-                with zip_ref.open(member) as source_f, open(target_path, 'wb') as target_f:
-                    shutil.copyfileobj(source_f, target_f)
-            message.append(f"Extraction effectuée")
-        return True, message
-    except zipfile.BadZipFile as e:
-        return False, [f"Le fichier n'est pas un zip: {e}"]
-    except Exception as e:
-        return False, [f"Une erreur s'est produite lors de l'extraction ZIP: {e}"]
-
 def test_https(request):
     return JsonResponse({
         "is_secure": request.is_secure(),
@@ -114,6 +85,12 @@ class PersonnelViewSet(viewsets.ModelViewSet):
     queryset = Personnel.objects.all()
     serializer_class = PersonnelSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrPersonnelOwner]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('nom', 'id')
+
+    def get_queryset(self):
+        # compte joint seulement si des champs user.* sont rendus, colonnes réduites avec ?fields= / ?vue=resume
+        return PersonnelSerializer.preparer_queryset(Personnel.objects.all(), request=self.request)
 
     def perform_update(self, serializer):
         # empêcher l'user de toucher les champs matricule, cin, grade,...
@@ -160,81 +137,21 @@ class PersonnelViewSet(viewsets.ModelViewSet):
         
         # choisi un format de fichier excel "xlsx", "xls"
         extensions = fichier.name.split('.')[-1].lower()
-        try:
-            df = None
-            if extensions in ['xlsx', 'xls']:
-                df = pd.read_excel(fichier)
-                df.columns = [col.strip().lower() for col in df.columns]
-            else:
-                return JsonResponse({"error": "Veuillez fournir un fichier Excel."}, status=status.HTTP_400_BAD_REQUEST)
+        if extensions not in ['xlsx', 'xls']:
+            return JsonResponse({"error": "Veuillez fournir un fichier Excel."}, status=status.HTTP_400_BAD_REQUEST)
 
-            # ignorer les colonnes non desirées
-            expected_columns = [
-                'nom et prénom', 'grade', 'spécialité', "etablissement d'origine",
-                'cin', 'matricule', 'telephone', 'n° téléphone', 'adresse e-mail', "date d'affectation", 'date de passage de grade'
-            ]
-            
-            extra_colunms = [col for col in df.columns if col not in expected_columns]
-          
-            nb_inserts = 0
-            doub = 0
-            nb_total = len(df)
-            personnels_ignores = []
-
-            for _, row in df.iterrows():
-                try:
-                    # nettoyage des champs
-                    cin = str(row.get('cin', '')).strip() if pd.notna(row.get('cin')) else ''
-                    matricule = str(row.get('matricule', '')).strip() if pd.notna(row.get('matricule')) else ''
-                    
-                    if not cin or not matricule:
-                        personnels_ignores.append("cin ou matricule vide")
-                        continue
-                
-                    # Ignorer les doublons
-                    if not Personnel.objects.filter(Q(cin=cin) | Q(matricule=matricule)).exists():
-                        nomComplet = str(row['nom et prénom']).strip().split(' ', 1)
-                        nom = nomComplet[0]
-                        prenoms = nomComplet[1] if len(nomComplet) > 1 else ""
-                        grade = str(row.get('grade')).strip()
-                        email=str(row.get('adresse e-mail')).strip()
-
-                        Personnel.objects.create(
-                            nom=nom,
-                            prenoms=prenoms,
-                            grade=grade,
-                            specialite=row.get('spécialité', ''),
-                            ecole_origine=row.get("etablissement d'origine", 'FSG'),
-                            cin=cin,
-                            matricule=matricule,
-                            telephone=row.get('n° téléphone', ''), #or row.get('telephone', ''),
-                            email=email,
-                            date_passage_grade=parse_date(row.get('date de passage de grade')),
-                            date_affectation=parse_date(row.get("date d'affectation")),
-                        )
-                        nb_inserts += 1
-
-                        # verifier les doublons
-                    elif matricule and Personnel.objects.filter(matricule=matricule).exists():
-                        personnels_ignores.append(f"Matricule: {row['matricule']}")
-                        doub += 1
-                        continue
-                    elif cin and Personnel.objects.filter(cin=cin).exists():
-                        personnels_ignores.append(f"CIN: {row['cin']}")
-                        doub += 1
-                        continue
-                    else:
-                        continue
-                except Exception as e:
-                    personnels_ignores.append(f"Ligne ignorée (erreur: {e})")
-            return JsonResponse({
-                "message": f"{nb_inserts} personnels importés avec succès sur {nb_total} ignorés ( {doub} doublons)",
-                "personnels_ignores": personnels_ignores,
-                "colonnes_ignorees": extra_colunms if extra_colunms else None,
-            }, status=status.HTTP_200_OK)
-        
+        # import exécuté en tâche de fond -> on renvoie l'id du job, l'état se lit sur /import-jobs/<id>/
+        try:
+            job = creer_job("excel", user=request.user, fichiers={"fichier": fichier})
+            soumettre_job(job)
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return JsonResponse({
+            "message": "Import en cours.",
+            "job_id": job.pk,
+            "statut": job.statut,
+        }, status=status.HTTP_202_ACCEPTED)
    
     # Implementation de la methode export_personnel_to_excel
     @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
@@ -248,19 +165,47 @@ class PersonnelViewSet(viewsets.ModelViewSet):
         if not columns or columns == [""]:
             return HttpResponse("Aucune colonnes spécifié", status=400)
         
-        personnels = Personnel.objects.all().order_by('id')
+        # format_export : xlsx (défaut), csv, ndjson, parquet
+        # (pas "format" : réservé par DRF à la négociation de contenu)
+        format_export = request.GET.get("format_export", "xlsx").lower()
+        if format_export != "xlsx" and format_export not in EXPORT_FORMATS:
+            return HttpResponse(f"Format d'export inconnu: {format_export}", status=400)
+        if format_export == "parquet" and not parquet_available():
+            return HttpResponse("Format parquet indisponible (pyarrow non installé)", status=400)
 
-        buffer = generate_excel(personnels, columns, lang, base_url=base_url)
-        response = HttpResponse(
-            # buffer,
-            buffer.getvalue(),
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        try:
+            annee = int(request.GET.get("annee") or timezone.now().year)
+        except ValueError:
+            return HttpResponse("Année invalide", status=400)
+
+        # ne charger que les colonnes exportées (les colonnes inconnues restent vides)
+        # + colonnes de congés de l'année demandée jointes par sous-requête
+        champs = {f.name for f in Personnel._meta.concrete_fields}
+        personnels = Personnel.objects.only('id', *[c for c in columns if c in champs]).order_by('id')
+        personnels = with_conge_columns(personnels, columns, annee)
+
+        if format_export in EXPORT_FORMATS:
+            fmt = EXPORT_FORMATS[format_export]
+            headers = [COLUMN_LABELS.get(col, {}).get(lang, col) for col in columns]
+            rows = export_rows(personnels, columns, base_url)
+            filename = f"personnels_fsg.{fmt.extension}"
+            if fmt.streaming:
+                response = StreamingHttpResponse(fmt.render(rows, columns, headers), content_type=fmt.content_type)
+                response["Content-Disposition"] = f'attachment; filename="{filename}"'
+                return response
+            return FileResponse(fmt.render(rows, columns, headers), as_attachment=True, filename=filename, content_type=fmt.content_type)
+
+        # export streaming : write-only + iterator, le fichier est envoyé par morceaux
+        fichier = generate_excel_stream(personnels, columns, lang, base_url=base_url)
+        return FileResponse(
+            fichier,
+            as_attachment=True,
+            filename="personnels_fsg.xlsx",
+            content_type=XLSX_CONTENT_TYPE,
         )
-        response["Content-Disposition"] = 'attachment; filename="personnels_fsg.xlsx"'
-
-        return response
 
     @action(detail=False, methods=['get', 'patch'], permission_classes=[permissions.IsAuthenticated])
+    @conditionnel(validateurs_compte)
     def me(self, request):
         user = request.user
         
@@ -322,75 +267,38 @@ class PersonnelViewSet(viewsets.ModelViewSet):
         Endpoint pour importer:
         - on accepte: 'zip' (le fichier zip), 'fichier' (excel) optionnel.
         - si le zip contient l'excel, on l'utilise; sinon on utilise 'fichier' uploadé.
-        - le zip est extrait dans BASE_DIR/doc_excel_personnel/
+        - par défaut le zip n'est pas extrait : les documents référencés sont lus dans l'archive
+        - 'extraire=true' : le zip est extrait dans BASE_DIR/doc_excel_personnel/ (ancien mode)
+        - réponse 202 avec job_id ; progression sur GET /api/import-jobs/<job_id>/
         """
         zip_file = request.FILES.get('zip')  # clé 'zip'
         excel_file = request.FILES.get('fichier')  # clé 'fichier' (optionnel)
         overwrite_files = request.data.get('overwrite', 'true').lower() == 'true'
+        # extraire=true : ancien mode (extraction complète dans doc_excel_personnel)
+        extraire = str(request.data.get('extraire', 'false')).lower() == 'true'
 
-        base_docs_dir = Path(settings.BASE_DIR) / "doc_excel_personnel"
-        base_docs_dir.mkdir(parents=True, exist_ok=True)
-
-        temp_dir = base_docs_dir / "tmp_import"
-        # nettoie temp si existe
-        if temp_dir.exists():
-            shutil.rmtree(temp_dir)
-        temp_dir.mkdir(parents=True, exist_ok=True)
+        if not zip_file and not excel_file:
+            return Response({"error": "Veuillez fournir un zip et/ou un fichier Excel."}, status=status.HTTP_400_BAD_REQUEST)
 
+        # l'extraction et l'import tournent dans un job (personnel/import_jobs.py) :
+        # la requête ne fait que sauvegarder les fichiers et renvoie l'id du job
         try:
-            # 1) si zip fourni -> l'enregistrer temporairement et extraire
-            if zip_file:
-                tmp_zip_path = temp_dir / zip_file.name
-                with open(tmp_zip_path, "wb") as f:
-                    for chunk in zip_file.chunks():
-                        f.write(chunk)
-
-                ok, messages = safe_extract_zip(tmp_zip_path, base_docs_dir, overwrite=overwrite_files)
-                if not ok:
-                    # cleanup temp
-                    shutil.rmtree(temp_dir)
-                    return Response({"error": "Extraction échouée", "details": messages}, status=status.HTTP_400_BAD_REQUEST)
-            # 2) déterminer l'excel à utiliser: si excel_file fourni -> priorité, sinon chercher un .xlsx dans base_docs_dir ou dans temp_dir
-            excel_path = None
-            if excel_file:
-                # sauvegarde l'excel dans temp_dir pour lecture
-                tmp_excel = temp_dir / excel_file.name
-                with open(tmp_excel, "wb") as f:
-                    for chunk in excel_file.chunks():
-                        f.write(chunk)
-                excel_path = tmp_excel
-            else:
-                # cherche un fichier excel dans base_docs_dir racine (ou dossier tmp si zip contenait excel)
-                candidates = list(base_docs_dir.glob("*.xls*"))
-                if candidates:
-                    # si plusieurs, prends le plus récent
-                    excel_path = sorted(candidates, key=lambda p: p.stat().st_mtime, reverse=True)[0]
-
-            if not excel_path or not excel_path.exists():
-                shutil.rmtree(temp_dir)
-                return Response({"error": "Aucun fichier Excel trouvé (uploadez 'fichier' ou incluez l'excel dans le zip)."}, status=status.HTTP_400_BAD_REQUEST)
-
-            # 3) lire l'excel en dataframe (pandas)
-            # import pandas as pd
-            df = pd.read_excel(excel_path)
-            # normalise colonnes
-            df.columns = [str(c).strip().lower() for c in df.columns]
-
-            # 4) appeler ta fonction d'import existante (adapte selon ta fonction)
-            # j'appelle ici une fonction helper que tu dois définir: import_df_and_attach_files(df, base_docs_dir)
-            # from . import import_helpers  # module hypothétique pour fonctions réutilisables
-            result = import_helpers.import_df_and_attach_files(df, base_docs_dir)
-
-            # cleanup temp
-            shutil.rmtree(temp_dir)
-            return Response(result, status=status.HTTP_200_OK)
-
+            job = creer_job(
+                "zip_excel",
+                user=request.user,
+                fichiers={"zip": zip_file, "fichier": excel_file},
+                options={"overwrite": overwrite_files, "extraire": extraire},
+            )
+            soumettre_job(job)
         except Exception as e:
-            # nettoyage du temp
-            if temp_dir.exists():
-                shutil.rmtree(temp_dir)
             return Response({"error": f"Erreur serveur: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        return Response({
+            "message": "Import en cours.",
+            "job_id": job.pk,
+            "statut": job.statut,
+        }, status=status.HTTP_202_ACCEPTED)
+
     @action(detail=True, methods=['patch'], permission_classes=[permissions.IsAuthenticated])
     def upload_media(self, request, pk=None):
         """
@@ -523,12 +431,15 @@ class DemandeViewSet(viewsets.ModelViewSet):
     queryset = Demande.objects.all()
     serializer_class = DemandeSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrPersonnelOwner]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date_soumission', '-id')
 
     def get_queryset(self):
         user = self.request.user
+        # personnel imbriqué (et son compte) joint : nombre de requêtes fixe par page
         if user.is_staff:
-            return Demande.objects.all().order_by("-date_soumission")
-        return Demande.objects.filter(personnel=user.personnel).order_by("-date_soumission")
+            return DemandeSerializer.preparer_queryset(Demande.objects.all(), self.request).order_by("-date_soumission")
+        return DemandeSerializer.preparer_queryset(Demande.objects.filter(personnel=user.personnel), self.request).order_by("-date_soumission")
 
     @action(
         detail=False,
@@ -599,27 +510,28 @@ class DemandeViewSet(viewsets.ModelViewSet):
         demande = self.get_object()
         if demande.statut != "en_attente":
             return Response({"detail": "Vous ne pouvez approuver que les demandes en attente."}, status=status.HTTP_400_BAD_REQUEST)
-        demande.statut = "approuve"
-        demande.date_validation = timezone.now()
-        demande.save()
-
-        to_mail = demande.personnel.email or None
-        if to_mail:
-            type_demande = demande.type_demande
-            lien = settings.DJANGO_API_URL + "login"
-
-            send_html_email(
-                subject=f"Demande de {type_demande} approuvée",
-                template="demande_approuver.html",
-                context={
-                    "demande": demande,
-                    "user": request.user,
-                    "year": timezone.now().year,
-                    "lien_espace": lien,
-                    "type_demande": type_demande
-                },
-                recipient_list=to_mail
-            )
+        with transaction.atomic():
+            demande.statut = "approuve"
+            demande.date_validation = timezone.now()
+            demande.save()
+
+            to_mail = demande.personnel.email or None
+            if to_mail:
+                type_demande = demande.type_demande
+                lien = settings.DJANGO_API_URL + "login"
+
+                mettre_en_file(
+                    subject=f"Demande de {type_demande} approuvée",
+                    template="demande_approuver.html",
+                    context={
+                        "demande": demande,
+                        "user": request.user,
+                        "year": timezone.now().year,
+                        "lien_espace": lien,
+                        "type_demande": type_demande
+                    },
+                    recipient_list=to_mail
+                )
         return Response({"message": "Demande approuvée."})
 
     @action(detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated, permissions.IsAdminUser])
@@ -627,25 +539,26 @@ class DemandeViewSet(viewsets.ModelViewSet):
         demande = self.get_object()
         if demande.statut != "en_attente":
             return Response({"detail": "Vous ne pouvez refuser que les demandes en attente."}, status=status.HTTP_400_BAD_REQUEST)
-        demande.statut = "refuse"
-        demande.save()
-
-        to_mail = demande.personnel.email or None
-        if to_mail:
-            type_demande = demande.type_demande
-            lien = settings.DJANGO_API_URL + "login"
-
-            send_html_email(
-                subject=f"Demande de {type_demande} refusée",
-                template="demande_refuser.html",
-                context={
-                    "demande": demande,
-                    "user": request.user,
-                    "year": timezone.now().year,
-                    "lien_espace": lien
-                },
-                recipient_list=to_mail
-            )
+        with transaction.atomic():
+            demande.statut = "refuse"
+            demande.save()
+
+            to_mail = demande.personnel.email or None
+            if to_mail:
+                type_demande = demande.type_demande
+                lien = settings.DJANGO_API_URL + "login"
+
+                mettre_en_file(
+                    subject=f"Demande de {type_demande} refusée",
+                    template="demande_refuser.html",
+                    context={
+                        "demande": demande,
+                        "user": request.user,
+                        "year": timezone.now().year,
+                        "lien_espace": lien
+                    },
+                    recipient_list=to_mail
+                )
         return Response({"message": "Demande refusée."})
     
     @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated])
@@ -654,61 +567,70 @@ class DemandeViewSet(viewsets.ModelViewSet):
         if not user.personnel:
             return Response({"detail": "Aucun personnel associé à cet utilisateur."}, status=status.HTTP_400_BAD_REQUEST)
         
-        serializer = self.get_serializer(data=request.data, context={'request': request})
-        serializer.is_valid(raise_exception=True)
-        demande = serializer.save()
-        # envoie une notificatons à l'admin par email
+        with transaction.atomic():
+            serializer = self.get_serializer(data=request.data, context={'request': request})
+            serializer.is_valid(raise_exception=True)
+            demande = serializer.save()
+            # envoie une notificatons à l'admin par email
         
-        lien = settings.DJANGO_API_URL
-
-        # recuperons le premier user admin qui a le même email que celui configurer dans settings settings.EMAIL_HOST_USER
-        # envoie une notificatons à l'admin par email
-        admin_email = str(settings.EMAIL_HOST_USER).strip()
-        if admin_email:
-            personnel = Personnel.objects.filter(email=admin_email).first()
-            admin_user = CustomUser.objects.filter(personnel=personnel).first() if personnel else request.user
+            lien = settings.DJANGO_API_URL
+
+            # admin destinataire (EMAIL_HOST_USER), son compte et son mode de notification en une requête
+            admin_email, admin_user, mode = admin_notifications()
+            if mode == "digest":
+                # pas d'email par demande : résumé périodique (accounts/digest_admin.py)
+                planifier_digest()
+                return Response(serializer.data, status=status.HTTP_201_CREATED)
+            admin_user = admin_user or request.user
    
-        if admin_user.is_authenticated:
-            lien_espace = lien + "dashboard/admin"
-        else:
-            lien_espace = lien + "login"
+            if admin_user.is_authenticated:
+                lien_espace = lien + "dashboard/admin"
+            else:
+                lien_espace = lien + "login"
         
-        if demande.type_demande == "sortie":
-            date_sortie = demande.date_sortie.strftime("%d/%m/%Y")
-            heure_sortie = demande.heure_sortie.strftime("%H:%M")
-            heure_retour = demande.heure_retour.strftime("%H:%M")
-
-            send_html_email(
-                subject="Nouvelle demande de sortie",
-                template="demande_sortie.html",
-                context={
-                    "demande": demande,
-                    "user": admin_user,
-                    "year": timezone.now().year,
-                    "lien_espace": lien_espace,
-                    "date_sortie": date_sortie,
-                    "heure_sortie": heure_sortie,
-                    "heure_retour": heure_retour
-                },
-                recipient_list=admin_email
-            )
-        elif demande.type_demande == "attestation":
-            nbr_copies = demande.nombre_copies
-            langue_certificat = demande.get_langue_display()
-
-            send_html_email(
-                subject="Nouvelle demande d'attestation",
-                template="demande_attestation.html",
-                context={
-                    "demande": demande,
-                    "user": admin_user,
-                    "year": timezone.now().year,
-                    "lien_espace": lien_espace,
-                    "nbr_copies": nbr_copies,
-                    "langue_certificat": langue_certificat
-                },
-                recipient_list=admin_email
-            )
+            if demande.type_demande == "sortie":
+                date_sortie = demande.date_sortie.strftime("%d/%m/%Y")
+                heure_sortie = demande.heure_sortie.strftime("%H:%M")
+                heure_retour = demande.heure_retour.strftime("%H:%M")
+
+                mettre_en_file(
+                    subject="Nouvelle demande de sortie",
+                    template="demande_sortie.html",
+                    context={
+                        "demande": demande,
+                        "user": admin_user,
+                        "year": timezone.now().year,
+                        "lien_espace": lien_espace,
+                        "date_sortie": date_sortie,
+                        "heure_sortie": heure_sortie,
+                        "heure_retour": heure_retour
+                    },
+                    recipient_list=admin_email
+                )
+            elif demande.type_demande == "attestation":
+                nbr_copies = demande.nombre_copies
+                langue_certificat = demande.get_langue_display()
+
+                mettre_en_file(
+                    subject="Nouvelle demande d'attestation",
+                    template="demande_attestation.html",
+                    context={
+                        "demande": demande,
+                        "user": admin_user,
+                        "year": timezone.now().year,
+                        "lien_espace": lien_espace,
+                        "nbr_copies": nbr_copies,
+                        "langue_certificat": langue_certificat
+                    },
+                    recipient_list=admin_email
+                )
             
         return Response(serializer.data, status=status.HTTP_201_CREATED)
-       
\ No newline at end of file
+
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Etat des jobs d'import : GET /api/import-jobs/<id>/ (lignes traitées, erreurs, débit)
+    """
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
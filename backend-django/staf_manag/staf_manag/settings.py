@@ -66,6 +66,44 @@ INSTALLED_APPS = [
     'corsheaders',
 ]
 CONGE_DECISION_LOCK_MINUTES = 15  # ex : 15 minutes de verrou après décision
+REGLE_CONGE_INLINE_WORKER = True  # False -> règles appliquées par `manage.py appliquer_regle_conge`
+REGLE_CONGE_CACHE_LOCAL_TTL = 5  # secondes, copie en mémoire de chaque process (délai max de propagation si CACHES n'est pas partagé)
+
+# jobs d'import de personnels (personnel/import_jobs.py)
+IMPORT_JOB_WORKERS = 2  # threads par process web
+IMPORT_JOBS_INLINE_WORKER = True  # False -> jobs exécutés par `manage.py run_import_jobs`
+IMPORT_JOB_BAIL_MINUTES = 120  # job en_cours depuis plus longtemps -> interrompu (echec)
+IMPORT_ORPHELINS_DELAI_MINUTES = 60  # dossiers de travail orphelins conservés au moins ce délai
+
+# téléchargement des documents distants pendant l'import (personnel/remote_fetch.py)
+IMPORT_FETCH_WORKERS = 8  # téléchargements simultanés
+IMPORT_FETCH_PER_HOST = 4  # téléchargements simultanés par hôte
+IMPORT_FETCH_RETRIES = 3  # nouvelles tentatives (backoff exponentiel)
+IMPORT_FETCH_TIMEOUT = 20  # secondes
+
+# export incrémental des congés (conges/delta_helpers.py)
+CONGE_DELTA_MARGE_SECONDES = 300  # retard du watermark sur now() : > plus longue transaction d'écriture des conges
+CONGE_DELTA_LIMITE_MAX = 1000  # lignes max par page
+
+# décisions en lot sur les demandes (conges/decisions.py)
+CONGE_DECISIONS_MAX = 500  # demandes max par appel
+
+# disponibles par mois (conges/disponibilites.py), clé de cache versionnée par Conge.date_maj
+CONGE_DISPONIBLE_CACHE_TTL = 86400  # secondes
+
+# calendrier des absences (conges/calendrier.py)
+CONGE_CALENDRIER_JOURS_MAX = 366  # largeur max de la plage demandée
+
+# file d'envoi des emails (accounts/email_jobs.py)
+EMAIL_OUTBOX_INLINE_WORKER = True  # False -> emails envoyés par `manage.py envoyer_emails`
+EMAIL_OUTBOX_LOT = 50  # messages par connexion SMTP
+EMAIL_OUTBOX_TENTATIVES_MAX = 5  # au-delà : statut "echec" (lettre morte)
+EMAIL_OUTBOX_DELAI_BASE = 60  # secondes, doublé à chaque nouvel essai
+EMAIL_OUTBOX_DELAI_MAX = 3600  # secondes
+
+# résumé périodique des nouvelles demandes pour l'admin (accounts/digest_admin.py)
+ADMIN_DIGEST_INTERVALLE_MINUTES = 60  # un résumé au plus par intervalle
+ADMIN_DIGEST_MARGE_SECONDES = 5  # la fin du résumé reste en retard de N s sur now() (transactions en cours)
 
 # On va utiliser le CustomUser au lieu de User
 AUTH_USER_MODEL = 'accounts.CustomUser'
@@ -217,8 +255,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # configuration du server email
 EMAIL_BACKEND = config('EMAIL_BACKEND')
 EMAIL_HOST = config('EMAIL_HOST')
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
+EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=20, cast=int)  # secondes, borne aussi le bail d'un lot de la file
 EMAIL_USE_SSL = False
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
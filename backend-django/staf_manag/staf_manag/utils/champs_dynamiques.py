@@ -0,0 +1,63 @@
+"""
+Représentations partielles des ressources de l'API (sparse fieldsets).
+
+- ?fields=a,b,c : ne renvoyer que ces champs
+- ?vue=resume   : champs de `champs_resume` (listes compactes des tableaux de bord)
+- ?expand=x,y   : relations imbriquées rendues en entier ; sinon, dès que fields / vue est utilisé,
+                  elles sont rendues sous leur forme résumée (voir `relations_resumees`)
+Sans aucun de ces paramètres la représentation complète est inchangée.
+
+Seul le serializer racine (instancié avec la requête dans son contexte) est filtré ;
+`champs_modele()` donne les colonnes à passer à .only() pour la même sélection.
+"""
+
+def lire_liste(request, param: str) -> set:
+    if request is None:
+        return set()
+    valeur = request.query_params.get(param) or ""
+    return {v.strip() for v in valeur.split(",") if v.strip()}
+
+class ChampsDynamiquesMixin:
+    # champs de ?vue=resume
+    champs_resume = ()
+    # {champ: fabrique du serializer résumé} pour les relations imbriquées non demandées dans ?expand=
+    relations_resumees = {}
+    # {champ du serializer: colonnes du modèle lues} quand le nom ne correspond pas à une colonne
+    sources_modele = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # serializer racine seulement : les champs imbriqués sont construits sans contexte
+        request = (kwargs.get('context') or {}).get('request')
+        garder, expand = self.selection(request)
+        if garder is None:
+            return
+
+        for nom in list(self.fields):
+            if nom not in garder:
+                self.fields.pop(nom)
+        for nom, fabrique in self.relations_resumees.items():
+            if nom in self.fields and nom not in expand:
+                self.fields[nom] = fabrique()
+
+    @classmethod
+    def selection(cls, request):
+        """(champs gardés ou None = tous, relations étendues)."""
+        if request is None or getattr(request, 'method', 'GET') != 'GET':
+            return None, set()
+        fields = lire_liste(request, 'fields')
+        expand = lire_liste(request, 'expand')
+        if not fields and request.query_params.get('vue') == 'resume':
+            fields = set(cls.champs_resume)
+        if not fields:
+            return None, expand
+        return fields | expand, expand
+
+    @classmethod
+    def champs_modele(cls, garder) -> list:
+        """Colonnes du modèle lues par les champs gardés (id toujours inclus), pour .only()."""
+        concrets = {f.name for f in cls.Meta.model._meta.concrete_fields}
+        colonnes = {'id'}
+        for nom in garder:
+            colonnes.update(c for c in cls.sources_modele.get(nom, (nom,)) if c in concrets)
+        return sorted(colonnes)
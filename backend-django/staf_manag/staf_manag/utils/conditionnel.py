@@ -0,0 +1,69 @@
+"""
+Requêtes conditionnelles (ETag / Last-Modified) pour les endpoints lus à chaque navigation du frontend.
+
+- l'ETag est calculé sans sérialiser : chemin + paramètres, utilisateur, CustomUser.version_donnees
+  (chargé avec le compte par l'authentification JWT) et les marqueurs fournis par la vue
+  (ex. max(date_maj) et nombre de lignes, une requête agrégée)
+- If-None-Match / If-Modified-Since satisfaits -> 304 sans exécuter la vue
+- les validateurs actuels renvoient derniere_modification = None : un max(date_maj) à la seconde près
+  ne voit ni les suppressions ni deux modifications dans la même seconde, seul l'ETag décide
+- version_donnees est incrémentée en base, dans la transaction de la modification (personnel/signals.py)
+"""
+from functools import wraps
+import hashlib
+
+from django.db.models import F
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+def incrementer_versions(users_qs):
+    """version_donnees + 1 pour les comptes du queryset (UPDATE, sans signal)."""
+    return users_qs.update(version_donnees=F('version_donnees') + 1)
+
+def calculer_etag(request, *marqueurs) -> str:
+    user = request.user
+    brut = repr((
+        request.get_full_path(),
+        getattr(user, 'pk', None),
+        getattr(user, 'version_donnees', None),
+        marqueurs,
+    ))
+    # ETag faible : même contenu, pas forcément le même octet près (rendu JSON)
+    return 'W/"%s"' % hashlib.sha1(brut.encode()).hexdigest()
+
+def conditionnel(validateurs):
+    """
+    Décorateur de méthode de vue DRF (GET / HEAD seulement).
+    validateurs(view, request, *args, **kwargs) -> (marqueurs: tuple, derniere_modification: datetime | None)
+    """
+    def decorateur(methode):
+        @wraps(methode)
+        def wrapper(view, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return methode(view, request, *args, **kwargs)
+
+            marqueurs, derniere = validateurs(view, request, *args, **kwargs)
+            etag = calculer_etag(request, *marqueurs)
+            last_modified = int(derniere.timestamp()) if derniere else None
+
+            non_modifie = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if non_modifie is None:
+                reponse = methode(view, request, *args, **kwargs)
+                if reponse.status_code != 200:
+                    return reponse
+            else:
+                reponse = non_modifie
+
+            reponse['ETag'] = etag
+            if last_modified is not None:
+                reponse['Last-Modified'] = http_date(last_modified)
+            # réponse propre à l'utilisateur : revalidée à chaque fois, jamais partagée
+            reponse['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(reponse, ['Authorization'])
+            return reponse
+        return wrapper
+    return decorateur
+
+def validateurs_compte(view, request, *args, **kwargs):
+    """Données du seul compte (profil, préférences) : la version suffit."""
+    return (), None
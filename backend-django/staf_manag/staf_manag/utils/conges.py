@@ -1,5 +1,6 @@
 from datetime import date, datetime
 from decimal import Decimal, ROUND_HALF_UP
+import re
 
 def mois_de_travail(start_date: date, end_date: date = None) -> int:
     """
@@ -15,6 +16,21 @@ def mois_de_travail(start_date: date, end_date: date = None) -> int:
     months = (end_date.year - start_date.year) * 12 + (end_date.month - start_date.month)
     return max(0, months)
     
+# grades ayant droit au congé "tech" de RegleConge (technicien(ne), assistant(e))
+# le même motif sert en Python (re) et en SQL (grade__iregex) : garder une syntaxe commune
+GRADE_TECH_PATTERN = r'technicien(ne)?|assistant(e)?'
+GRADE_TECH_RE = re.compile(GRADE_TECH_PATTERN, re.IGNORECASE)
+
+# catégories de grade stockées dans Personnel.categorie_grade
+CATEGORIE_TECH = 'tech'
+CATEGORIE_AUTRES = 'autres'
+
+def est_grade_tech(grade) -> bool:
+    return bool(grade and GRADE_TECH_RE.search(grade))
+
+def categorie_grade(grade) -> str:
+    return CATEGORIE_TECH if est_grade_tech(grade) else CATEGORIE_AUTRES
+
 # pour normaliser et quantifier à 2 décimales
 def to_decimal(value) -> Decimal:
     if value is None:
@@ -26,6 +42,54 @@ def to_decimal(value) -> Decimal:
     # quantize à 2 décimales pour respecter DecimalField(max_digits=5, decimal_places=2)
     return d.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
 
+# acquisitions mensuelles : une colonne entière par mois, en centièmes de jour (Conge.mensuel_01..12)
+MOIS = [f"{m:02d}" for m in range(1, 13)]
+CHAMPS_MENSUELS = [f"mensuel_{mois}" for mois in MOIS]
+
+def champ_mensuel(mois) -> str:
+    """"03" ou 3 -> "mensuel_03" ; KeyError si le mois n'existe pas (API dict)."""
+    cle = f"{int(mois):02d}" if str(mois).isdigit() else str(mois)
+    if cle not in MOIS:
+        raise KeyError(mois)
+    return f"mensuel_{cle}"
+
+def en_centiemes(valeur) -> int:
+    """Nombre de jours (float, str, Decimal) -> centièmes de jour, arrondi ROUND_HALF_UP."""
+    return int(to_decimal(valeur or 0) * 100)
+
+def depuis_centiemes(centiemes) -> Decimal:
+    return (Decimal(int(centiemes or 0)) / 100).quantize(Decimal('0.01'))
+
+def mois_acquis(date_aff: date, annee: int, mois_courant: int) -> range:
+    """
+    Retourne les mois (1..12) de `annee` donnant droit à une part mensuelle, jusqu'à mois_courant inclus.
+    - affecté dans l'année : à partir du mois d'affectation
+    - affecté avant l'année : à partir de janvier
+    - affecté après (ou pas de date) : aucun mois
+    """
+    if not date_aff:
+        return range(0)
+    if date_aff.year == annee:
+        return range(date_aff.month, mois_courant + 1)
+    if date_aff.year < annee:
+        return range(1, mois_courant + 1)
+    return range(0)
+
+def repartition_mensuelle(conge_initial, date_aff: date, annee: int, mois_courant: int) -> dict:
+    """
+    Calcule le dict {"01": part, ..., "12": part} affecté à Conge.conge_mensuel_restant (colonnes mensuel_01..12).
+    Fonction pure : pas d'accès à la base, utilisable en lot (rollover, acquisition mensuelle).
+    """
+    result = {f"{m:02d}": 0.0 for m in range(1, 13)}
+    total = to_decimal(conge_initial)
+    if total <= 0:
+        return result
+
+    part = float(to_decimal(total / Decimal(12)))
+    for m in mois_acquis(date_aff, annee, mois_courant):
+        result[f"{m:02d}"] = part
+    return result
+
 from datetime import date, datetime
 from django.utils.dateparse import parse_date as django_parse_date
 
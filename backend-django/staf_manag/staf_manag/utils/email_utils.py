@@ -4,6 +4,9 @@ from django.utils.html import strip_tags
 
 from decouple import config
 
+from accounts.models import EmailSortant, UserPreferences
+from accounts.email_jobs import reveiller_worker
+
 
 def send_html_email(subject, template, context, recipient_list):
     html_content = render_to_string(template, context)
@@ -11,3 +14,36 @@ def send_html_email(subject, template, context, recipient_list):
     msg = EmailMultiAlternatives(subject, text_content, from_email=config("EMAIL_HOST_USER"), to=[recipient_list])
     msg.attach_alternative(html_content, "text/html")
     msg.send()
+
+
+def notifications_desactivees(destinataire) -> bool:
+    """Vrai si un compte lié à cette adresse a désactivé UserPreferences.email_notifications."""
+    return UserPreferences.objects.filter(
+        user__personnel__email__iexact=destinataire, email_notifications=False,
+    ).exists()
+
+def mettre_en_file(subject, template, context, recipient_list, critique=False):
+    """
+    Rend le template et enregistre le message dans la file (EmailSortant), dans la transaction courante :
+    si l'opération est annulée, le message l'est aussi. L'envoi est fait par le worker après commit.
+
+    critique=True (codes de connexion / de récupération) : envoyé même si l'utilisateur
+    a désactivé les notifications par email.
+    Retourne l'EmailSortant créé, ou None si rien n'est à envoyer.
+    """
+    destinataire = str(recipient_list or "").strip()
+    if not destinataire:
+        return None
+    if not critique and notifications_desactivees(destinataire):
+        return None
+
+    html_content = render_to_string(template, context)
+    email = EmailSortant.objects.create(
+        destinataire=destinataire,
+        sujet=subject,
+        template=template,
+        corps_texte=strip_tags(html_content),
+        corps_html=html_content,
+    )
+    reveiller_worker()
+    return email
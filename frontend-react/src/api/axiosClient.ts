@@ -1,6 +1,6 @@
 /* indispensable pour centraliser la configuration de axios(base URL, headers, interceptors, etc) et eviter de dupliquer la logique dans les services */
 import axios from "axios";
-import { API_URL } from "./http";
+import { API_URL, type PageCurseur } from "./http";
 
 const axiosClient = axios.create({
   // baseURL: import.meta.env.VITE_API_URL, // la var d'en est contraint de commencer par VITE_ pour pouvoir être lu par meta
@@ -67,4 +67,16 @@ axiosClient.interceptors.response.use(
   }
 );
 
+// charge toutes les pages d'une liste paginée par clé ({next, results}) en suivant "next"
+export async function getToutesPages<T>(url: string): Promise<T[]> {
+  const resultats: T[] = [];
+  let suivant: string | null = url;
+  while (suivant) {
+    const res: { data: PageCurseur<T> } = await axiosClient.get(suivant);
+    resultats.push(...res.data.results);
+    suivant = res.data.next;
+  }
+  return resultats;
+}
+
 export default axiosClient;
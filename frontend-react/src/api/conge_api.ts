@@ -1,5 +1,5 @@
 // src/api/conges.ts
-import { API_URL, authHeaders } from "./http";
+import { API_URL, authHeaders, fetchToutesPages } from "./http";
 export type Personnel = {
   id: number;
   matricule: string;
@@ -81,33 +81,24 @@ export async function fetchMesConges(
   if (personnelId) {
     url += `?personnel_id=${personnelId}`;
   }
-  const res = await fetch(url, {
-    headers: authHeaders(access),
-  });
-  if (!res.ok) {
-    console.error(
-      `erreur de chargement des conges ${res.status} ${res.statusText}`,
-    );
-    throw new Error(
-      `erreur de chargement des conges ${res.status} ${res.statusText}`,
-    );
+  try {
+    return await fetchToutesPages<Conge>(url, access, "erreur de chargement des conges");
+  } catch (err) {
+    console.error(err);
+    throw err;
   }
-  return res.json();
 }
 
 export async function fetchAllchConges(access: string): Promise<Conge[]> {
-  const res = await fetch(`${API_URL}/conges/`, {
-    headers: authHeaders(access),
-  });
-  if (!res.ok) throw new Error("Erreur chargement congés(admin)");
-  return res.json();
+  // tableau admin : représentation résumée (personnel réduit, demandes en ids)
+  return fetchToutesPages<Conge>(`${API_URL}/conges/?vue=resume`, access, "Erreur chargement congés(admin)");
 }
 export async function fetchDemandes(access: string): Promise<DemandeConge[]> {
-  const res = await fetch(`${API_URL}/conges/demande-conge/demandes/`, {
-    headers: authHeaders(access),
-  });
-  if (!res.ok) throw new Error("Erreur chargement demandes");
-  return res.json();
+  return fetchToutesPages<DemandeConge>(
+    `${API_URL}/conges/demande-conge/demandes/?vue=resume`,
+    access,
+    "Erreur chargement demandes",
+  );
 }
 
 export async function validerConge(access: string, id: number) {
@@ -157,3 +148,30 @@ export async function fetchAllRegles(
   const data = await res.json();
   return data;
 }
+
+export type DisponibiliteConge = {
+  conge_id: number;
+  personnel_id: number;
+  annee: number;
+  // disponible standard cumulé à la fin de chaque mois ("01".."12")
+  standard: Record<string, number>;
+  exceptionnel: number;
+  compensatoire: number;
+  date_maj: string | null;
+  au_mois?: Record<DemandeConge["type_demande"], number>;
+};
+
+export async function fetchDisponibilites(
+  access: string,
+  params: { personnels?: number[]; annee?: number; mois?: number } = {},
+): Promise<DisponibiliteConge[]> {
+  const query = new URLSearchParams();
+  if (params.personnels?.length) query.set("personnels", params.personnels.join(","));
+  if (params.annee) query.set("annee", String(params.annee));
+  if (params.mois) query.set("mois", String(params.mois));
+  const res = await fetch(`${API_URL}/conges/disponibilites/?${query}`, {
+    headers: authHeaders(access),
+  });
+  if (!res.ok) throw new Error("Erreur chargement disponibilités");
+  return res.json();
+}
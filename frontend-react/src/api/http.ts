@@ -5,3 +5,27 @@ export function authHeaders(access: string) {
     Authorization: `Bearer ${access}`,
   };
 }
+
+// réponse des listes paginées par clé côté API : {next, results}
+export type PageCurseur<T> = {
+  next: string | null;
+  results: T[];
+};
+
+// charge toutes les pages d'une liste paginée (suit "next" jusqu'à la fin)
+export async function fetchToutesPages<T>(
+  url: string,
+  access: string,
+  erreur = "Erreur de chargement",
+): Promise<T[]> {
+  const resultats: T[] = [];
+  let suivant: string | null = url;
+  while (suivant) {
+    const res = await fetch(suivant, { headers: authHeaders(access) });
+    if (!res.ok) throw new Error(`${erreur} ${res.status} ${res.statusText}`);
+    const page: PageCurseur<T> = await res.json();
+    resultats.push(...page.results);
+    suivant = page.next;
+  }
+  return resultats;
+}
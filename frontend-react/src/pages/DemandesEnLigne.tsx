@@ -1,6 +1,6 @@
 import { useEffect, useState, useRef } from "react";
 import { useNavigate } from "react-router-dom";
-import axiosClient from "../api/axiosClient";
+import { getToutesPages } from "../api/axiosClient";
 import { useAuth } from "../context/useAuth";
 import type { Demande } from "../types/personnel";
 import { useTranslation } from "react-i18next";
@@ -49,8 +49,8 @@ const DemandesEnLigne = () => {
     }
   };
   useEffect(() => {
-    axiosClient.get("/demandes/").then((res) => {
-      setDemandes(res.data);
+    getToutesPages<Demande>("/demandes/").then((demandes) => {
+      setDemandes(demandes);
       setLoading(false);
     });
   }, []);
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from "react";
 import axios from "axios";
-import axiosClient from "../api/axiosClient";
+import axiosClient, { getToutesPages } from "../api/axiosClient";
 import { useTranslation } from "react-i18next";
 import type { DemandeConge } from "../api/conge_api";
 import AlerteMessage from "../components/AlerteMessage";
@@ -20,16 +20,8 @@ const HistoriqueDemandeConge: React.FC = () => {
 
   const fetchDemandes = async () => {
     try {
-      const access = localStorage.getItem("access");
-      const response = await axiosClient.get(
-        "/conges/demande-conge/mes_demandes/",
-        {
-          headers: {
-            Authorization: `Bearer ${access}`,
-          },
-        },
-      );
-      setDemandes(response.data);
+      // liste paginée côté API : toutes les pages sont chargées (jeton ajouté par l'intercepteur)
+      setDemandes(await getToutesPages<DemandeConge>("/conges/demande-conge/mes_demandes/"));
     } catch (error) {
       console.error(error);
     }
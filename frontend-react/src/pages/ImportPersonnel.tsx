@@ -46,6 +46,28 @@ const ImportPersonnel: React.FC = () => {
     setZipFile(file);
   };
 
+  // interroge l'état du job d'import jusqu'à la fin (termine / echec)
+  const suivreJob = async (jobId: number) => {
+    for (;;) {
+      const res = await fetch(`${API_URL}/import-jobs/${jobId}/`, {
+        headers: {
+          Authorization: `Bearer ${localStorage.getItem("access")}`,
+        },
+      });
+      const job = await res.json();
+      if (!res.ok || job.statut === "termine" || job.statut === "echec") {
+        return job;
+      }
+      setReport({
+        statut: job.statut,
+        progression: `${job.lignes_traitees}/${job.total_lignes}`,
+        erreurs: job.nb_erreurs,
+        debit: job.debit,
+      });
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  };
+
   const handleUpload = async () => {
     if (!zipFile && !excelFile) {
       showAlert(t("importPersonnel.errorNoFile"), "error");
@@ -70,7 +92,17 @@ const ImportPersonnel: React.FC = () => {
       });
 
       const data = await res.json();
-      if (res.ok) {
+      if (res.ok && data.job_id) {
+        // l'import tourne en tâche de fond : on suit la progression du job
+        const job = await suivreJob(data.job_id);
+        if (job.statut === "termine") {
+          showAlert(job.message || "Import terminé", "success");
+          setReport(job.resultat);
+        } else {
+          showAlert(job.message || "Erreur import", "error");
+          setReport(job);
+        }
+      } else if (res.ok) {
         showAlert(data.message || "Import terminé", "success");
         setReport(data);
       } else {
@@ -21,6 +21,7 @@ const ParametresCompte: React.FC = () => {
   const [preferences, setPreferences] = useState<Preferences>({
     email_notifications: true,
     sms_notifications: false,
+    notifications_admin: "immediat",
   });
   const { t } = useTranslation();
 
@@ -344,7 +345,10 @@ const ParametresCompte: React.FC = () => {
     if (
       preferences.email_notifications ===
         preferencesActuelles?.email_notifications &&
-      preferences.sms_notifications === preferencesActuelles?.sms_notifications
+      preferences.sms_notifications ===
+        preferencesActuelles?.sms_notifications &&
+      preferences.notifications_admin ===
+        preferencesActuelles?.notifications_admin
     ) {
       showAlert(t("parametre.errorNoChange"), "error");
       return;
@@ -1338,6 +1342,31 @@ const ParametresCompte: React.FC = () => {
                     <span>{t("parametre.smsNotifications")}</span>
                   </label>
 
+                  {user?.is_superuser && (
+                    <label className="flex items-center gap-2 mb-2 text-sm">
+                      <span>{t("parametre.notificationsAdmin")}</span>
+                      <select
+                        aria-label={t("parametre.notificationsAdmin")}
+                        value={preferences.notifications_admin ?? "immediat"}
+                        onChange={(e) =>
+                          setPreferences({
+                            ...preferences,
+                            notifications_admin: e.target
+                              .value as Preferences["notifications_admin"],
+                          })
+                        }
+                        className="p-2 border text-sm border-gray-300 outline-none rounded bg-gray-50 focus:border-gray-500"
+                      >
+                        <option value="immediat">
+                          {t("parametre.notificationsAdminImmediat")}
+                        </option>
+                        <option value="digest">
+                          {t("parametre.notificationsAdminDigest")}
+                        </option>
+                      </select>
+                    </label>
+                  )}
+
                   <button
                     type="submit"
                     onClick={handlePreferenceSave}
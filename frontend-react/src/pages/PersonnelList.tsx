@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from "react";
 import { useTranslation } from "react-i18next";
 import type { Personnel } from "../types/personnel";
-import axiosClient from "../api/axiosClient";
+import { getToutesPages } from "../api/axiosClient";
 import { useNavigate } from "react-router-dom";
 import Pagination from "../components/Pagination";
 import { slugify } from "../utils/slugify";
@@ -28,14 +28,9 @@ const PersonnelList: React.FC = () => {
       window.location.href = "/login";
       return;
     }
-    axiosClient
-      .get("/personnels/", {
-        headers: {
-          Authorization: `Bearer ${access}`,
-        },
-      })
-      .then((res) => {
-        setPersonnels(res.data);
+    getToutesPages<Personnel>("/personnels/")
+      .then((personnels) => {
+        setPersonnels(personnels);
       })
       .catch((err) => {
         setErr(String(err));
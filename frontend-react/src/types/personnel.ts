@@ -110,4 +110,6 @@ export type Password = {
 export type Preferences = {
   email_notifications: boolean;
   sms_notifications: boolean;
+  // admin : un email par nouvelle demande ou un résumé périodique
+  notifications_admin?: "immediat" | "digest";
 };